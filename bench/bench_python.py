@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Python 쪽 오프라인 벤치마크 (bench/run.mjs 가 호출하며 단독 실행도 가능)
+
+  search : 로컬 대역 서버를 상대로 flight_search_naver.search_flights_naver 스윕
+  process: 합성 결과 파일로 process_naver_flight_data.process_naver_flight_data
+
+마지막 줄에 결과 JSON 한 줄을 출력한다.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+
+def summarize(latencies, elapsed, **extra):
+    """지연 시간 목록(초) -> 처리량 / p50 / p99 / 최대 RSS (bench/run.mjs 와 같은 형식)"""
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        'ops': len(latencies),
+        'throughputPerSec': round(len(latencies) / elapsed, 3) if elapsed else None,
+        'p50Ms': percentile(50),
+        'p99Ms': percentile(99),
+        'meanMs': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+        # 리눅스의 ru_maxrss 는 KB 단위
+        'peakRssMb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 3),
+        **extra,
+    }
+
+
+@contextlib.contextmanager
+def fake_naver_server(options):
+    """bench/fake-naver-server.mjs 를 띄우고 searchFlights 주소를 돌려줌"""
+    args = ['node', os.path.join(BENCH_DIR, 'fake-naver-server.mjs')]
+    for key, value in options.items():
+        flag = ''.join('-' + c.lower() if c.isupper() else c for c in key)
+        args += [f'--{flag}', str(value)]
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+    try:
+        yield json.loads(process.stdout.readline())['url']
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+
+
+def bench_search(iterations, fake_options):
+    """search_flights_naver 스윕: 조합 하나당 MCP 호출 한 번의 지연 시간"""
+    import flight_search_naver as fsn
+
+    latencies = []
+    call = fsn.call_naver_flight_mcp
+
+    def timed_call(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    start = date(2026, 1, 1)
+    params = {
+        'origin': 'PUS',
+        'destination': 'NRT',
+        'start_date': start.isoformat(),
+        'end_date': (start + timedelta(days=iterations - 1)).isoformat(),
+        'stay_days': [5],
+        'adults': 1,
+        'concurrency': 1,
+        'rate': 0,
+    }
+    with fake_naver_server(fake_options) as url:
+        state_dir = tempfile.mkdtemp(prefix='naver-flight-bench-')
+        os.environ.update({
+            'NAVER_FLIGHT_API_BASE': url,
+            'NAVER_FLIGHT_CACHE': 'off',
+            'NAVER_FLIGHT_POLL_INTERVAL_MS': '0',
+            'NAVER_FLIGHT_STATE_DIR': state_dir,
+        })
+        fsn.call_naver_flight_mcp = timed_call
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                # 서버 프로세스 기동은 한 번뿐이므로 측정에서 뺀다
+                fsn.get_mcp_pool(size=1, env=fsn.client_rate_limited_env())
+                started = time.perf_counter()
+                results = fsn.search_flights_naver(params)
+                elapsed = time.perf_counter() - started
+        finally:
+            fsn.call_naver_flight_mcp = call
+            fsn.close_mcp_pool()
+            shutil.rmtree(state_dir, ignore_errors=True)
+    return summarize(latencies, elapsed, results=len(results))
+
+
+def write_synthetic_results(path, rows, seed=1):
+    """save_results 형식의 합성 결과 파일 (출발일·복귀일 조합마다 여러 관측)"""
+    rng = random.Random(seed)
+    start = date(2026, 1, 1)
+    results = []
+    for i in range(rows):
+        depart = start + timedelta(days=i % 180)
+        stay = 3 + (i // 180) % 6
+        fare = 100000 + rng.randrange(400) * 1000
+        results.append({
+            'departure_date': depart.isoformat(),
+            'return_date': (depart + timedelta(days=stay - 1)).isoformat(),
+            'stay_days': stay,
+            'flight_info': {
+                'outbound_flight': f"7C{1000 + i % 50}",
+                'return_flight': f"7C{2000 + i % 50}",
+                'total_price': f"{fare:,}원",
+                'total_fare': fare,
+            },
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'search_parameters': {'origin': 'PUS', 'destination': 'NRT'},
+            'naver_flight_results': results,
+        }, f, ensure_ascii=False)
+
+
+def bench_process(iterations, rows):
+    """process_naver_flight_data: 합성 결과 파일 하나를 처음부터 분석"""
+    import process_naver_flight_data as pnfd
+
+    workdir = tempfile.mkdtemp(prefix='naver-flight-bench-')
+    cwd = os.getcwd()
+    try:
+        # 분석 결과 파일이 작업 디렉터리에 써지므로 임시 디렉터리에서 실행
+        os.chdir(workdir)
+        path = os.path.join(workdir, 'PUS_NRT_naver_flights_bench.json')
+        write_synthetic_results(path, rows)
+        latencies = []
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                pnfd.process_naver_flight_data(path)
+                latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return summarize(latencies, elapsed, rows=rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Python 쪽 오프라인 벤치마크')
+    parser.add_argument('suite', choices=['search', 'process'])
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=100000, help='process: 합성 결과 행 수 (기본값: 100000)')
+    parser.add_argument('--fake-options', default='{}', help='대역 서버 옵션 JSON (bench/run.mjs 가 넘김)')
+    args = parser.parse_args()
+
+    if args.suite == 'search':
+        result = bench_search(max(1, args.iterations), json.loads(args.fake_options))
+    else:
+        result = bench_process(max(1, args.iterations), args.rows)
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env node
+// 네이버 searchFlights SSE 엔드포인트를 흉내 내는 로컬 대역 서버
+// NAVER_FLIGHT_API_BASE 를 이 서버 주소로 바꾸면 실제 API 없이 전체 검색 경로를 돌려 볼 수 있다.
+//
+//   node bench/fake-naver-server.mjs --port 0 --frames 5 --itineraries 150 --fare-mappings 2000
+//   -> 첫 줄에 {"url": "http://127.0.0.1:PORT/flight/international/searchFlights"} 출력
+import http from "http";
+import { pathToFileURL } from "url";
+
+export const DEFAULT_FAKE_OPTIONS = {
+  frames: 5, // 응답 하나에 보내는 SSE 프레임 수 (마지막 프레임만 isCompleted)
+  itineraries: 150, // 가는편 / 오는편 여정 수 (각각)
+  fareMappings: 2000, // 여정 조합(fareMapping) 수
+  faresPerMapping: 3, // 조합마다 판매처 요금 수
+  latencyMs: 0, // 첫 바이트까지 지연 (ms)
+  frameIntervalMs: 0, // 프레임 사이 지연 (ms)
+  rateLimitEvery: 0, // N 번째 요청마다 429 (0 이면 없음)
+  rateLimitRatio: 0, // 이 확률로 429 (0~1)
+  seed: 1,
+};
+
+// 결정적인 의사 난수 (같은 seed 면 같은 응답)
+function mulberry32(seed) {
+  let a = seed >>> 0;
+  return () => {
+    a = (a + 0x6d2b79f5) >>> 0;
+    let t = a;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+const AIRLINES = ["7C", "BX", "LJ", "KE", "OZ", "TW", "ZE"];
+const PARTNERS = ["INT005", "INT011", "INT014", "INT020", "INT035", "INT052"];
+
+function hhmm(minutes) {
+  const m = ((minutes % 1440) + 1440) % 1440;
+  return `${String(Math.floor(m / 60)).padStart(2, "0")}${String(m % 60).padStart(2, "0")}`;
+}
+
+function makeItinerary(random, date, from, to, index) {
+  const airline = AIRLINES[index % AIRLINES.length];
+  const flightNumber = String(1000 + index);
+  const departure = Math.floor(random() * 1440);
+  const duration = (90 + Math.floor(random() * 120)) * 60;
+  return {
+    itineraryId: `${date}${from}${to}${airline}${flightNumber}`,
+    duration,
+    sequence: index,
+    carbonEmission: 100,
+    segments: [
+      {
+        departure: { airportCode: from, date, time: hhmm(departure), terminal: "1" },
+        arrival: { airportCode: to, date, time: hhmm(departure + duration / 60), terminal: "1" },
+        marketingCarrier: { airlineCode: airline, flightNumber },
+        operatingCarrier: { airlineCode: airline, flightNumber },
+        flightDuration: duration,
+        groundDuration: 0,
+        aircraftCode: "738",
+      },
+    ],
+  };
+}
+
+// 검색 요청(payload) 하나에 대한 전체 응답 (마지막 프레임 내용)
+export function buildSearchResponse(payload = {}, options = {}) {
+  const opts = { ...DEFAULT_FAKE_OPTIONS, ...options };
+  const random = mulberry32(opts.seed);
+  const [outLeg, retLeg] = payload.itineraries ?? [];
+  const from = outLeg?.departureLocationCode ?? "PUS";
+  const to = outLeg?.arrivalLocationCode ?? "NRT";
+  const outDate = outLeg?.departureDate ?? "20251215";
+  const retDate = retLeg?.departureDate ?? "20251219";
+
+  const outbound = [];
+  const inbound = [];
+  for (let i = 0; i < opts.itineraries; i++) {
+    outbound.push(makeItinerary(random, outDate, from, to, i));
+    inbound.push(makeItinerary(random, retDate, to, from, i));
+  }
+
+  const fareMappings = [];
+  let minFare = Infinity;
+  let maxFare = 0;
+  for (let i = 0; i < opts.fareMappings; i++) {
+    const out = outbound[Math.floor(random() * outbound.length)];
+    const ret = inbound[Math.floor(random() * inbound.length)];
+    const fares = [];
+    for (let j = 0; j < opts.faresPerMapping; j++) {
+      const totalFare = 100000 + Math.floor(random() * 400) * 1000;
+      minFare = Math.min(minFare, totalFare);
+      maxFare = Math.max(maxFare, totalFare);
+      fares.push({
+        partnerCode: PARTNERS[(i + j) % PARTNERS.length],
+        fareType: "A01",
+        adult: { totalFare, qCharge: 0, tax: 50000 },
+        isConfirmed: true,
+        baggageFeeType: "",
+      });
+    }
+    fareMappings.push({
+      itineraryIds: `${out.itineraryId}-${ret.itineraryId}`,
+      fares,
+      carbonEmission: 200,
+      curation: [],
+      sameFareMappings: [],
+    });
+  }
+
+  return {
+    uniqueId: `fake-${opts.seed}`,
+    status: {
+      searchKey: `fake-${from}-${to}-${outDate}-${retDate}`,
+      __v: 0,
+      requestedPartnerCount: PARTNERS.length,
+      completedPartnerCount: PARTNERS.length,
+      isCompleted: true,
+      airlinesCodeMap: {},
+      itineraryAirports: [],
+      airportsCodeMap: {},
+      fareTypesCodeMap: {},
+      durationSecondsRanges: [],
+      lowestFare: { direct: minFare, a01: minFare },
+      priceRange: { min: minFare, max: maxFare },
+      expireAt: new Date(Date.now() + 10 * 60 * 1000).toISOString(),
+      hasCarbonEmission: false,
+    },
+    itineraries: [...outbound, ...inbound],
+    fareMappings,
+    isExpired: false,
+    popularFlights: [],
+  };
+}
+
+// 판매처 응답이 차례로 모이는 것처럼 점점 커지는 프레임 목록 (마지막 프레임이 전체 응답)
+export function buildSSEFrames(response, frames = DEFAULT_FAKE_OPTIONS.frames) {
+  const count = Math.max(1, frames);
+  const partners = response.status.requestedPartnerCount;
+  const result = [];
+  for (let i = 1; i <= count; i++) {
+    const last = i === count;
+    const share = i / count;
+    const frame = last
+      ? response
+      : {
+          ...response,
+          status: {
+            ...response.status,
+            isCompleted: false,
+            completedPartnerCount: Math.floor(partners * share * 0.7),
+          },
+          fareMappings: response.fareMappings.slice(
+            0,
+            Math.floor(response.fareMappings.length * share)
+          ),
+        };
+    result.push(`data: ${JSON.stringify(frame)}\n\n`);
+  }
+  return result;
+}
+
+function sleep(ms) {
+  return ms > 0 ? new Promise((resolve) => setTimeout(resolve, ms)) : Promise.resolve();
+}
+
+// 대역 서버 시작 -> { url, stats, close() }
+export async function startFakeNaverServer(options = {}) {
+  const opts = { ...DEFAULT_FAKE_OPTIONS, ...options };
+  const random = mulberry32(opts.seed + 7);
+  const stats = { requests: 0, rateLimited: 0, bytesSent: 0 };
+  // 같은 요청 조건이면 프레임을 다시 만들지 않음
+  const frameCache = new Map();
+
+  const server = http.createServer((req, res) => {
+    const chunks = [];
+    req.on("data", (chunk) => chunks.push(chunk));
+    req.on("end", async () => {
+      stats.requests++;
+      const limited =
+        (opts.rateLimitEvery > 0 && stats.requests % opts.rateLimitEvery === 0) ||
+        (opts.rateLimitRatio > 0 && random() < opts.rateLimitRatio);
+      if (limited) {
+        stats.rateLimited++;
+        res.writeHead(429, { "Content-Type": "text/plain" });
+        res.end("Too Many Requests");
+        return;
+      }
+
+      let payload = {};
+      try {
+        payload = JSON.parse(Buffer.concat(chunks).toString("utf8") || "{}");
+      } catch {
+        res.writeHead(400).end();
+        return;
+      }
+      const key = JSON.stringify(payload.itineraries ?? null);
+      let frames = frameCache.get(key);
+      if (!frames) {
+        frames = buildSSEFrames(buildSearchResponse(payload, opts), opts.frames);
+        frameCache.set(key, frames);
+      }
+
+      await sleep(opts.latencyMs);
+      res.writeHead(200, {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        Connection: "keep-alive",
+      });
+      for (let i = 0; i < frames.length; i++) {
+        if (i > 0) await sleep(opts.frameIntervalMs);
+        if (res.destroyed) return; // 클라이언트가 먼저 끊음 (완료 프레임 수신 등)
+        stats.bytesSent += Buffer.byteLength(frames[i]);
+        res.write(frames[i]);
+      }
+      res.end();
+    });
+  });
+
+  await new Promise((resolve) => server.listen(opts.port ?? 0, "127.0.0.1", resolve));
+  const { port } = server.address();
+  return {
+    url: `http://127.0.0.1:${port}/flight/international/searchFlights`,
+    stats,
+    close: () =>
+      new Promise((resolve) => {
+        server.closeAllConnections?.();
+        server.close(() => resolve());
+      }),
+  };
+}
+
+// "--fare-mappings 2000" -> { fareMappings: 2000 }
+export function parseFakeOptions(argv) {
+  const options = {};
+  for (let i = 0; i < argv.length; i++) {
+    const match = /^--([a-z-]+)$/.exec(argv[i]);
+    if (!match) continue;
+    const name = match[1].replace(/-([a-z])/g, (_, c) => c.toUpperCase());
+    if (name in DEFAULT_FAKE_OPTIONS || name === "port") {
+      options[name] = Number(argv[++i]);
+    }
+  }
+  return options;
+}
+
+if (import.meta.url === pathToFileURL(process.argv[1] ?? "").href) {
+  const server = await startFakeNaverServer(parseFakeOptions(process.argv.slice(2)));
+  console.log(JSON.stringify({ url: server.url }));
+  const shutdown = async () => {
+    console.error(JSON.stringify({ stats: server.stats }));
+    await server.close();
+    process.exit(0);
+  };
+  process.on("SIGTERM", shutdown);
+  process.on("SIGINT", shutdown);
+}
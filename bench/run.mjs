@@ -0,0 +1,355 @@
+#!/usr/bin/env node
+// 오프라인 벤치마크: 로컬 대역 서버(fake-naver-server.mjs)와 합성 응답으로 검색 경로의 성능을 잰다.
+// 실제 flight-api.naver.com 에는 요청하지 않는다. 먼저 `npm run build` 로 dist 를 만들어야 한다.
+//
+//   node bench/run.mjs                              # 모든 스위트 실행, bench/results/ 에 결과 저장
+//   node bench/run.mjs --suite sse --suite process  # 일부 스위트만
+//   node bench/run.mjs --fare-mappings 20000 --rate-limit-ratio 0.05
+//   node bench/run.mjs --compare bench/results/a.json bench/results/b.json
+//
+// 스위트마다 별도 프로세스에서 실행하므로 최대 RSS 는 그 스위트만의 값이다.
+import { spawn, execFileSync } from "child_process";
+import fs from "fs";
+import os from "os";
+import path from "path";
+import { Readable } from "stream";
+import { fileURLToPath, pathToFileURL } from "url";
+import {
+  DEFAULT_FAKE_OPTIONS,
+  buildSSEFrames,
+  buildSearchResponse,
+  parseFakeOptions,
+  startFakeNaverServer,
+} from "./fake-naver-server.mjs";
+
+const BENCH_DIR = path.dirname(fileURLToPath(import.meta.url));
+const ROOT = path.resolve(BENCH_DIR, "..");
+const RESULTS_DIR = path.join(BENCH_DIR, "results");
+const PYTHON = process.env.PYTHON || "python3";
+
+const NODE_SUITES = ["sse", "process", "tool"];
+const PYTHON_SUITES = ["python-search", "python-process"];
+const DEFAULT_ITERATIONS = { sse: 200, process: 200, tool: 30, "python-search": 30, "python-process": 5 };
+const SSE_CHUNK_BYTES = 16 * 1024; // 네트워크에서 받는 조각 크기 흉내
+const REGRESSION_THRESHOLD = 0.1; // 비교 시 이 비율 이상 나빠지면 회귀로 표시
+
+// ---- 측정 ----
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return null;
+  const index = Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1);
+  return sorted[Math.max(0, index)];
+}
+
+// 지연 시간 목록 -> 처리량 / p50 / p99 / 최대 RSS
+export function summarize(latencies, elapsedMs, extra = {}) {
+  const sorted = [...latencies].sort((a, b) => a - b);
+  const round = (v) => (v === null ? null : Math.round(v * 1000) / 1000);
+  return {
+    ops: latencies.length,
+    throughputPerSec: round(latencies.length / (elapsedMs / 1000)),
+    p50Ms: round(percentile(sorted, 50)),
+    p99Ms: round(percentile(sorted, 99)),
+    meanMs: round(sorted.reduce((a, b) => a + b, 0) / (sorted.length || 1)),
+    peakRssMb: round(process.resourceUsage().maxRSS / 1024),
+    ...extra,
+  };
+}
+
+async function measure(iterations, fn) {
+  const latencies = [];
+  const started = performance.now();
+  for (let i = 0; i < iterations; i++) {
+    const t0 = performance.now();
+    await fn(i);
+    latencies.push(performance.now() - t0);
+  }
+  return { latencies, elapsedMs: performance.now() - started };
+}
+
+// ---- 스위트 (자식 프로세스에서 실행) ----
+
+// dist 모듈은 환경 변수를 읽으며 초기화되므로 환경을 맞춘 뒤에 불러온다
+async function loadSearchModule(apiBase) {
+  Object.assign(process.env, benchServerEnv(apiBase));
+  return import(pathToFileURL(path.join(ROOT, "dist/tools/NaverFlightSearch.js")).href);
+}
+
+function benchServerEnv(apiBase) {
+  return {
+    NAVER_FLIGHT_API_BASE: apiBase ?? "http://127.0.0.1:9/unused",
+    NAVER_FLIGHT_CACHE: "off",
+    NAVER_FLIGHT_MIN_SEARCH_INTERVAL_MS: "0",
+    NAVER_FLIGHT_INITIAL_SEARCH_INTERVAL_MS: "0",
+    NAVER_FLIGHT_POLL_INTERVAL_MS: "0",
+    // 벤치마크끼리, 또는 실제 사용 중인 서버와 속도 제어 상태를 섞지 않는다
+    NAVER_FLIGHT_STATE_DIR: fs.mkdtempSync(path.join(os.tmpdir(), "naver-flight-bench-")),
+  };
+}
+
+function payloadFor(i) {
+  const day = (n) => {
+    const date = new Date(Date.UTC(2026, 0, 1 + n));
+    return date.toISOString().slice(0, 10).replace(/-/g, "");
+  };
+  return {
+    itineraries: [
+      { departureLocationCode: "PUS", arrivalLocationCode: "NRT", departureDate: day(i) },
+      { departureLocationCode: "NRT", arrivalLocationCode: "PUS", departureDate: day(i + 4) },
+    ],
+  };
+}
+
+const suites = {
+  // SSE 본문 조각 -> processSSEStream (네트워크 없이 파서만)
+  async sse(options, iterations) {
+    const { processSSEStream } = await loadSearchModule();
+    const body = Buffer.from(buildSSEFrames(buildSearchResponse(payloadFor(0), options), options.frames).join(""));
+    const chunks = [];
+    for (let offset = 0; offset < body.length; offset += SSE_CHUNK_BYTES) {
+      chunks.push(body.subarray(offset, offset + SSE_CHUNK_BYTES));
+    }
+    const { latencies, elapsedMs } = await measure(iterations, () =>
+      processSSEStream({ body: Readable.from(chunks) })
+    );
+    return summarize(latencies, elapsedMs, {
+      bytesPerOp: body.length,
+      mbPerSec: Math.round((body.length * latencies.length) / (elapsedMs / 1000) / 1e4) / 100,
+    });
+  },
+
+  // 합성 응답 -> processFlightData (여정 색인 + 최저가 k개 선택)
+  async process(options, iterations) {
+    const { processFlightData } = await loadSearchModule();
+    const response = buildSearchResponse(payloadFor(0), options);
+    const { latencies, elapsedMs } = await measure(iterations, () => processFlightData(response));
+    return summarize(latencies, elapsedMs, {
+      fares: options.fareMappings * options.faresPerMapping,
+    });
+  },
+
+  // MCP 서버(dist/index.js)를 띄우고 대역 서버를 상대로 search_naver_flights 전체 경로
+  async tool(options, iterations) {
+    const { Client } = await import("@modelcontextprotocol/sdk/client/index.js");
+    const { StdioClientTransport } = await import("@modelcontextprotocol/sdk/client/stdio.js");
+    const fake = await startFakeNaverServer(options);
+    const transport = new StdioClientTransport({
+      command: process.execPath,
+      args: [path.join(ROOT, "dist/index.js")],
+      cwd: ROOT,
+      env: { ...process.env, ...benchServerEnv(fake.url) },
+      stderr: "ignore",
+    });
+    const client = new Client({ name: "naver-flight-bench", version: "0.1.0" });
+    await client.connect(transport);
+    try {
+      let empty = 0;
+      const { latencies, elapsedMs } = await measure(iterations, async (i) => {
+        const payload = payloadFor(i);
+        const iso = (d) => `${d.slice(0, 4)}-${d.slice(4, 6)}-${d.slice(6)}`;
+        const result = await client.callTool({
+          name: "search_naver_flights",
+          arguments: {
+            departure: "PUS",
+            arrival: "NRT",
+            departureDate: iso(payload.itineraries[0].departureDate),
+            returnDate: iso(payload.itineraries[1].departureDate),
+            format: "json",
+          },
+        });
+        if (!JSON.parse(result.content?.[0]?.text ?? "{}").ok) empty++;
+      });
+      return summarize(latencies, elapsedMs, {
+        emptyResults: empty,
+        upstreamRequests: fake.stats.requests,
+        rateLimited: fake.stats.rateLimited,
+        serverPeakRssMb: serverPeakRssMb(transport.pid),
+      });
+    } finally {
+      await client.close();
+      await fake.close();
+    }
+  },
+};
+
+// 리눅스에서만: 자식 프로세스의 최대 RSS (VmHWM)
+function serverPeakRssMb(pid) {
+  try {
+    const status = fs.readFileSync(`/proc/${pid}/status`, "utf8");
+    const match = /VmHWM:\s+(\d+) kB/.exec(status);
+    return match ? Math.round((Number(match[1]) / 1024) * 1000) / 1000 : null;
+  } catch {
+    return null;
+  }
+}
+
+// ---- 실행 / 저장 / 비교 ----
+
+function runChild(command, args) {
+  return new Promise((resolve, reject) => {
+    const child = spawn(command, args, { cwd: ROOT, stdio: ["ignore", "pipe", "inherit"] });
+    let stdout = "";
+    child.stdout.on("data", (chunk) => (stdout += chunk));
+    child.on("error", reject);
+    child.on("close", (code) => {
+      // 마지막 줄이 결과 JSON (앞선 줄은 검색 모듈의 로그)
+      const last = stdout.trim().split("\n").pop() ?? "";
+      try {
+        resolve(JSON.parse(last));
+      } catch {
+        reject(new Error(`${args.join(" ")} 실패 (exit ${code})`));
+      }
+    });
+  });
+}
+
+function gitCommit() {
+  try {
+    return execFileSync("git", ["rev-parse", "--short", "HEAD"], { cwd: ROOT }).toString().trim();
+  } catch {
+    return "unknown";
+  }
+}
+
+function printResults(results) {
+  console.log("| 스위트 | 횟수 | 처리량(/s) | p50(ms) | p99(ms) | 최대 RSS(MB) |");
+  console.log("| --- | -- | ---- | ---- | ---- | ---- |");
+  for (const [name, r] of Object.entries(results.suites)) {
+    if (r.error) {
+      console.log(`| ${name} | 오류: ${r.error} | | | | |`);
+      continue;
+    }
+    console.log(`| ${name} | ${r.ops} | ${r.throughputPerSec} | ${r.p50Ms} | ${r.p99Ms} | ${r.peakRssMb} |`);
+  }
+}
+
+// 두 결과 파일 비교: 처리량은 낮아지면, 지연 / RSS 는 높아지면 회귀
+function compareResults(basePath, headPath, threshold) {
+  const base = JSON.parse(fs.readFileSync(basePath, "utf8"));
+  const head = JSON.parse(fs.readFileSync(headPath, "utf8"));
+  const metrics = [
+    ["throughputPerSec", -1],
+    ["p50Ms", 1],
+    ["p99Ms", 1],
+    ["peakRssMb", 1],
+  ];
+  let regressions = 0;
+  console.log(`비교: ${base.commit} (${base.date}) → ${head.commit} (${head.date})`);
+  console.log("| 스위트 | 지표 | 이전 | 현재 | 변화 |");
+  console.log("| --- | --- | ---- | ---- | -- |");
+  for (const [name, h] of Object.entries(head.suites)) {
+    const b = base.suites[name];
+    if (!b || b.error || h.error) continue;
+    for (const [metric, direction] of metrics) {
+      if (b[metric] == null || h[metric] == null || b[metric] === 0) continue;
+      const change = (h[metric] - b[metric]) / b[metric];
+      const worse = change * direction > threshold;
+      if (worse) regressions++;
+      console.log(
+        `| ${name} | ${metric} | ${b[metric]} | ${h[metric]} | ${(change * 100).toFixed(1)}%${worse ? " ⚠️" : ""} |`
+      );
+    }
+  }
+  console.log(`\n회귀 ${regressions}건 (기준 ${Math.round(threshold * 100)}%)`);
+  return regressions;
+}
+
+function parseArgs(argv) {
+  const args = { suites: [], iterations: null, out: null, compare: null, child: null, python: true, threshold: REGRESSION_THRESHOLD };
+  for (let i = 0; i < argv.length; i++) {
+    switch (argv[i]) {
+      case "--suite":
+        args.suites.push(argv[++i]);
+        break;
+      case "--iterations":
+        args.iterations = Number(argv[++i]);
+        break;
+      case "--out":
+        args.out = argv[++i];
+        break;
+      case "--compare":
+        args.compare = [argv[++i], argv[++i]];
+        break;
+      case "--threshold":
+        args.threshold = Number(argv[++i]);
+        break;
+      case "--no-python":
+        args.python = false;
+        break;
+      case "--child":
+        args.child = argv[++i];
+        break;
+    }
+  }
+  args.fake = { ...DEFAULT_FAKE_OPTIONS, ...parseFakeOptions(argv) };
+  return args;
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+
+  if (args.compare) {
+    process.exitCode = compareResults(args.compare[0], args.compare[1], args.threshold) > 0 ? 1 : 0;
+    return;
+  }
+
+  if (args.child) {
+    // 검색 모듈의 console.log 가 결과 줄과 섞이지 않도록 막는다
+    const write = process.stdout.write.bind(process.stdout);
+    console.log = () => {};
+    const iterations = args.iterations ?? DEFAULT_ITERATIONS[args.child];
+    const result = await suites[args.child](args.fake, iterations);
+    write(JSON.stringify(result) + "\n");
+    process.exit(0);
+  }
+
+  const selected = args.suites.length > 0 ? args.suites : [...NODE_SUITES, ...(args.python ? PYTHON_SUITES : [])];
+  const passthrough = process.argv.slice(2).filter((_, i, all) => {
+    // 스위트 선택 / 저장 옵션은 자식에게 넘기지 않음
+    const flag = (j) => ["--suite", "--out", "--compare"].includes(all[j]);
+    return !flag(i) && !(i > 0 && flag(i - 1)) && all[i] !== "--no-python";
+  });
+
+  const results = {
+    commit: gitCommit(),
+    date: new Date().toISOString(),
+    node: process.version,
+    platform: `${os.platform()}-${os.arch()}`,
+    options: args.fake,
+    suites: {},
+  };
+  for (const name of selected) {
+    console.error(`▶ ${name}`);
+    try {
+      if (NODE_SUITES.includes(name)) {
+        results.suites[name] = await runChild(process.execPath, [fileURLToPath(import.meta.url), "--child", name, ...passthrough]);
+      } else if (PYTHON_SUITES.includes(name)) {
+        const iterations = String(args.iterations ?? DEFAULT_ITERATIONS[name]);
+        results.suites[name] = await runChild(PYTHON, [
+          path.join(BENCH_DIR, "bench_python.py"),
+          name.replace("python-", ""),
+          "--iterations",
+          iterations,
+          "--fake-options",
+          JSON.stringify(args.fake),
+        ]);
+      } else {
+        throw new Error(`알 수 없는 스위트: ${name}`);
+      }
+    } catch (error) {
+      results.suites[name] = { error: String(error?.message ?? error) };
+    }
+  }
+
+  fs.mkdirSync(RESULTS_DIR, { recursive: true });
+  const out =
+    args.out ?? path.join(RESULTS_DIR, `${results.date.replace(/[:.]/g, "-")}_${results.commit}.json`);
+  fs.writeFileSync(out, JSON.stringify(results, null, 2));
+  printResults(results);
+  console.log(`\n결과 저장: ${path.relative(process.cwd(), out)}`);
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
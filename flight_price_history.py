@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+네이버 항공권 가격 이력 저장소
+검색할 때마다 관측한 (노선, 출발일, 복귀일, 항공편, 요금, 관측 시각)을
+SQLite 파일 하나에 계속 추가하고, 기간 조회 / 최저가 추이 / 압축을 제공합니다.
+"""
+import sqlite3
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+# UTF-8 인코딩 설정
+sys.stdout.reconfigure(encoding='utf-8')
+
+DEFAULT_HISTORY_PATH = "naver_flight_history.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,      -- YYYY-MM-DD
+    return_date TEXT NOT NULL,         -- YYYY-MM-DD
+    airlines TEXT NOT NULL DEFAULT '', -- 검색에 쓴 항공사 필터 (정렬 후 쉼표로 연결)
+    outbound_flight TEXT,
+    return_flight TEXT,
+    partner_code TEXT,
+    rank INTEGER,
+    fare INTEGER NOT NULL,             -- 원
+    observed_at INTEGER NOT NULL       -- 유닉스 시각 (초)
+);
+CREATE INDEX IF NOT EXISTS idx_observations_route
+    ON observations (origin, destination, departure_date, return_date, observed_at);
+CREATE INDEX IF NOT EXISTS idx_observations_observed_at
+    ON observations (observed_at);
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+
+def _iso_date(date_str):
+    """"20251209" / "2025-12-09" -> "2025-12-09" """
+    digits = (date_str or '').replace('-', '')
+    if len(digits) != 8:
+        return date_str
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def _airlines_key(airlines):
+    return ','.join(sorted(a.upper() for a in airlines or ()))
+
+
+def _timestamp(value):
+    """datetime / "YYYY-MM-DD[ HH:MM:SS]" / 유닉스 시각 -> 유닉스 시각 (초)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+
+class PriceHistory:
+    """추가 전용 가격 이력 저장소 (SQLite, WAL)
+
+    여러 스레드가 같은 객체로 기록할 수 있도록 쓰기는 잠금으로 직렬화한다.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 기록 -------------------------------------------------------------
+
+    def record_flights(self, origin, destination, flights, observed_at=None, airlines=None):
+        """processFlightData 결과(순위별 항공편) 목록을 기록하고 기록한 행 수를 반환
+
+        flights 의 각 항목은 flight_search_naver 의 flight_info 형식
+        (departure_date, return_date, outbound_flight, total_fare / total_price, rank ...)이다.
+        """
+        observed_at = _timestamp(observed_at) or int(time.time())
+        airlines = _airlines_key(airlines)
+        rows = []
+        for flight in flights or ():
+            fare = flight.get('total_fare')
+            if not fare:
+                try:
+                    fare = int(str(flight.get('total_price', '')).replace('₩', '').replace(',', '').replace('원', ''))
+                except ValueError:
+                    continue
+            departure_date = _iso_date(flight.get('departure_date'))
+            return_date = _iso_date(flight.get('return_date'))
+            if not fare or not departure_date or not return_date:
+                continue
+            rows.append((origin, destination, departure_date, return_date, airlines,
+                         flight.get('outbound_flight'), flight.get('return_flight'),
+                         flight.get('partner_code'), flight.get('rank'), fare, observed_at))
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO observations (origin, destination, departure_date, return_date, airlines, "
+                    "outbound_flight, return_flight, partner_code, rank, fare, observed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def record_result(self, origin, destination, result, observed_at=None, airlines=None):
+        """검색 결과 항목 하나 (departure_date, return_date, flight_info) 기록"""
+        flight_info = result.get('flight_info') or {}
+        flights = flight_info.get('ranked_flights') or [flight_info]
+        # 순위별 항공편에 날짜가 없으면 (텍스트 응답) 결과 항목의 날짜를 쓴다
+        flights = [dict(flight,
+                        departure_date=flight.get('departure_date') or result.get('departure_date'),
+                        return_date=flight.get('return_date') or result.get('return_date'))
+                   for flight in flights]
+        return self.record_flights(origin, destination, flights, observed_at, airlines)
+
+    def import_file(self, file_path, force=False):
+        """save_results JSON / 스윕 저널(JSONL) 파일을 가져오고 기록한 행 수를 반환 (이미 가져온 파일은 건너뜀)"""
+        from process_naver_flight_data import iter_flight_results, iter_journal_results, route_from_filename
+
+        mtime = os.path.getmtime(file_path)
+        key = os.path.abspath(file_path)
+        if not force:
+            row = self._conn.execute("SELECT mtime FROM imported_files WHERE path = ?", (key,)).fetchone()
+            if row and row[0] == mtime:
+                return 0
+
+        count = 0
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if file_path.endswith('.jsonl'):
+                origin, destination = route_from_filename(file_path)
+                for record in iter_journal_results(f):
+                    count += self.record_result(origin, destination, record,
+                                                record.get('recorded_at') or mtime, record.get('airlines'))
+            else:
+                meta = {}
+                file_origin, file_destination = route_from_filename(file_path)
+                # search_parameters 는 결과 배열보다 앞에 저장되므로 첫 항목을 읽은 뒤에는 채워져 있다
+                for result in iter_flight_results(f, meta):
+                    params = meta.get('search_parameters') or {}
+                    count += self.record_result(params.get('origin') or file_origin,
+                                                params.get('destination') or file_destination,
+                                                result, mtime, params.get('airlines'))
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO imported_files (path, mtime) VALUES (?, ?)", (key, mtime))
+        return count
+
+    # --- 조회 -------------------------------------------------------------
+
+    def _where(self, origin, destination, departure_date=None, return_date=None, since=None, until=None,
+               airlines=None):
+        clauses = ["origin = ?", "destination = ?"]
+        args = [origin, destination]
+        if departure_date:
+            clauses.append("departure_date = ?")
+            args.append(departure_date)
+        if return_date:
+            clauses.append("return_date = ?")
+            args.append(return_date)
+        if since is not None:
+            clauses.append("observed_at >= ?")
+            args.append(_timestamp(since))
+        if until is not None:
+            clauses.append("observed_at < ?")
+            args.append(_timestamp(until))
+        if airlines is not None:
+            clauses.append("airlines = ?")
+            args.append(_airlines_key(airlines))
+        return " AND ".join(clauses), args
+
+    def query(self, origin, destination, departure_date=None, return_date=None, since=None, until=None,
+              airlines=None, limit=None):
+        """조건에 맞는 관측 행 (관측 시각 순)"""
+        where, args = self._where(origin, destination, departure_date, return_date, since, until, airlines)
+        sql = (f"SELECT departure_date, return_date, airlines, outbound_flight, return_flight, partner_code, "
+               f"rank, fare, observed_at FROM observations WHERE {where} ORDER BY observed_at, fare")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        columns = ('departure_date', 'return_date', 'airlines', 'outbound_flight', 'return_flight',
+                   'partner_code', 'rank', 'fare', 'observed_at')
+        return [dict(zip(columns, row)) for row in self._conn.execute(sql, args)]
+
+    def min_price_series(self, origin, destination, departure_date=None, return_date=None, since=None,
+                         until=None, airlines=None, bucket='day'):
+        """관측 시각 구간(day / hour)별 최저가 추이: [(구간, 최저가, 관측 수)]"""
+        fmt = '%Y-%m-%d %H:00' if bucket == 'hour' else '%Y-%m-%d'
+        where, args = self._where(origin, destination, departure_date, return_date, since, until, airlines)
+        sql = (f"SELECT strftime('{fmt}', observed_at, 'unixepoch', 'localtime') AS bucket, MIN(fare), COUNT(*) "
+               f"FROM observations WHERE {where} GROUP BY bucket ORDER BY bucket")
+        return self._conn.execute(sql, args).fetchall()
+
+    def latest_min_prices(self, origin, destination, airlines=None, since=None):
+        """(출발일, 복귀일)별 가장 최근 관측 시각의 최저가: {(출발일, 복귀일): (최저가, 관측 시각)}"""
+        where, args = self._where(origin, destination, since=since, airlines=airlines)
+        sql = (f"SELECT departure_date, return_date, MIN(fare), observed_at FROM observations o "
+               f"WHERE {where} AND observed_at = (SELECT MAX(observed_at) FROM observations i "
+               f"WHERE i.origin = o.origin AND i.destination = o.destination AND i.departure_date = o.departure_date "
+               f"AND i.return_date = o.return_date AND i.airlines = o.airlines) "
+               f"GROUP BY departure_date, return_date")
+        return {(dep, ret): (fare, observed_at) for dep, ret, fare, observed_at in self._conn.execute(sql, args)}
+
+    def latest_flights(self, origin, destination, airlines=None, since=None):
+        """(출발일, 복귀일)별 가장 최근 관측의 항공편 행 (요금 순): {(출발일, 복귀일): [행, ...]}"""
+        where, args = self._where(origin, destination, since=since, airlines=airlines)
+        sql = (f"SELECT departure_date, return_date, outbound_flight, return_flight, partner_code, fare, observed_at "
+               f"FROM observations o "
+               f"WHERE {where} AND observed_at = (SELECT MAX(observed_at) FROM observations i "
+               f"WHERE i.origin = o.origin AND i.destination = o.destination AND i.departure_date = o.departure_date "
+               f"AND i.return_date = o.return_date AND i.airlines = o.airlines) "
+               f"ORDER BY departure_date, return_date, fare")
+        columns = ('departure_date', 'return_date', 'outbound_flight', 'return_flight', 'partner_code', 'fare',
+                   'observed_at')
+        flights = {}
+        for row in self._conn.execute(sql, args):
+            flights.setdefault((row[0], row[1]), []).append(dict(zip(columns, row)))
+        return flights
+
+    def cell_observations(self, origin, destination, airlines=None, since=None):
+        """(출발일, 복귀일)별 관측 시각 순 최저가: {(출발일, 복귀일): [(관측 시각, 최저가), ...]}"""
+        where, args = self._where(origin, destination, since=since, airlines=airlines)
+        sql = (f"SELECT departure_date, return_date, observed_at, MIN(fare) FROM observations WHERE {where} "
+               f"GROUP BY departure_date, return_date, observed_at "
+               f"ORDER BY departure_date, return_date, observed_at")
+        series = {}
+        for dep, ret, observed_at, fare in self._conn.execute(sql, args):
+            series.setdefault((dep, ret), []).append((observed_at, fare))
+        return series
+
+    def stats(self):
+        row = self._conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT origin || '-' || destination), MIN(observed_at), MAX(observed_at) "
+            "FROM observations").fetchone()
+        size = sum(os.path.getsize(self.path + suffix)
+                   for suffix in ('', '-wal') if os.path.exists(self.path + suffix))
+        return {
+            'rows': row[0],
+            'routes': row[1],
+            'first_observed_at': row[2],
+            'last_observed_at': row[3],
+            'size_bytes': size,
+        }
+
+    # --- 압축 -------------------------------------------------------------
+
+    def compact(self, older_than_days=30):
+        """older_than_days 보다 오래된 관측은 하루에 (노선, 출발일, 복귀일, 항공사 필터)별 최저가 한 행만 남김
+
+        줄어든 행 수를 반환한다.
+        """
+        cutoff = int(time.time()) - int(older_than_days * 86400)
+        with self._lock:
+            with self._conn:
+                before = self._conn.execute("SELECT COUNT(*) FROM observations WHERE observed_at < ?",
+                                            (cutoff,)).fetchone()[0]
+                # SQLite 는 MIN() 과 함께 고른 나머지 열을 최저가 행에서 가져온다
+                self._conn.execute("DROP TABLE IF EXISTS temp.compacted")
+                self._conn.execute(
+                    "CREATE TEMP TABLE compacted AS "
+                    "SELECT origin, destination, departure_date, return_date, airlines, outbound_flight, "
+                    "return_flight, partner_code, 1 AS rank, MIN(fare) AS fare, observed_at "
+                    "FROM observations WHERE observed_at < ? "
+                    "GROUP BY origin, destination, departure_date, return_date, airlines, "
+                    "date(observed_at, 'unixepoch', 'localtime')", (cutoff,))
+                self._conn.execute("DELETE FROM observations WHERE observed_at < ?", (cutoff,))
+                self._conn.execute(
+                    "INSERT INTO observations (origin, destination, departure_date, return_date, airlines, "
+                    "outbound_flight, return_flight, partner_code, rank, fare, observed_at) "
+                    "SELECT * FROM temp.compacted")
+                after = self._conn.execute("SELECT COUNT(*) FROM temp.compacted").fetchone()[0]
+                self._conn.execute("DROP TABLE temp.compacted")
+            self._conn.execute("VACUUM")
+        return before - after
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else '-'
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description='네이버 항공권 가격 이력 저장소')
+    parser.add_argument('--db', default=DEFAULT_HISTORY_PATH, help=f'이력 파일 경로 (기본값: {DEFAULT_HISTORY_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='save_results JSON / 스윕 저널(JSONL) 파일 가져오기')
+    import_parser.add_argument('files', nargs='+', help='가져올 파일 (디렉터리 / glob 패턴 가능)')
+    import_parser.add_argument('--force', action='store_true', help='이미 가져온 파일도 다시 가져오기')
+
+    for name, help_text in (('series', '관측일별 최저가 추이'), ('query', '관측 행 조회')):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('origin', help='출발지 공항코드')
+        sub.add_argument('destination', help='도착지 공항코드')
+        sub.add_argument('--departure-date', help='출발일 (YYYY-MM-DD)')
+        sub.add_argument('--return-date', help='복귀일 (YYYY-MM-DD)')
+        sub.add_argument('--days', type=int, default=21, help='최근 며칠간의 관측 (기본값: 21)')
+        sub.add_argument('--airlines', nargs='*', help='검색에 쓴 항공사 필터')
+    commands.choices['series'].add_argument('--bucket', choices=('day', 'hour'), default='day',
+                                            help='추이 구간 (기본값: day)')
+    commands.choices['query'].add_argument('--limit', type=int, default=100, help='최대 행 수 (기본값: 100)')
+
+    compact_parser = commands.add_parser('compact', help='오래된 관측을 하루 최저가로 압축')
+    compact_parser.add_argument('--older-than', type=int, default=30, help='이 일수보다 오래된 관측 압축 (기본값: 30)')
+
+    commands.add_parser('stats', help='저장소 통계')
+
+    args = parser.parse_args()
+
+    with PriceHistory(args.db) as history:
+        if args.command == 'import':
+            from process_naver_flight_data import resolve_input_files
+            total = 0
+            for file_path in resolve_input_files(args.files):
+                try:
+                    count = history.import_file(file_path, force=args.force)
+                except Exception as e:
+                    print(f"⚠️ {file_path} 건너뜀: {type(e).__name__}: {e}")
+                    continue
+                total += count
+                print(f"✓ {file_path}: {count}개 관측" if count else f"- {file_path}: 이미 가져옴")
+            print(f"\n총 {total}개 관측을 '{args.db}'에 추가했습니다.")
+
+        elif args.command in ('series', 'query'):
+            origin, destination = args.origin.upper(), args.destination.upper()
+            since = datetime.now() - timedelta(days=args.days)
+            if args.command == 'series':
+                series = history.min_price_series(origin, destination, args.departure_date, args.return_date,
+                                                  since=since, airlines=args.airlines, bucket=args.bucket)
+                print(f"=== {origin} → {destination} 최근 {args.days}일 최저가 추이 ===")
+                print("| 관측 | 최저가 | 관측 수 |")
+                print("| --- | ---- | -- |")
+                for bucket, fare, count in series:
+                    print(f"| {bucket} | ₩{fare:,} | {count} |")
+            else:
+                rows = history.query(origin, destination, args.departure_date, args.return_date,
+                                     since=since, airlines=args.airlines, limit=args.limit)
+                print("| 관측 시각 | 출발일 | 복귀일 | 가는편 | 오는편 | 요금 |")
+                print("| --- | --- | --- | --- | --- | ---- |")
+                for row in rows:
+                    print(f"| {_format_time(row['observed_at'])} | {row['departure_date']} | {row['return_date']} | "
+                          f"{row['outbound_flight'] or '-'} | {row['return_flight'] or '-'} | ₩{row['fare']:,} |")
+
+        elif args.command == 'compact':
+            removed = history.compact(args.older_than)
+            print(f"{args.older_than}일보다 오래된 관측 {removed}개를 정리했습니다.")
+
+        elif args.command == 'stats':
+            stats = history.stats()
+            stats['first_observed_at'] = _format_time(stats['first_observed_at'])
+            stats['last_observed_at'] = _format_time(stats['last_observed_at'])
+            print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+네이버 항공권 견적(왕복 항공편 하나) 레코드와 압축 저장 형식
+flight_search_naver.py / process_naver_flight_data.py 가 함께 쓰는 정수 기반 표현이다.
+요금은 원 단위 정수, 날짜는 date.toordinal(), 시각은 자정부터의 분, 소요시간은 분으로 두고
+"123,400원" / "07:20" / "125분" 같은 문자열은 읽을 때 한 번만 해석하고 보여 줄 때만 만든다.
+"""
+import gzip
+import json
+import re
+import sys
+from datetime import date
+from functools import lru_cache
+
+QUOTE_FORMAT = "naver-flight-quotes"
+QUOTE_FORMAT_VERSION = 1
+QUOTE_FILE_SUFFIX = ".quotes.json.gz"
+GZIP_LEVEL = 6
+
+# 시각 / 소요시간을 알 수 없을 때의 값
+UNKNOWN = -1
+
+# 가격 문자열에서 지울 문자 ("₩223,500" / "223,500원" -> "223500")
+_PRICE_STRIP = str.maketrans('', '', '₩,원 ')
+_DURATION_PATTERN = re.compile(r'^(?:(\d+)\s*시간)?\s*(?:(\d+)\s*분)?$')
+
+
+def parse_fare(value):
+    """총요금 (원) 정수: 123400 / "123,400원" / "₩123,400" -> 123400
+
+    요금이 없거나 0 이면 None, 형식이 잘못되면 ValueError.
+    """
+    if isinstance(value, str):
+        value = value.translate(_PRICE_STRIP)
+        if not value:
+            return None
+        value = int(value)
+    elif isinstance(value, float):
+        if value != value or value in (float('inf'), float('-inf')):
+            return None
+        value = int(value)
+    elif not isinstance(value, int):
+        return None
+    return value or None
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """"2025-12-09" / "20251209" -> date.toordinal() (형식이 잘못되면 ValueError)"""
+    digits = value.replace('-', '')
+    if len(digits) != 8 or not digits.isdigit():
+        raise ValueError(f"날짜 형식 오류: {value!r}")
+    return date(int(digits[:4]), int(digits[4:6]), int(digits[6:])).toordinal()
+
+
+def parse_clock(value):
+    """"07:20" / "0720" -> 자정부터의 분 (알 수 없으면 UNKNOWN)"""
+    if not isinstance(value, str):
+        return UNKNOWN
+    digits = value.replace(':', '')
+    if len(digits) != 4 or not digits.isdigit():
+        return UNKNOWN
+    return int(digits[:2]) * 60 + int(digits[2:])
+
+
+def parse_minutes(value):
+    """125 / "125분" / "2시간 5분" -> 125 (알 수 없으면 UNKNOWN)"""
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return UNKNOWN
+    match = _DURATION_PATTERN.match(value.strip())
+    if not match or not any(match.groups()):
+        return UNKNOWN
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def format_clock(minutes, missing=''):
+    """자정부터의 분 -> "07:20" """
+    if minutes < 0:
+        return missing
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_minutes(minutes, missing=''):
+    """분 -> "125분" """
+    return missing if minutes < 0 else f"{minutes}분"
+
+
+def format_fare(fare):
+    """원 단위 정수 -> "123,400원" """
+    return f"{fare:,}원"
+
+
+def _text(value):
+    """항공편 번호 / 판매처 코드: 같은 문자열은 하나만 보관"""
+    if not value or not isinstance(value, str) or value == 'N/A':
+        return ''
+    return sys.intern(value)
+
+
+def _count(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class FlightQuote:
+    """왕복 항공편 견적 하나
+
+    dict 대신 __slots__ 정수 필드로 보관하므로 견적 하나가 기존 flight_info dict 보다
+    몇 배 작고, 정렬·중복 제거는 문자열을 다시 해석하지 않고 정수 비교로 한다.
+    """
+
+    __slots__ = (
+        'departure',           # 출발일 (date.toordinal)
+        'return_',             # 복귀일 (date.toordinal)
+        'fare',                # 총요금 (원)
+        'rank',                # 검색 응답 안의 순위 (모르면 0)
+        'outbound_flight',
+        'return_flight',
+        'outbound_departure',  # 가는편 출발 (자정부터의 분)
+        'outbound_arrival',
+        'outbound_duration',   # 가는편 소요시간 (분)
+        'return_departure',
+        'return_arrival',
+        'return_duration',
+        'outbound_stops',
+        'return_stops',
+        'partner_code',
+    )
+
+    def __init__(self, departure, return_, fare, rank=0, outbound_flight='', return_flight='',
+                 outbound_departure=UNKNOWN, outbound_arrival=UNKNOWN, outbound_duration=UNKNOWN,
+                 return_departure=UNKNOWN, return_arrival=UNKNOWN, return_duration=UNKNOWN,
+                 outbound_stops=0, return_stops=0, partner_code=''):
+        self.departure = departure
+        self.return_ = return_
+        self.fare = fare
+        self.rank = rank
+        self.outbound_flight = outbound_flight
+        self.return_flight = return_flight
+        self.outbound_departure = outbound_departure
+        self.outbound_arrival = outbound_arrival
+        self.outbound_duration = outbound_duration
+        self.return_departure = return_departure
+        self.return_arrival = return_arrival
+        self.return_duration = return_duration
+        self.outbound_stops = outbound_stops
+        self.return_stops = return_stops
+        self.partner_code = partner_code
+
+    @classmethod
+    def from_mcp(cls, flight):
+        """search_naver_flights JSON 결과의 항공편 (camelCase) -> FlightQuote (요금이 없으면 None)"""
+        fare = parse_fare(flight.get('totalFare'))
+        if fare is None:
+            return None
+        return cls(
+            parse_date(flight['departureDate']),
+            parse_date(flight['returnDate']),
+            fare,
+            _count(flight.get('rank')),
+            _text(flight.get('outboundFlight')),
+            _text(flight.get('returnFlight')),
+            parse_clock(flight.get('outboundDeparture')),
+            parse_clock(flight.get('outboundArrival')),
+            parse_minutes(flight.get('outboundDuration')),
+            parse_clock(flight.get('returnDeparture')),
+            parse_clock(flight.get('returnArrival')),
+            parse_minutes(flight.get('returnDuration')),
+            _count(flight.get('outboundStops')),
+            _count(flight.get('returnStops')),
+            _text(flight.get('partnerCode')),
+        )
+
+    @classmethod
+    def from_flight_info(cls, flight_info, departure_date=None, return_date=None):
+        """flight_search_naver.py 의 flight_info dict -> FlightQuote (요금이 없으면 None)
+
+        departure_date / return_date 를 주면 flight_info 안의 날짜 대신 쓴다.
+        요금 / 날짜 형식이 잘못되면 ValueError.
+        """
+        fare = parse_fare(flight_info.get('total_fare') or flight_info.get('total_price'))
+        if fare is None:
+            return None
+        departure_date = departure_date or flight_info.get('departure_date')
+        return_date = return_date or flight_info.get('return_date')
+        if not departure_date or not return_date:
+            raise ValueError("출발일 / 복귀일 없음")
+        return cls(
+            parse_date(departure_date),
+            parse_date(return_date),
+            fare,
+            _count(flight_info.get('rank')),
+            _text(flight_info.get('outbound_flight')),
+            _text(flight_info.get('return_flight')),
+            parse_clock(flight_info.get('outbound_departure')),
+            parse_clock(flight_info.get('outbound_arrival')),
+            parse_minutes(flight_info.get('outbound_duration')),
+            parse_clock(flight_info.get('return_departure')),
+            parse_clock(flight_info.get('return_arrival')),
+            parse_minutes(flight_info.get('return_duration')),
+            _count(flight_info.get('outbound_stops')),
+            _count(flight_info.get('return_stops')),
+            _text(flight_info.get('partner_code')),
+        )
+
+    @classmethod
+    def from_result(cls, result):
+        """검색 결과 항목 {'departure_date', 'return_date', 'flight_info'} 의 최저가 항공편"""
+        return cls.from_flight_info(result.get('flight_info') or {},
+                                    result['departure_date'], result['return_date'])
+
+    @property
+    def key(self):
+        """(출발일, 복귀일) 조합 키 (ordinal)"""
+        return (self.departure, self.return_)
+
+    @property
+    def departure_date(self):
+        return date.fromordinal(self.departure).isoformat()
+
+    @property
+    def return_date(self):
+        return date.fromordinal(self.return_).isoformat()
+
+    @property
+    def stay_days(self):
+        return self.return_ - self.departure + 1
+
+    @property
+    def total_price(self):
+        return format_fare(self.fare)
+
+    def to_flight_info(self):
+        """기존 flight_info dict 형식 (저널 / 결과 파일 / 화면 출력용)"""
+        return {
+            'rank': self.rank,
+            'departure_date': self.departure_date,
+            'return_date': self.return_date,
+            'outbound_flight': self.outbound_flight,
+            'return_flight': self.return_flight,
+            'total_price': self.total_price,
+            'total_fare': self.fare,
+            'outbound_departure': format_clock(self.outbound_departure),
+            'outbound_arrival': format_clock(self.outbound_arrival),
+            'outbound_duration': format_minutes(self.outbound_duration),
+            'return_departure': format_clock(self.return_departure),
+            'return_arrival': format_clock(self.return_arrival),
+            'return_duration': format_minutes(self.return_duration),
+            'outbound_stops': self.outbound_stops,
+            'return_stops': self.return_stops,
+            'partner_code': self.partner_code,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, FlightQuote):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"FlightQuote({self.departure_date}~{self.return_date} {self.outbound_flight or '?'}"
+                f"/{self.return_flight or '?'} {self.total_price})")
+
+
+QUOTE_FIELDS = FlightQuote.__slots__
+
+
+def quotes_from_results(results):
+    """search_flights_naver 결과 항목들의 순위별 전체 항공편 (요금 없는 항공편은 제외)"""
+    for result in results:
+        flight_info = result.get('flight_info') or {}
+        for flight in flight_info.get('ranked_flights') or [flight_info]:
+            try:
+                quote = FlightQuote.from_flight_info(
+                    flight,
+                    flight.get('departure_date') or result['departure_date'],
+                    flight.get('return_date') or result['return_date'],
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+            if quote is not None:
+                yield quote
+
+
+def encode_quotes(quotes, **meta):
+    """견적 목록 -> 압축 JSON 문서 (필드 이름은 한 번만, 각 견적은 정수 위주의 배열 한 줄)"""
+    document = {'format': QUOTE_FORMAT, 'version': QUOTE_FORMAT_VERSION}
+    document.update(meta)
+    document['fields'] = list(QUOTE_FIELDS)
+    document['rows'] = [[getattr(quote, name) for name in QUOTE_FIELDS] for quote in quotes]
+    return document
+
+
+def decode_quotes(document):
+    """encode_quotes 문서 -> (견적 목록, 메타데이터)
+
+    필드 순서가 다른 문서도 이름으로 맞춰 읽는다 (없는 필드는 기본값).
+    """
+    if not isinstance(document, dict) or document.get('format') != QUOTE_FORMAT:
+        raise ValueError("견적 파일 형식이 아닙니다")
+    if document.get('version') != QUOTE_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 견적 파일 버전: {document.get('version')}")
+    fields = document.get('fields') or []
+    meta = {key: value for key, value in document.items() if key not in ('fields', 'rows')}
+
+    if list(fields) == list(QUOTE_FIELDS):
+        quotes = [FlightQuote(*row) for row in document.get('rows') or []]
+    else:
+        columns = [name for name in fields if name in QUOTE_FIELDS]
+        positions = [fields.index(name) for name in columns]
+        quotes = [FlightQuote(**{name: row[position] for name, position in zip(columns, positions)})
+                  for row in document.get('rows') or []]
+    for quote in quotes:
+        quote.outbound_flight = sys.intern(quote.outbound_flight)
+        quote.return_flight = sys.intern(quote.return_flight)
+        quote.partner_code = sys.intern(quote.partner_code)
+    return quotes, meta
+
+
+def dump_quotes(quotes, path, **meta):
+    """견적 목록을 파일로 저장 (.gz 로 끝나면 gzip 압축) - 저장한 견적 수를 반환"""
+    document = encode_quotes(quotes, **meta)
+    data = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if path.endswith('.gz'):
+        # 반복이 많은 정수 배열이라 기본 압축 수준(9)보다 훨씬 빠르고 크기 차이는 작다
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(document['rows'])
+
+
+def load_quotes(path):
+    """dump_quotes 파일 -> (견적 목록, 메타데이터)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.gz'):
+        data = gzip.decompress(data)
+    return decode_quotes(json.loads(data))
+
+
+def is_quote_file(path):
+    return path.endswith(QUOTE_FILE_SUFFIX) or path.endswith('.quotes.json')
@@ -7,268 +7,2162 @@
 import json
 import sys
 import argparse
+import csv
 from datetime import datetime, timedelta
 import subprocess
 import os
 import time
+import atexit
+import contextlib
+import glob
+import heapq
+import itertools
+import math
+import queue
+import signal
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from flight_quote import QUOTE_FILE_SUFFIX, dump_quotes, parse_fare, quotes_from_results
 
 # UTF-8 인코딩 설정
 sys.stdout.reconfigure(encoding='utf-8')
 
-def parse_price(price_str):
-    """가격 문자열에서 숫자 추출"""
-    if not price_str or not isinstance(price_str, str):
-        return float('inf')
-    try:
-        return int(price_str.replace('₩', '').replace(',', '').replace('원', ''))
-    except ValueError:
-        return float('inf')
+# MCP 서버 실행 설정
+MCP_SERVER_COMMAND = ["node", "dist/index.js"]
+MCP_PROTOCOL_VERSION = "2024-11-05"
+MCP_INIT_TIMEOUT = 15  # initialize 핸드셰이크 대기 (초)
+MCP_CALL_TIMEOUT = 30  # tools/call 응답 대기 (초)
+MCP_DEADLINE_GRACE = 2  # 서버 검색 제한 시간을 응답 대기보다 이만큼(초) 짧게 (중단 후 응답이 도착할 여유)
+MCP_PING_TIMEOUT = 5  # 헬스 체크 응답 대기 (초)
+MCP_HEALTH_CHECK_INTERVAL = 60  # 이 시간(초) 이상 쉰 프로세스는 사용 전에 ping
 
-def call_naver_flight_mcp(departure, arrival, departure_date, return_date, airlines=None):
-    """네이버 항공권 MCP 호출"""
-    try:
-        print(f"네이버 항공권 검색: {departure} → {arrival}")
-        print(f"출발일: {departure_date}, 복귀일: {return_date}")
-        
-        # Node MCP 서버 실행
-        process = subprocess.Popen(
-            ["node", "dist/index.js"],
+# 날짜 스윕 기본값
+DEFAULT_CONCURRENCY = 2  # 동시에 진행할 검색 수
+DEFAULT_SEARCH_RATE = 1 / 3  # 초당 검색 시작 횟수 (기존 3초 간격과 동일)
+MAX_OPEN_RETURN_DAYS = 7  # 서버의 openReturnDays 상한과 같음
+DEFAULT_PRUNE_SLACK = 0.1  # 대략 가격이 k번째 최저가보다 이 비율 이상 비싸야 정밀 검색을 생략
+DEFAULT_HISTORY_PATH = "naver_flight_history.sqlite3"  # flight_price_history 의 기본 저장소와 같음
+DEFAULT_RESCAN_BUDGET = 20  # 증분 재검색 한 번에 다시 검색할 조합 수
+RESCAN_LOOKBACK_DAYS = 14  # 변동률을 계산할 관측 기간
+RESCAN_PRIOR_HOURS = 24  # 관측이 적을 때 변동률 보정 (하루 한 번 변동으로 가정)
+RESCAN_URGENCY_DAYS = 14  # 출발이 이 일수 이내면 우선순위 가중
+RESCAN_TOP_K_BAND = 0.2  # k번째 최저가보다 이 비율 이내로 비싸면 상위 k 근접으로 봄
+MAX_VIA_COUNT = 2  # 서버의 maxVia 상한과 같음
+MAX_UPSTREAM_LIMIT = 200  # 서버의 limit 상한(기본값)과 같음
+DEFAULT_REPLAY_SPEED = 10  # --replay 기본 배속
+
+class MCPWorkerError(Exception):
+    """MCP 서버 프로세스가 종료되었거나 응답할 수 없는 상태"""
+
+
+class MCPRequestError(Exception):
+    """MCP 서버가 JSON-RPC 오류 응답을 반환한 경우"""
+
+
+class DeadlineExceeded(Exception):
+    """스윕 시간 예산 또는 검색 제한 시간 안에 검색을 끝내지 못한 경우"""
+
+
+class SearchFailed(Exception):
+    """서버 / 업스트림 오류나 응답 파싱 실패로 검색 결과를 알 수 없는 경우 (결과 없음과 구분)"""
+
+
+class _PendingCall:
+    """응답 대기 중인 JSON-RPC 요청"""
+    __slots__ = ('event', 'response')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+    def resolve(self, response):
+        self.response = response
+        self.event.set()
+
+
+class MCPWorker:
+    """상주 MCP 서버 프로세스 하나와의 stdio JSON-RPC 세션"""
+
+    def __init__(self, command=None, cwd=None, env=None):
+        self.command = command or MCP_SERVER_COMMAND
+        self.cwd = cwd or os.getcwd()
+        self.env = env
+        self.process = None
+        self.last_used = 0.0
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stderr_tail = deque(maxlen=50)
+
+    def start(self):
+        """서버 프로세스를 띄우고 initialize 핸드셰이크 수행"""
+        self.process = subprocess.Popen(
+            self.command,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
             encoding='utf-8',
             errors='replace',
-            cwd=os.getcwd()
+            bufsize=1,
+            cwd=self.cwd,
+            env=self.env
         )
+        threading.Thread(target=self._read_stdout, args=(self.process,), daemon=True).start()
+        threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+
+        try:
+            self.request("initialize", {
+                "protocolVersion": MCP_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "flight_search_naver", "version": "0.1.0"}
+            }, timeout=MCP_INIT_TIMEOUT)
+            self.notify("notifications/initialized")
+        except Exception:
+            self.close()
+            raise
+        self.last_used = time.monotonic()
+        return self
+
+    def _read_stdout(self, process):
+        """stdout에서 JSON-RPC 응답을 읽어 id로 대기 중인 요청에 전달"""
+        for line in process.stdout:
+            line = line.strip()
+            # 서버의 console.log 출력도 stdout으로 섞여 나오므로 JSON-RPC 메시지만 처리
+            if not line.startswith('{') or '"jsonrpc"' not in line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'id' not in message:
+                continue
+            with self._pending_lock:
+                pending = self._pending.pop(message['id'], None)
+            if pending:
+                pending.resolve(message)
+
+        # 프로세스 종료: 대기 중인 요청을 모두 실패 처리
+        with self._pending_lock:
+            pending_calls = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_calls:
+            pending.resolve(None)
+
+    def _drain_stderr(self, process):
+        """stderr 파이프가 가득 차 서버가 멈추지 않도록 계속 비움 (최근 로그만 보관)"""
+        for line in process.stderr:
+            self._stderr_tail.append(line.rstrip())
+
+    def _send(self, message):
+        data = json.dumps(message, ensure_ascii=False) + "\n"
+        try:
+            with self._write_lock:
+                self.process.stdin.write(data)
+                self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise MCPWorkerError(f"MCP 서버에 요청을 보낼 수 없습니다: {e}")
+
+    def notify(self, method, params=None):
+        """응답이 없는 JSON-RPC 알림 전송"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._send(message)
+
+    def request(self, method, params=None, timeout=MCP_CALL_TIMEOUT):
+        """JSON-RPC 요청을 보내고 같은 id의 응답을 기다림"""
+        if not self.is_alive():
+            raise MCPWorkerError(f"MCP 서버 프로세스가 종료되었습니다 ({self.stderr_tail()})")
+
+        request_id = next(self._ids)
+        pending = _PendingCall()
+        with self._pending_lock:
+            self._pending[request_id] = pending
+
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+
+        try:
+            self._send(message)
+            if not pending.event.wait(timeout):
+                # 서버가 진행 중인 업스트림 요청과 재시도를 멈추도록 취소 알림 (initialize 는 취소할 수 없음)
+                if method != "initialize":
+                    try:
+                        self.notify("notifications/cancelled",
+                                    {"requestId": request_id, "reason": f"{timeout}초 응답 대기 초과"})
+                    except MCPWorkerError:
+                        pass
+                raise TimeoutError(f"MCP 응답 대기 시간 초과 ({timeout}초): {method}")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            self.last_used = time.monotonic()
+
+        response = pending.response
+        if response is None:
+            raise MCPWorkerError(f"MCP 서버 프로세스가 종료되었습니다 ({self.stderr_tail()})")
+        if 'error' in response:
+            error = response['error'] or {}
+            raise MCPRequestError(f"{error.get('code')}: {error.get('message')}")
+        return response.get('result')
+
+    def ping(self, timeout=MCP_PING_TIMEOUT):
+        """헬스 체크 (MCP ping)"""
+        try:
+            self.request("ping", timeout=timeout)
+            return True
+        except (MCPWorkerError, MCPRequestError, TimeoutError):
+            return False
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stderr_tail(self, lines=5):
+        return ' | '.join(list(self._stderr_tail)[-lines:])
+
+    def close(self):
+        """서버 프로세스 종료"""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.kill()
+
+
+class MCPSessionPool:
+    """워밍된 MCP 서버 프로세스 풀
+
+    프로세스마다 initialize 핸드셰이크는 한 번만 수행하고, 이후 tools/call 요청은
+    같은 stdio 파이프로 id를 증가시키며 보낸다. 죽었거나 헬스 체크에 실패한
+    프로세스는 다시 띄운다.
+    """
+
+    def __init__(self, size=1, command=None, cwd=None, env=None,
+                 health_check_interval=MCP_HEALTH_CHECK_INTERVAL):
+        self.size = max(1, size)
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.health_check_interval = health_check_interval
+        self.restart_count = 0
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        with profile_phase('spawn'):
+            worker = MCPWorker(self.command, self.cwd, self.env).start()
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _restart(self, worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.restart_count += 1
+        worker.close()
+        print("MCP 서버 프로세스 재시작")
+        return self._spawn()
+
+    def _acquire(self):
+        worker = self._idle.get()
+        try:
+            idle_time = time.monotonic() - worker.last_used
+            if not worker.is_alive() or (idle_time > self.health_check_interval and not worker.ping()):
+                worker = self._restart(worker)
+        except Exception:
+            # 재시작에 실패해도 풀 크기는 유지 (다음 요청에서 다시 시도)
+            self._idle.put(worker)
+            raise
+        return worker
+
+    def call_tool(self, name, arguments, timeout=MCP_CALL_TIMEOUT):
+        """tools/call 요청 실행"""
+        if self._closed:
+            raise MCPWorkerError("MCP 세션 풀이 종료되었습니다")
+
+        worker = self._acquire()
+        try:
+            return worker.request("tools/call", {"name": name, "arguments": arguments}, timeout=timeout)
+        except (MCPWorkerError, TimeoutError) as error:
+            # 타임아웃이면 취소 알림을 보냈으므로 ping 에 응답하는 프로세스는 그대로 쓰고,
+            # 죽었거나 응답하지 않는 프로세스만 교체
+            if isinstance(error, MCPWorkerError) or not worker.ping():
+                try:
+                    worker = self._restart(worker)
+                except Exception as e:
+                    print(f"MCP 서버 재시작 실패: {e}")
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """모든 서버 프로세스 종료"""
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+def client_rate_limited_env(rate):
+    """클라이언트가 토큰 버킷(초당 rate 회)으로 속도를 제한할 때 MCP 서버에 넘길 환경 변수
+
+    서버의 최소 검색 간격을 토큰 버킷 간격에 맞춰 두 대기가 겹치지 않게 한다. 속도 제어 상태는
+    같은 호스트의 다른 MCP 서버와 함께 쓰므로 429 / 타임아웃에 따른 감속은 서로에게 전해지고,
+    이 서버들이 공용 간격을 클라이언트 속도보다 짧게 줄이지도 않는다.
+    rate 가 0 이하(제한 없음)이면 서버 기본 설정을 그대로 쓴다.
+    """
+    if rate <= 0:
+        return dict(os.environ)
+    interval_ms = str(math.ceil(1000 / rate))
+    return dict(os.environ,
+                NAVER_FLIGHT_MIN_SEARCH_INTERVAL_MS=interval_ms,
+                NAVER_FLIGHT_INITIAL_SEARCH_INTERVAL_MS=interval_ms)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_mcp_pool(size=1, env=None):
+    """공유 MCP 세션 풀 (처음 호출 시 생성)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = MCPSessionPool(size=size, env=env)
+        return _default_pool
+
+
+def close_mcp_pool():
+    """공유 MCP 세션 풀 종료"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+            _default_pool = None
+
+
+atexit.register(close_mcp_pool)
+
+
+_price_history = None
+
+
+def open_price_history(path):
+    """가격 이력 저장소 열기 (이후 검색 결과를 관측 시각과 함께 기록)"""
+    global _price_history
+    from flight_price_history import PriceHistory
+    _price_history = PriceHistory(path)
+    return _price_history
+
+
+def close_price_history():
+    """가격 이력 저장소 닫기"""
+    global _price_history
+    if _price_history is not None:
+        _price_history.close()
+        _price_history = None
+
+
+def record_price_history(origin, destination, entry):
+    """결과가 있는 저널 항목을 가격 이력에 기록 (저장소를 열지 않았으면 무시)"""
+    if _price_history is None or entry['status'] != 'ok':
+        return
+    try:
+        _price_history.record_result(origin, destination, entry, airlines=entry.get('airlines'))
+    except Exception as e:
+        print(f"⚠️ 가격 이력 기록 실패: {type(e).__name__}: {e}")
+
+
+def parse_time_window(value):
+    """--outbound-time / --return-time 값 해석: "06:00-12:00", "0600-1200" -> "06:00-12:00"
+
+    시작이 끝보다 늦으면 ("22:00-02:00") 자정을 넘는 범위로 본다.
+    """
+    try:
+        start, end = (part.strip().replace(':', '') for part in str(value).split('-', 1))
+        times = []
+        for part in (start, end):
+            if not part.isdigit() or len(part) not in (3, 4):
+                raise ValueError
+            hour, minute = int(part[:-2]), int(part[-2:])
+            if hour > 24 or minute > 59:
+                raise ValueError
+            times.append(f"{hour:02d}:{minute:02d}")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"시각 범위 형식이 올바르지 않습니다: {value} (예: 06:00-12:00)")
+    return '-'.join(times)
+
+
+def search_filter_args(params):
+    """검색 조건(params)에서 서버의 업스트림 필터 인자만 뽑아 search_naver_flights 인자로 변환"""
+    names = {
+        'outbound_time': 'outboundDepartureTime',
+        'return_time': 'returnDepartureTime',
+        'max_duration': 'maxDurationMinutes',
+        'max_fare': 'maxFare',
+        'max_via': 'maxVia',
+        'limit': 'limit',
+    }
+    return {arg: params[key] for key, arg in names.items() if params.get(key) is not None}
+
+
+class SearchProfiler:
+    """검색 단계별 소요 시간과 카운터 (--profile 로 요약 출력, --trace 로 호출마다 JSON 한 줄 기록)
+
+    클라이언트 단계(spawn, rate_wait, mcp_call, parse)와 서버가 결과에 담아 보낸
+    단계(server.*)를 같은 요청 id 로 묶는다.
+    """
+
+    def __init__(self, trace_path=None):
+        self.started = time.perf_counter()
+        self._phases = {}  # 단계 -> [횟수, 합계(초), 최대(초)]
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, 'a', encoding='utf-8') if trace_path else None
+
+    def record(self, phase, seconds):
+        with self._lock:
+            stats = self._phases.setdefault(phase, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def record_call(self, request_id, client_phases, server_timings=None, **fields):
+        """MCP 호출 하나의 단계별 시간 기록 (서버 단계는 server. 접두사)"""
+        for phase, seconds in client_phases.items():
+            self.record(phase, seconds)
+        server_phases = (server_timings or {}).get('phases') or {}
+        for phase, ms in server_phases.items():
+            self.record(f"server.{phase}", ms / 1000)
+        if self._trace:
+            line = json.dumps({
+                'type': 'call',
+                'request_id': request_id,
+                **fields,
+                'client_ms': {phase: round(seconds * 1000, 3) for phase, seconds in client_phases.items()},
+                'server_ms': server_phases,
+                'server_total_ms': (server_timings or {}).get('totalMs'),
+            }, ensure_ascii=False)
+            with self._lock:
+                self._trace.write(line + '\n')
+                self._trace.flush()
+
+    def report(self):
+        """단계별 소요 시간 표 출력"""
+        wall = time.perf_counter() - self.started
+        with self._lock:
+            phases = sorted(self._phases.items(), key=lambda item: -item[1][1])
+            counters = dict(self._counters)
+        print(f"\n=== 단계별 소요 시간 (전체 {wall:.1f}초) ===")
+        print("| 단계 | 횟수 | 합계(초) | 평균(ms) | 최대(ms) | 비율 |")
+        print("| --- | -- | ---- | ---- | ---- | -- |")
+        for phase, (count, total, longest) in phases:
+            share = total / wall if wall else 0
+            print(f"| {phase} | {count} | {total:.2f} | {total / count * 1000:.1f} | "
+                  f"{longest * 1000:.1f} | {share:.0%} |")
+        if counters:
+            print("카운터: " + ", ".join(f"{name} {value}" for name, value in sorted(counters.items())))
+        print("(동시 검색 중에는 단계 합계가 전체 시간보다 클 수 있음)")
+
+    def close(self):
+        if self._trace:
+            self._trace.close()
+            self._trace = None
+
+
+_profiler = None
+
+
+def open_profiler(trace_path=None):
+    """단계별 시간 측정 시작"""
+    global _profiler
+    _profiler = SearchProfiler(trace_path)
+    return _profiler
+
+
+def close_profiler(report=False):
+    """측정 종료 (report 이면 단계별 요약 출력)"""
+    global _profiler
+    if _profiler is not None:
+        if report:
+            _profiler.report()
+        _profiler.close()
+        _profiler = None
+
+
+@contextlib.contextmanager
+def profile_phase(phase):
+    """측정 중이면 블록의 소요 시간을 phase 로 기록"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _profiler is not None:
+            _profiler.record(phase, time.perf_counter() - started)
+
+
+def profile_record(phase, seconds):
+    if _profiler is not None:
+        _profiler.record(phase, seconds)
+
+
+def profile_count(name, n=1):
+    if _profiler is not None:
+        _profiler.count(name, n)
+
+
+def time_left(deadline):
+    """마감 시각(time.monotonic() 기준)까지 남은 초 (마감이 없으면 무한대)"""
+    return float('inf') if deadline is None else deadline - time.monotonic()
+
+
+def deadline_spent(deadline):
+    """남은 시간이 검색 한 번(서버 최소 제한 시간 1초 + 응답 여유)에 못 미치는지"""
+    return time_left(deadline) < MCP_DEADLINE_GRACE + 1
+
+
+def call_naver_flight_mcp(departure, arrival, departure_date, return_date, airlines=None, pool=None, top_k=None,
+                          open_return_days=0, coarse=False, usage=None, filters=None, deadline=None):
+    """네이버 항공권 MCP 호출 (상주 MCP 세션 풀 사용)
+
+    usage 에 dict 를 넘기면 서버가 알려준 업스트림 요청 수(upstream_requests)와
+    검색 상태(search_status)를 채운다. filters 는 search_filter_args 가 만든 업스트림 필터 인자이다.
+    요청마다 id 를 붙여 서버의 단계별 시간과 클라이언트 쪽 시간을 묶는다.
+
+    응답 대기는 MCP_CALL_TIMEOUT 과 deadline(time.monotonic() 기준 마감 시각)까지 남은 시간 중 짧은 쪽이며,
+    서버에는 그보다 MCP_DEADLINE_GRACE 만큼 짧은 timeoutMs 를 넘겨 재시도와 대기가 그 안에서 끝나게 한다.
+    제한 시간에 걸리면 usage['deadline_exceeded'] 가 참이 된다.
+
+    None 은 검색은 성공했지만 항공편이 없다는 뜻이다. MCP 서버 오류, 전송 오류, 업스트림 오류,
+    응답 파싱 실패는 예외로 알려 호출 측이 'error' 로 기록하고 이어서 검색할 때 다시 검색하게 한다.
+    """
+    request_id = uuid.uuid4().hex[:12]
+    usage = usage if usage is not None else {}
+    phases = {}
+    call_timeout = min(MCP_CALL_TIMEOUT, time_left(deadline))
+    if deadline_spent(deadline):
+        usage['deadline_exceeded'] = True
+        print(f"시간 예산이 남지 않아 검색을 건너뜁니다: {departure_date} → {return_date}")
+        return None
+    try:
+        print(f"네이버 항공권 검색: {departure} → {arrival}")
+        print(f"출발일: {departure_date}, 복귀일: {return_date}")
         
         # JSON-RPC 요청 구성
         request_args = {
             "departure": departure,
             "arrival": arrival,
             "departureDate": departure_date,
-            "returnDate": return_date
+            "returnDate": return_date,
+            "format": "json",
+            "requestId": request_id,
+            "timeoutMs": int((call_timeout - MCP_DEADLINE_GRACE) * 1000)
         }
         
         # 항공사 정보가 있으면 추가
         if airlines and len(airlines) > 0:
             request_args["airlines"] = airlines
-            
-        request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {
-                "name": "search_naver_flights",
-                "arguments": request_args
-            }
-        }
+        if top_k:
+            request_args["topK"] = top_k
+        if open_return_days:
+            request_args["openReturnDays"] = open_return_days
+        if coarse:
+            request_args["coarse"] = True
+        if filters:
+            request_args.update(filters)
         
-        # 요청 전송
-        request_json = json.dumps(request) + "\n"
-        stdout, stderr = process.communicate(input=request_json, timeout=30)
+        pool = pool or get_mcp_pool()
+        started = time.perf_counter()
+        try:
+            result = pool.call_tool("search_naver_flights", request_args, timeout=call_timeout)
+        finally:
+            phases['mcp_call'] = time.perf_counter() - started
         
-        if process.returncode != 0:
-            print(f"MCP 서버 오류 (return code: {process.returncode})")
-            if stderr:
-                print(f"에러 메시지: {stderr}")
-            return None
+        started = time.perf_counter()
+        content = (result or {}).get("content") or []
+        if not content or "text" not in content[0]:
+            raise SearchFailed("응답에 검색 결과가 없습니다")
+        text = content[0]["text"]
+        if result.get("isError"):
+            raise SearchFailed(text.split('\n', 1)[0])
+        # 구조화된 JSON 응답 (구버전 서버는 텍스트로 응답하므로 텍스트 파싱으로 대체)
+        if text.lstrip().startswith('{'):
+            flight_info = parse_mcp_json_response(text, usage)
+        else:
+            flight_info = parse_mcp_response(text)
+        phases['parse'] = time.perf_counter() - started
+        if flight_info is None:
+            profile_count('empty_results')
+        return flight_info
         
-        # 응답 파싱 - 마지막 JSON 라인만 추출
-        try:
-            lines = stdout.strip().split('\n')
-            json_line = None
-            
-            # 마지막 JSON 라인 찾기
-            for line in reversed(lines):
-                if line.strip().startswith('{') and '"jsonrpc"' in line:
-                    json_line = line.strip()
-                    break
-            
-            if not json_line:
-                print(f"JSON 응답을 찾을 수 없음")
-                print(f"응답 내용: {stdout}")
-                return None
-                
-            response = json.loads(json_line)
-            if "result" in response and "content" in response["result"]:
-                content = response["result"]["content"]
-                if content and len(content) > 0 and "text" in content[0]:
-                    # 텍스트 응답을 파싱하여 구조화된 데이터로 변환
-                    return parse_mcp_response(content[0]["text"])
-            return None
-        except json.JSONDecodeError as e:
-            print(f"JSON 파싱 오류: {e}")
-            print(f"JSON 라인: {json_line}")
-            return None
-        
-    except subprocess.TimeoutExpired:
-        print("MCP 호출 타임아웃 (30초)")
-        process.kill()
+    except TimeoutError:
+        profile_count('mcp_timeouts')
+        usage['deadline_exceeded'] = True
+        print(f"MCP 호출 타임아웃 ({call_timeout:.0f}초)")
         return None
+    except MCPWorkerError as e:
+        profile_count('mcp_errors')
+        print(f"MCP 서버 오류: {e}")
+        raise
     except Exception as e:
+        profile_count('mcp_errors')
         print(f"MCP 호출 오류: {e}")
+        raise
+    finally:
+        if _profiler is not None:
+            _profiler.count('searches')
+            _profiler.count('upstream_requests', usage.get('upstream_requests', 0))
+            _profiler.record_call(request_id, phases, usage.get('timings'),
+                                  departure_date=departure_date, return_date=return_date)
+
+def _format_hhmm(time_str):
+    """"0720" -> "07:20" """
+    if isinstance(time_str, str) and len(time_str) == 4:
+        return f"{time_str[:2]}:{time_str[2:]}"
+    return time_str or ''
+
+
+def _legacy_flight_info(flight):
+    """search_naver_flights JSON 결과의 항공편을 기존 flight_info 형식으로 변환"""
+    return {
+        'rank': flight.get('rank'),
+        'departure_date': flight.get('departureDate', ''),
+        'return_date': flight.get('returnDate', ''),
+        'outbound_flight': flight.get('outboundFlight', ''),
+        'return_flight': flight.get('returnFlight', ''),
+        'total_price': f"{flight.get('totalFare', 0):,}원",
+        'total_fare': flight.get('totalFare', 0),
+        'outbound_departure': _format_hhmm(flight.get('outboundDeparture')),
+        'outbound_arrival': _format_hhmm(flight.get('outboundArrival')),
+        'outbound_duration': f"{flight.get('outboundDuration', 0)}분",
+        'return_departure': _format_hhmm(flight.get('returnDeparture')),
+        'return_arrival': _format_hhmm(flight.get('returnArrival')),
+        'return_duration': f"{flight.get('returnDuration', 0)}분",
+        'outbound_stops': flight.get('outboundStops', 0),
+        'return_stops': flight.get('returnStops', 0),
+        'partner_code': flight.get('partnerCode', '')
+    }
+
+
+def _with_ranked_flights(ranked_flights):
+    """최저가 항공편 정보에 순위별 전체 항공편 목록을 붙여 반환"""
+    if not ranked_flights:
         return None
+    flight_info = dict(ranked_flights[0])
+    flight_info['ranked_flights'] = ranked_flights
+    return flight_info
+
+
+def parse_mcp_json_response(response_text, usage=None):
+    """MCP 구조화된(JSON) 응답을 파싱 (최저가 항공편 + 순위별 전체 항공편)
+
+    항공편이 없으면 None, 응답이 깨졌거나 서버가 오류(error)를 알리면 SearchFailed.
+    """
+    try:
+        response = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise SearchFailed(f"응답 파싱 오류: {e}") from e
+
+    if usage is not None:
+        usage['upstream_requests'] = usage.get('upstream_requests', 0) + response.get('upstreamRequests', 0)
+        usage['search_status'] = response.get('searchStatus')
+        usage['timings'] = response.get('timings')
+        usage['deadline_exceeded'] = response.get('deadlineExceeded', False)
+
+    if not response.get('ok'):
+        message = (response.get('message') or '').split('\n', 1)[0]
+        if response.get('error'):
+            raise SearchFailed(message or "검색 오류")
+        if message:
+            print(f"검색 결과 없음: {message}")
+        return None
+
+    return _with_ranked_flights([_legacy_flight_info(flight) for flight in response.get('flights', [])])
+
+
+# 텍스트 응답의 필드명 -> flight_info 키
+_TEXT_FIELD_KEYS = {
+    "출발일": 'departure_date',
+    "복귀일": 'return_date',
+    "가는편": 'outbound_flight',
+    "오는편": 'return_flight',
+    "총요금": 'total_price',
+    "가는편 출발": 'outbound_departure',
+    "가는편 도착": 'outbound_arrival',
+    "오는편 출발": 'return_departure',
+    "오는편 도착": 'return_arrival',
+}
+
 
 def parse_mcp_response(response_text):
-    """MCP 응답 텍스트를 구조화된 데이터로 파싱"""
+    """MCP 응답 텍스트를 구조화된 데이터로 파싱 (최저가 항공편 + 순위별 전체 항공편, 깨진 응답은 SearchFailed)"""
     try:
-        lines = response_text.split('\n')
+        ranked_flights = []
         flight_data = {}
+        previous_key = None
         
-        for line in lines:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                if key == "순위":
-                    flight_data['rank'] = int(value)
-                elif key == "출발일":
-                    flight_data['departure_date'] = value
-                elif key == "복귀일":
-                    flight_data['return_date'] = value
-                elif key == "가는편":
-                    flight_data['outbound_flight'] = value
-                elif key == "오는편":
-                    flight_data['return_flight'] = value
-                elif key == "총요금":
-                    flight_data['total_price'] = value
-                elif key == "가는편 출발":
-                    flight_data['outbound_departure'] = value
-                elif key == "가는편 도착":
-                    flight_data['outbound_arrival'] = value
-                elif key == "소요시간" and "가는편" in lines[lines.index(line)-1]:
-                    flight_data['outbound_duration'] = value
-                elif key == "오는편 출발":
-                    flight_data['return_departure'] = value
-                elif key == "오는편 도착":
-                    flight_data['return_arrival'] = value
-                elif key == "소요시간" and "오는편" in lines[lines.index(line)-1]:
-                    flight_data['return_duration'] = value
-        
-        return flight_data if flight_data else None
+        for line in response_text.split('\n'):
+            if line.strip() == '---':
+                # 항공편 하나의 끝
+                if flight_data:
+                    ranked_flights.append(flight_data)
+                flight_data = {}
+                previous_key = None
+                continue
+            
+            if ':' not in line:
+                continue
+            key, value = line.split(':', 1)
+            key = key.strip()
+            value = value.strip()
+            
+            if key == "순위":
+                flight_data['rank'] = int(value)
+            elif key in _TEXT_FIELD_KEYS:
+                flight_data[_TEXT_FIELD_KEYS[key]] = value
+            elif key == "소요시간" and previous_key and previous_key.startswith("가는편"):
+                flight_data['outbound_duration'] = value
+            elif key == "소요시간" and previous_key and previous_key.startswith("오는편"):
+                flight_data['return_duration'] = value
+            previous_key = key
+        
+        if flight_data.get('rank') is not None:
+            ranked_flights.append(flight_data)
+        if not ranked_flights and "오류가 발생했습니다" in response_text:
+            # 구버전 서버는 업스트림 오류도 안내 문구로만 알린다
+            raise SearchFailed(response_text.strip().split('\n', 1)[0])
+        
+        for flight in ranked_flights:
+            if 'total_price' in flight:
+                try:
+                    flight['total_fare'] = parse_fare(flight['total_price'])
+                except ValueError:
+                    flight['total_fare'] = None
+        
+        return _with_ranked_flights(ranked_flights)
         
     except Exception as e:
-        print(f"응답 파싱 오류: {e}")
-        return None
+        raise SearchFailed(f"응답 파싱 오류: {e}") from e
+
+
+class TokenBucket:
+    """스레드 간 공유되는 토큰 버킷 (전역 검색 속도 제한)"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate  # 초당 토큰 수 (0 이하이면 제한 없음)
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 대기하고 대기한 시간(초)을 반환"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def journal_key(departure_date, return_date, airlines=None):
+    """저널 레코드를 구분하는 키 (출발일, 복귀일, 항공사)"""
+    return (departure_date, return_date, tuple(sorted(a.upper() for a in airlines or ())))
+
+
+def default_journal_path(params):
+    """검색 조건별 기본 저널 파일 경로 (필터가 있으면 필터별로 따로)"""
+    airlines = '-'.join(journal_key('', '', params.get('airlines'))[2])
+    filters = '_'.join(f"{key}{value}".replace(':', '').replace('-', '')
+                       for key, value in sorted(search_filter_args(params).items()))
+    return (f"{params['origin']}_{params['destination']}_naver_sweep_"
+            f"{params['start_date']}_{params['end_date']}_s{format_stay_days(params['stay_days'])}"
+            f"{'_' + airlines if airlines else ''}{'_' + filters if filters else ''}.jsonl")
+
+
+class SweepJournal:
+    """검색 결과를 한 줄씩 기록하는 JSONL 저널 (중단되어도 기록된 결과는 남음)
+
+    레코드마다 flush + fsync 하므로 프로세스가 죽어도 완료된 검색은 유실되지 않는다.
+    status 는 ok(결과 있음), empty(결과 없음), error(오류) 중 하나이다.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            # 마지막 줄이 쓰다 만 상태로 끝났으면 줄바꿈으로 끊어 둔다
+            # (한글 문자 중간에서 잘렸을 수 있으므로 바이트 단위로 확인)
+            with open(path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                        f.flush()
+                        os.fsync(f.fileno())
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, record):
+        """레코드 하나를 기록하고 디스크에 반영될 때까지 기다린다"""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    @staticmethod
+    def load(path):
+        """저널의 레코드를 키별 마지막 상태로 읽어온다 (깨진 줄은 건너뜀)"""
+        records = {}
+        if not os.path.exists(path):
+            return records
+        # 쓰다 만 줄은 UTF-8 문자 중간에서 끊겼을 수 있으므로 줄마다 따로 디코딩
+        with open(path, 'rb') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                    key = journal_key(record['departure_date'], record['return_date'], record.get('airlines'))
+                except (UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                records[key] = record
+        return records
+
+
+def parse_stay_days(value):
+    """--stay-days 값 해석: "5", "3-7"(범위), "3,5,7"(목록) -> 정렬된 체류일 목록"""
+    stay_days = set()
+    try:
+        for part in str(value).split(','):
+            part = part.strip()
+            if '-' in part:
+                low, high = (int(v) for v in part.split('-', 1))
+                stay_days.update(range(low, high + 1))
+            elif part:
+                stay_days.add(int(part))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"체류일 형식이 올바르지 않습니다: {value} (예: 5, 3-7, 3,5,7)")
+    if not stay_days or min(stay_days) < 2:
+        raise argparse.ArgumentTypeError(f"체류일은 2일 이상이어야 합니다: {value}")
+    return sorted(stay_days)
+
+
+def format_stay_days(stay_days):
+    """체류일 목록을 "5", "3-7", "3,5,7" 형태로 표시"""
+    if len(stay_days) > 1 and stay_days[-1] - stay_days[0] == len(stay_days) - 1:
+        return f"{stay_days[0]}-{stay_days[-1]}"
+    return ','.join(str(s) for s in stay_days)
+
+
+def build_search_grid(departure_dates, stay_days):
+    """(출발일, 복귀일) 검색 격자 생성 (겹치는 조합은 한 번만, 출발일·복귀일 순)"""
+    return sorted({(depart_date, depart_date + timedelta(days=stay - 1))  # 체류일 - 1일 (복귀일)
+                   for depart_date in departure_dates for stay in stay_days})
+
+
+def plan_search_batches(cells, open_return_days=0):
+    """같은 출발일의 복귀일을 open_return_days 범위로 묶어 한 번에 검색할 배치 생성
+
+    반환값은 [(출발일, [복귀일, ...])] 이며 첫 복귀일이 검색 기준 복귀일이다.
+    """
+    batches = []
+    for depart_date, group in itertools.groupby(cells, key=lambda cell: cell[0]):
+        current = []
+        for _, return_date in group:
+            if current and (return_date - current[0]).days > open_return_days:
+                batches.append((depart_date, current))
+                current = []
+            current.append(return_date)
+        batches.append((depart_date, current))
+    return batches
+
+
+def _iso_date(date_str):
+    """"20251209" / "2025-12-09" -> "2025-12-09" """
+    digits = (date_str or '').replace('-', '')
+    if len(digits) != 8:
+        return date_str
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def split_by_return_date(flight_info):
+    """복귀일을 열어 둔 검색 결과를 복귀일(YYYY-MM-DD)별 flight_info 로 나눔"""
+    groups = {}
+    for flight in (flight_info or {}).get('ranked_flights', []):
+        groups.setdefault(_iso_date(flight.get('return_date')), []).append(flight)
+    return {
+        return_date: _with_ranked_flights([dict(flight, rank=rank) for rank, flight in enumerate(flights, 1)])
+        for return_date, flights in groups.items()
+    }
+
+
+def describe_search_filters(params):
+    """업스트림 필터 조건을 한 줄로 설명 (조건이 없으면 빈 문자열)"""
+    parts = []
+    if params.get('outbound_time'):
+        parts.append(f"가는편 출발 {params['outbound_time'].replace('-', '~')}")
+    if params.get('return_time'):
+        parts.append(f"오는편 출발 {params['return_time'].replace('-', '~')}")
+    if params.get('max_duration') is not None:
+        parts.append(f"편도 {params['max_duration']}분 이내")
+    if params.get('max_fare') is not None:
+        parts.append(f"₩{params['max_fare']:,} 이하")
+    if params.get('max_via') is not None:
+        parts.append('직항만' if params['max_via'] == 0 else f"경유 {params['max_via']}회까지")
+    if params.get('limit') is not None:
+        parts.append(f"응답 {params['limit']}개")
+    return ', '.join(parts)
+
+
+def print_search_conditions(params):
+    """검색 조건 출력"""
+    concurrency = max(1, params.get('concurrency') or 1)
+    rate = params.get('rate', DEFAULT_SEARCH_RATE)
+    stay_days = params['stay_days']
+    open_return_days = params.get('open_return_days') or 0
 
-def search_flights_naver(params):
-    """네이버 항공권 검색 실행 (사용자 설정 체류일)"""
     print(f"=== {params['origin']} ↔ {params['destination']} 네이버 항공권 검색 ===")
     print(f"검색 조건:")
     print(f"  - 노선: {params['origin']} ↔ {params['destination']} (왕복)")
     print(f"  - 기간: {params['start_date']} ~ {params['end_date']}")
-    print(f"  - 체류일: 현지 체류 {params['stay_days']}일 (출발일+{params['stay_days']-1}일=복귀일)")
+    if len(stay_days) == 1:
+        print(f"  - 체류일: 현지 체류 {stay_days[0]}일 (출발일+{stay_days[0]-1}일=복귀일)")
+    else:
+        print(f"  - 체류일: 현지 체류 {format_stay_days(stay_days)}일 ({len(stay_days)}가지, 출발일 × 체류일 격자)")
     print(f"  - 승객: 성인 {params['adults']}명")
     if params.get('airlines'):
         print(f"  - 항공사: {', '.join(params['airlines'])}")
+    filters = describe_search_filters(params)
+    if filters:
+        print(f"  - 검색 필터: {filters}")
+    print(f"  - 동시 검색: {concurrency}개, 속도 제한: {f'초당 {rate}회' if rate > 0 else '없음'}")
+    if open_return_days:
+        print(f"  - 복귀일 묶음 검색: 기준 복귀일 +{open_return_days}일까지 한 번에 조회")
+    if params.get('budget'):
+        print(f"  - 증분 재검색: 가격 이력으로 고른 조합만 다시 검색 (예산 {params['budget']}회)")
+    if params.get('optimize_top_k'):
+        print(f"  - 가지치기 검색: 최저가 상위 {params['optimize_top_k']}개만 정밀 검색 "
+              f"(여유 {params.get('prune_slack', DEFAULT_PRUNE_SLACK):.0%})")
+
+
+def departure_dates_of(params):
+    """검색 기간의 출발일 목록"""
+    start_dt = datetime.strptime(params['start_date'], '%Y-%m-%d').date()
+    end_dt = datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+    
+    departure_dates = []
+    current_date = start_dt
+    while current_date <= end_dt:
+        departure_dates.append(current_date)
+        current_date += timedelta(days=1)
+    return departure_dates
+
+
+def make_journal_entry(depart_date, return_date, status, airlines=None, flight_info=None, error=None, **extra):
+    """저널에 기록할 (출발일, 복귀일) 조합 하나의 결과"""
+    entry = {
+        'status': status,
+        'departure_date': depart_date.strftime('%Y-%m-%d'),
+        'return_date': return_date.strftime('%Y-%m-%d'),
+        'stay_days': (return_date - depart_date).days + 1,
+        'airlines': airlines,
+        'recorded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    if flight_info is not None:
+        entry['flight_info'] = flight_info
+    if error is not None:
+        entry['error'] = error
+    entry.update(extra)
+    return entry
+
+
+def collect_results(records, keys):
+    """저널 레코드에서 결과가 있는 조합만 keys 순서대로 모음"""
+    results_data = []
+    for key in keys:
+        entry = records.get(key)
+        if entry and entry.get('status') == 'ok':
+            results_data.append({
+                'departure_date': entry['departure_date'],
+                'return_date': entry['return_date'],
+                'stay_days': entry['stay_days'],
+                'flight_info': entry['flight_info']
+            })
+    return results_data
+
+
+def iter_search_results(params, cells=None):
+    """네이버 항공권 검색 스윕 (사용자 설정 체류일, 여러 체류일이면 출발일 × 체류일 격자)
+
+    (출발일, 복귀일) 조합 하나가 끝날 때마다 저널 항목(make_journal_entry)을 완료 순서대로 내보낸다.
+    이어서 검색할 때는 저널에 남은 이전 결과부터 내보낸다. 끝까지 돌면 출발일·복귀일 순으로 모은
+    결과 목록을 반환값(StopIteration.value)으로 돌려준다. cells 를 주면 격자 대신 그 조합만 검색한다.
+    params['sweep_deadline'] 까지 끝내지 못한 조합은 기록하지 않고 건너뛰며, 그 수를 params['unfinished'] 에 남긴다.
+    """
+    concurrency = max(1, params.get('concurrency') or 1)
+    rate = params.get('rate', DEFAULT_SEARCH_RATE)
+    journal_path = params.get('journal')
+    open_return_days = params.get('open_return_days') or 0
+    deadline = params.get('sweep_deadline')
+    
+    print_search_conditions(params)
+    
+    airlines = params.get('airlines')
+    
+    def key_of(depart_date, return_date):
+        return journal_key(depart_date.strftime('%Y-%m-%d'), return_date.strftime('%Y-%m-%d'), airlines)
+    
+    if cells is None:
+        cells = build_search_grid(departure_dates_of(params), params['stay_days'])
+    all_keys = [key_of(*cell) for cell in cells]
+    
+    # 결과가 있는 조합은 기록할 때 바로 모은다 (끝난 뒤 저널 전체를 다시 읽지 않음)
+    ok_results = {}
+    
+    # 이어서 검색: 저널에 결과(ok/empty)가 남은 조합은 건너뛴다 (오류는 다시 검색)
+    journal = None
+    skipped = 0
+    resumed = []
+    if journal_path:
+        if params.get('resume'):
+            previous = SweepJournal.load(journal_path)
+            done = {key for key, record in previous.items() if record.get('status') in ('ok', 'empty')}
+            remaining = [cell for cell, key in zip(cells, all_keys) if key not in done]
+            resumed = [previous[key] for key in all_keys if key in done]
+            ok_results.update((key, previous[key]) for key in all_keys
+                              if key in done and previous[key]['status'] == 'ok')
+            del previous
+            skipped = len(cells) - len(remaining)
+            cells = remaining
+            print(f"\n저널 '{journal_path}'에서 이어서 검색합니다 (완료된 조합 {skipped}개 건너뜀)")
+        elif os.path.exists(journal_path):
+            print(f"\n기존 저널 '{journal_path}'을 새로 씁니다 (이어서 하려면 --resume)")
+        journal = SweepJournal(journal_path, resume=params.get('resume', False))
     
     try:
-        # 날짜 범위 생성
-        start_dt = datetime.strptime(params['start_date'], '%Y-%m-%d').date()
-        end_dt = datetime.strptime(params['end_date'], '%Y-%m-%d').date()
-        
-        # 출발일 리스트 생성
-        departure_dates = []
-        current_date = start_dt
-        while current_date <= end_dt:
-            departure_dates.append(current_date)
-            current_date += timedelta(days=1)
-        
-        print(f"\n검색할 출발일: {len(departure_dates)}개")
-        
-        # 각 출발일에 대해 사용자 설정 체류일 후 복귀일로 검색
-        results_data = []
-        total_searches = len(departure_dates)
+        yield from resumed
+        
+        batches = plan_search_batches(cells, open_return_days)
+        print(f"\n검색할 출발일·복귀일 조합: {len(cells)}개 (검색 요청 {len(batches)}회)")
+        
+        pool = get_mcp_pool(size=concurrency, env=client_rate_limited_env(rate))
+        bucket = TokenBucket(rate)
+        
+        total_searches = len(cells)
+        total_batches = len(batches)
+        completed = itertools.count(1)
+        fallback_searches = itertools.count()  # 묶음 검색에서 빠져 따로 검색한 횟수
+        
+        def record(depart_date, return_date, status, flight_info=None, error=None):
+            entry = make_journal_entry(depart_date, return_date, status, airlines, flight_info, error)
+            record_price_history(params['origin'], params['destination'], entry)
+            if journal:
+                journal.append(entry)
+            if status == 'ok':
+                ok_results[key_of(depart_date, return_date)] = entry
+            return entry
+        
+        def search(depart_date, return_date, open_days=0):
+            if deadline_spent(deadline):
+                raise DeadlineExceeded("시간 예산 소진")
+            profile_record('rate_wait', bucket.acquire())
+            
+            # 네이버 항공권 MCP 호출
+            usage = {}
+            flight_info = call_naver_flight_mcp(
+                departure=params['origin'],
+                arrival=params['destination'],
+                departure_date=depart_date.strftime('%Y-%m-%d'),
+                return_date=return_date.strftime('%Y-%m-%d'),
+                airlines=airlines,
+                pool=pool,
+                top_k=params.get('top_k'),
+                open_return_days=open_days,
+                filters=search_filter_args(params),
+                usage=usage,
+                deadline=deadline
+            )
+            if flight_info is None and usage.get('deadline_exceeded'):
+                # 결과 없음으로 기록하면 이어서 검색할 때 건너뛰므로 구분한다
+                raise DeadlineExceeded("검색 제한 시간 초과")
+            return flight_info
+        
+        def search_one(batch):
+            depart_date, return_dates = batch
+            base_date = return_dates[0]
+            window = (return_dates[-1] - base_date).days
+            
+            result = search(depart_date, base_date, window)
+            if window == 0:
+                by_date = {base_date.strftime('%Y-%m-%d'): result}
+            else:
+                by_date = split_by_return_date(result)
+            
+            entries = []
+            missed = 0  # 시간 예산이 끝나 따로 검색하지 못한 복귀일 수
+            for return_date in return_dates:
+                flight_info = by_date.get(return_date.strftime('%Y-%m-%d'))
+                if flight_info is None and return_date != base_date:
+                    # 묶음 검색 결과에 없는 복귀일은 그 날짜로 따로 검색
+                    next(fallback_searches)
+                    try:
+                        flight_info = search(depart_date, return_date)
+                    except Exception as e:
+                        # 이 복귀일만 실패로 남기고, 이미 기록한 복귀일의 결과는 그대로 둔다
+                        if isinstance(e, DeadlineExceeded) and deadline_spent(deadline):
+                            missed += 1
+                        else:
+                            entries.append(record(depart_date, return_date, 'error',
+                                                  error=f"{type(e).__name__}: {e}"))
+                        continue
+                
+                # 완료되는 즉시 기록하고 결과는 들고 있지 않는다
+                entries.append(record(depart_date, return_date, 'ok' if flight_info else 'empty',
+                                      flight_info=flight_info))
+            
+            # 진행률 표시 (완료 순서 기준)
+            print(f"진행률: {next(completed)}/{total_batches} - {depart_date} → "
+                  f"{', '.join(str(d) for d in return_dates)}")
+            return entries, missed
+        
         success_count = 0
         error_count = 0
+        unfinished = 0
         
-        for i, depart_date in enumerate(departure_dates):
-            return_date = depart_date + timedelta(days=params['stay_days'] - 1)  # 체류일 - 1일 (복귀일)
-            
-            # 진행률 표시
-            print(f"진행률: {i+1}/{total_searches} - {depart_date} → {return_date}")
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = {executor.submit(search_one, batch): batch for batch in batches}
             
-            try:
-                # Rate limiting: 3초 대기 (MCP 서버 로직과 동일)
-                if i > 0:
-                    print("검색 간격 제어: 3초 대기 중...")
-                    time.sleep(3)
+            # 끝나는 순서대로 내보낸다 (중단되면 남은 검색은 취소)
+            for future in as_completed(futures):
+                depart_date, return_dates = futures[future]
+                try:
+                    entries, missed = future.result()
+                    unfinished += missed
+                except Exception as e:
+                    # 묶음의 첫 검색이 실패하면 아직 아무것도 기록하지 않았으므로 묶음 전체가 대상
+                    if isinstance(e, DeadlineExceeded) and deadline_spent(deadline):
+                        # 시간 예산 초과: 기록하지 않아 --resume 으로 이어서 검색할 수 있다
+                        unfinished += len(return_dates)
+                        continue
+                    entries = [record(depart_date, return_date, 'error', error=f"{type(e).__name__}: {e}")
+                               for return_date in return_dates]
                 
-                # 네이버 항공권 MCP 호출
-                result = call_naver_flight_mcp(
+                for entry in entries:
+                    if entry['status'] == 'ok':
+                        success_count += 1
+                        print(f"✓ 검색 성공: {depart_date} → {entry['return_date']}: "
+                              f"{entry['flight_info'].get('total_price', 'N/A')}")
+                    elif entry['status'] == 'empty':
+                        print(f"✗ 결과 없음: {depart_date} → {entry['return_date']}")
+                    else:
+                        error_count += 1
+                        print(f"✗ 오류: {depart_date} → {entry['return_date']}: {entry['error'].split(':', 1)[0]}")
+                        if error_count <= 5:  # 처음 5개 오류만 상세 출력
+                            print(f"  상세: {entry['error']}")
+                    yield entry
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        if journal:
+            journal.close()
+    
+    print(f"\n검색 완료!")
+    print(f"총 검색: {total_searches}개 (검색 요청 {total_batches + next(fallback_searches)}회)")
+    if skipped:
+        print(f"이전 실행에서 완료: {skipped}개")
+    print(f"검색 성공: {success_count}개")
+    print(f"오류 발생: {error_count}개")
+    params['unfinished'] = unfinished
+    if unfinished:
+        print_unfinished(unfinished, journal_path)
+    
+    # 결과는 출발일·복귀일 순서대로 모은다 (완료 순서와 무관하게 결정적)
+    return collect_results(ok_results, all_keys)
+
+
+def print_unfinished(count, journal_path=None):
+    """시간 예산을 다 써서 검색하지 못한 조합 수 안내"""
+    hint = " (--resume 으로 이어서 검색)" if journal_path else ""
+    print(f"⏱️ 시간 예산 소진: {count}개 조합은 검색하지 못했습니다{hint}")
+
+
+def search_flights_naver(params, cells=None, on_result=None):
+    """iter_search_results 스윕을 끝까지 돌려 결과 목록을 반환
+
+    on_result 를 주면 조합 하나가 끝날 때마다 그 저널 항목으로 호출한다.
+    """
+    sweep = iter_search_results(params, cells)
+    try:
+        while True:
+            entry = next(sweep)
+            if on_result:
+                on_result(entry)
+    except StopIteration as stop:
+        return stop.value
+    except Exception as e:
+        print(f"[ERROR] 검색 중 오류 발생: {type(e).__name__}: {str(e)}")
+        return []
+
+
+def _fare_of(flight_info):
+    """flight_info 의 최저가 (원), 알 수 없으면 None"""
+    if not flight_info:
+        return None
+    try:
+        return parse_fare(flight_info.get('total_fare') or flight_info.get('total_price'))
+    except ValueError:
+        return None
+
+
+def load_fare_history(params):
+    """이전 스윕 저널에서 같은 노선·항공사의 (출발일, 복귀일)별 최저가를 읽어옴"""
+    airlines_key = journal_key('', '', params.get('airlines'))[2]
+    history = {}
+    for path in glob.glob(f"{params['origin']}_{params['destination']}_naver_sweep_*.jsonl"):
+        for key, record in SweepJournal.load(path).items():
+            if record.get('status') != 'ok' or key[2] != airlines_key:
+                continue
+            fare = _fare_of(record.get('flight_info'))
+            if fare is not None:
+                history[key[:2]] = min(fare, history.get(key[:2], fare))
+    return history
+
+
+def coarse_fare_estimate(flight_info, search_status):
+    """대략 검색 결과로 본 최저가 추정치 (판매처 일부 결과라 최종 최저가보다 높을 수 있음)"""
+    candidates = []
+    fare = _fare_of(flight_info)
+    if fare is not None:
+        candidates.append(fare)
+    status = search_status or {}
+    price_range = status.get('priceRange') or {}
+    if price_range.get('min'):
+        candidates.append(price_range['min'])
+    candidates.extend(v for v in (status.get('lowestFare') or {}).values()
+                      if isinstance(v, (int, float)) and v > 0)
+    return min(candidates) if candidates else None
+
+
+def optimize_flights_naver(params, on_result=None):
+    """최저가 상위 k개만 필요할 때 가망 없는 조합의 정밀 검색을 건너뛰는 스윕
+
+    1) 이전 저널에 기록이 없는 조합은 대략 검색(coarse)으로 가격을 먼저 본다.
+    2) 싼 순서로 정밀 검색하며, 추정 가격이 현재 k번째 최저가의 (1 + slack)배를 넘는
+       조합은 건너뛴다.
+    추정치(이전 관측 / 일부 판매처만 응답한 대략 검색의 최저가)는 하한이 아니다. 네이버 응답에는
+    최종 최저가의 하한이 없으므로 slack 만큼 여유를 두는 휴리스틱이며, 실제 상위 k개 조합이
+    건너뛰어질 수 있다 (건너뛴 조합은 저널에 'pruned' 로 남고 --resume 하면 다시 검색한다).
+    검색이 실패한 조합은 'error' 로 기록하고 확정하지 않는다.
+    on_result 를 주면 조합이 확정될 때마다 그 저널 항목으로 호출한다.
+    params['sweep_deadline'] 이 지나면 남은 조합은 검색하지 않는다.
+    """
+    k = params['optimize_top_k']
+    slack = params.get('prune_slack', DEFAULT_PRUNE_SLACK)
+    concurrency = max(1, params.get('concurrency') or 1)
+    rate = params.get('rate', DEFAULT_SEARCH_RATE)
+    journal_path = params.get('journal')
+    deadline = params.get('sweep_deadline')
+    
+    print_search_conditions(params)
+    
+    journal = None
+    try:
+        airlines = params.get('airlines')
+        
+        def key_of(cell):
+            return journal_key(cell[0].strftime('%Y-%m-%d'), cell[1].strftime('%Y-%m-%d'), airlines)
+        
+        cells = build_search_grid(departure_dates_of(params), params['stay_days'])
+        all_keys = [key_of(cell) for cell in cells]
+        
+        # 저널을 새로 쓰기 전에 이전 기록부터 읽는다
+        history = load_fare_history(params)
+        
+        finals = {}  # 확정된 조합 -> flight_info (결과 없음은 None)
+        ok_results = {}  # 결과가 있는 조합은 기록할 때 바로 모은다 (끝난 뒤 저널을 다시 읽지 않음)
+        if journal_path:
+            if params.get('resume'):
+                previous = SweepJournal.load(journal_path)
+                for cell, key in zip(cells, all_keys):
+                    record = previous.get(key)
+                    if record and record.get('status') in ('ok', 'empty'):
+                        finals[cell] = record.get('flight_info')
+                        if record['status'] == 'ok':
+                            ok_results[key] = record
+                del previous
+                print(f"\n저널 '{journal_path}'에서 이어서 검색합니다 (완료된 조합 {len(finals)}개 건너뜀)")
+            journal = SweepJournal(journal_path, resume=params.get('resume', False))
+        resumed = len(finals)
+        
+        def record(cell, status, flight_info=None, **extra):
+            entry = make_journal_entry(cell[0], cell[1], status, airlines, flight_info, **extra)
+            record_price_history(params['origin'], params['destination'], entry)
+            if journal:
+                journal.append(entry)
+            if status == 'ok':
+                ok_results[key_of(cell)] = entry
+            if on_result:
+                on_result(entry)
+        
+        pool = get_mcp_pool(size=concurrency, env=client_rate_limited_env(rate))
+        bucket = TokenBucket(rate)
+        
+        def search(cell, coarse):
+            usage = {}
+            if deadline_spent(deadline):
+                usage['deadline_exceeded'] = True
+                return None, usage
+            profile_record('rate_wait', bucket.acquire())
+            try:
+                flight_info = call_naver_flight_mcp(
                     departure=params['origin'],
                     arrival=params['destination'],
-                    departure_date=depart_date.strftime('%Y-%m-%d'),
-                    return_date=return_date.strftime('%Y-%m-%d'),
-                    airlines=params.get('airlines')
+                    departure_date=cell[0].strftime('%Y-%m-%d'),
+                    return_date=cell[1].strftime('%Y-%m-%d'),
+                    airlines=airlines,
+                    pool=pool,
+                    top_k=params.get('top_k'),
+                    coarse=coarse,
+                    usage=usage,
+                    filters=search_filter_args(params),
+                    deadline=deadline
                 )
-                
-                if result:
-                    # 결과 처리
-                    flight_dict = {
-                        'departure_date': depart_date.strftime('%Y-%m-%d'),
-                        'return_date': return_date.strftime('%Y-%m-%d'),
-                        'stay_days': params['stay_days'],
-                        'flight_info': result
-                    }
-                    results_data.append(flight_dict)
-                    success_count += 1
-                    print(f"✓ 검색 성공: {result.get('total_price', 'N/A')}")
+            except Exception as e:
+                # 결과 없음과 구분해 확정하지 않는다 (이어서 검색할 때 다시 검색)
+                print(f"✗ 오류: {cell[0]} → {cell[1]}: {type(e).__name__}: {e}")
+                usage['error'] = f"{type(e).__name__}: {e}"
+                flight_info = None
+            return flight_info, usage
+        
+        def out_of_time(flight_info, usage):
+            """시간 예산이 끝나 결과를 받지 못한 검색 (확정하지 않고 남겨 둠)"""
+            return flight_info is None and usage.get('deadline_exceeded') and deadline_spent(deadline)
+        
+        # 1단계: 검색 순서를 정할 추정 가격 (이전 기록 또는 대략 검색)
+        estimates = {}
+        to_probe = []
+        unfinished = []
+        for cell, key in zip(cells, all_keys):
+            if cell in finals:
+                continue
+            if key[:2] in history:
+                estimates[cell] = history[key[:2]]
+            else:
+                to_probe.append(cell)
+        
+        print(f"\n1단계: 이전 기록으로 추정 {len(estimates)}개, 대략 검색 {len(to_probe)}개")
+        probe_requests = 0
+        # 중단되면 아직 시작하지 않은 검색은 취소한다 (with 문은 남은 검색을 모두 기다림)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for cell, (flight_info, usage) in zip(to_probe, executor.map(lambda c: search(c, True), to_probe)):
+                probe_requests += usage.get('upstream_requests', 0)
+                if out_of_time(flight_info, usage):
+                    unfinished.append(cell)
+                    continue
+                if usage.get('error'):
+                    # 추정치 없이 2단계에서 정밀 검색
+                    estimates[cell] = None
+                    continue
+                status = usage.get('search_status') or {}
+                if status.get('isCompleted'):
+                    # 대략 검색만으로 검색이 끝난 조합은 그대로 확정
+                    finals[cell] = flight_info
+                    record(cell, 'ok' if flight_info else 'empty', flight_info)
                 else:
-                    print(f"✗ 결과 없음: {depart_date} → {return_date}")
+                    estimates[cell] = coarse_fare_estimate(flight_info, status)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        # 2단계: 싼 순서로 정밀 검색, 가망 없는 조합은 건너뜀
+        best = []  # 확정된 최저가 k개 (최대 힙, 음수로 저장)
+        
+        def admit(fare):
+            if fare is None:
+                return
+            heapq.heappush(best, -fare)
+            if len(best) > k:
+                heapq.heappop(best)
+        
+        def bound():
+            return -best[0] if len(best) >= k else float('inf')
+        
+        for flight_info in finals.values():
+            admit(_fare_of(flight_info))
+        
+        # 추정치가 없는 조합은 건너뛸 근거가 없으므로 마지막에 모두 정밀 검색
+        order = deque(sorted(estimates, key=lambda c: (estimates[c] is None, estimates[c] or 0, c)))
+        print(f"2단계: 정밀 검색 후보 {len(order)}개 (싼 순서)")
+        
+        pruned = []
+        failed = []
+        full_searches = 0
+        full_requests = 0
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            pending = {}
+            while order or pending:
+                if order and deadline_spent(deadline):
+                    unfinished.extend(order)
+                    order.clear()
+                while order and len(pending) < concurrency:
+                    cell = order.popleft()
+                    estimate = estimates[cell]
+                    if estimate is not None and estimate > bound() * (1 + slack):
+                        pruned.append(cell)
+                        record(cell, 'pruned', estimate=estimate)
+                        continue
+                    pending[executor.submit(search, cell, False)] = cell
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cell = pending.pop(future)
+                    flight_info, usage = future.result()
+                    if out_of_time(flight_info, usage):
+                        unfinished.append(cell)
+                        continue
+                    full_searches += 1
+                    full_requests += usage.get('upstream_requests', 0)
+                    if usage.get('error'):
+                        failed.append(cell)
+                        record(cell, 'error', error=usage['error'])
+                        continue
+                    finals[cell] = flight_info
+                    record(cell, 'ok' if flight_info else 'empty', flight_info)
+                    admit(_fare_of(flight_info))
                     
-            except Exception as e:
-                error_count += 1
-                print(f"✗ 오류: {depart_date} → {return_date}: {type(e).__name__}")
-                if error_count <= 5:  # 처음 5개 오류만 상세 출력
-                    print(f"  상세: {str(e)}")
+                    if flight_info:
+                        estimate = f" (추정 {estimates[cell]:,}원)" if estimates[cell] else ""
+                        print(f"✓ 정밀 검색: {cell[0]} → {cell[1]}: {flight_info.get('total_price', 'N/A')}{estimate}")
+                    else:
+                        print(f"✗ 결과 없음: {cell[0]} → {cell[1]}")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        if journal:
+            journal.close()
+        
+        # 절약한 업스트림 요청 수 (모든 조합을 정밀 검색했을 때와 비교)
+        searched = len(cells) - resumed
+        per_full = full_requests / full_searches if full_searches else 0
+        baseline = round(per_full * searched)
+        actual = probe_requests + full_requests
         
         print(f"\n검색 완료!")
-        print(f"총 검색: {total_searches}개")
-        print(f"검색 성공: {success_count}개")
-        print(f"오류 발생: {error_count}개")
+        print(f"총 조합: {len(cells)}개 (이전 실행에서 완료 {resumed}개)")
+        print(f"대략 검색: {len(to_probe)}개, 정밀 검색: {full_searches}개, 건너뜀: {len(pruned)}개"
+              f"{f', 오류: {len(failed)}개' if failed else ''}")
+        print(f"업스트림 요청: {actual}회 (전체 정밀 검색 시 약 {baseline}회 → {baseline - actual}회 절약)")
+        params['unfinished'] = len(unfinished)
+        if unfinished:
+            print_unfinished(len(unfinished), journal_path)
         
-        return results_data
+        return collect_results(ok_results, all_keys)
         
     except Exception as e:
         print(f"[ERROR] 검색 중 오류 발생: {type(e).__name__}: {str(e)}")
         return []
+    finally:
+        if journal:
+            journal.close()
 
-def display_results(results_data, params):
-    """결과 출력"""
-    if not results_data:
-        print("\n❌ 검색 결과가 없습니다.")
+
+def score_rescan_cells(cells, observations, top_k, now=None):
+    """이전 관측으로 조합별 재검색 우선순위를 매김: [(점수, 조합, 사유)] (높은 순)
+
+    점수는 "마지막 관측 이후 놓쳤을 가격 변동 수"의 추정치에 가중치를 곱한 값이다.
+    - 변동률: 관측 기간 동안 가격이 바뀐 횟수 / 시간 (관측이 적을 때는 하루 한 번 변동으로 보정)
+    - 출발 임박: 출발일이 가까울수록 가중
+    - 상위 k 근접: 마지막 가격이 현재 k번째 최저가에 가까울수록 가중
+    관측이 없는 조합은 항상 먼저 검색한다.
+    """
+    now = now or time.time()
+    today = datetime.fromtimestamp(now).date()
+    cell_series = [
+        (cell, observations.get((cell[0].strftime('%Y-%m-%d'), cell[1].strftime('%Y-%m-%d'))))
+        for cell in cells
+    ]
+    # k번째 최저가는 이번에 요청한 조합들의 관측만으로 (다른 체류 기간·범위 밖 조합 제외)
+    last_fares = sorted(series[-1][1] for _, series in cell_series if series)
+    kth = last_fares[min(top_k, len(last_fares)) - 1] if last_fares else None
+    
+    scored = []
+    for cell, series in cell_series:
+        if not series:
+            scored.append((float('inf'), cell, '관측 없음'))
+            continue
+        
+        last_at, last_fare = series[-1]
+        changes = sum(1 for (_, a), (_, b) in zip(series, series[1:]) if a != b)
+        span_hours = (last_at - series[0][0]) / 3600
+        change_rate = (changes + 1) / (span_hours + RESCAN_PRIOR_HOURS)
+        age_hours = max(0.0, (now - last_at) / 3600)
+        
+        days_left = max(1, (cell[0] - today).days)
+        urgency = 1 + RESCAN_URGENCY_DAYS / days_left
+        proximity = 1.0
+        if kth:
+            proximity += max(0.0, 1 - (last_fare - kth) / (kth * RESCAN_TOP_K_BAND))
+        recently_changed = len(series) > 1 and series[-1][1] != series[-2][1]
+        
+        score = age_hours * change_rate * urgency * proximity * (2 if recently_changed else 1)
+        reasons = []
+        if recently_changed:
+            reasons.append('최근 변동')
+        if days_left <= RESCAN_URGENCY_DAYS:
+            reasons.append(f'출발 {days_left}일 전')
+        if kth and last_fare <= kth:
+            reasons.append(f'상위 {top_k}')
+        scored.append((score, cell, ', '.join(reasons) or f'{age_hours:.0f}시간 경과'))
+    
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return scored
+
+
+def _cached_flight_info(rows):
+    """가격 이력의 최근 관측 행으로 만든 flight_info (다시 검색하지 않은 조합 표시용)"""
+    ranked_flights = [{
+        'rank': rank,
+        'departure_date': row['departure_date'],
+        'return_date': row['return_date'],
+        'outbound_flight': row['outbound_flight'] or 'N/A',
+        'return_flight': row['return_flight'] or 'N/A',
+        'total_fare': row['fare'],
+        'total_price': f"{row['fare']:,}원",
+        'partner_code': row['partner_code'] or '',
+        'observed_at': datetime.fromtimestamp(row['observed_at']).strftime('%Y-%m-%d %H:%M:%S'),
+    } for rank, row in enumerate(rows, 1)]
+    return _with_ranked_flights(ranked_flights)
+
+
+def incremental_search_flights_naver(params, on_result=None):
+    """가격 이력을 바탕으로 바뀌었을 가능성이 큰 조합만 예산 안에서 다시 검색
+
+    검색하지 않은 조합은 가격 이력의 최근 관측으로 채워 전체 순위를 보여주고,
+    다시 검색한 조합은 이전 가격과 비교해 변동을 보고한다. on_result 는 다시 검색한 조합에만 호출된다.
+    """
+    history = _price_history
+    budget = params.get('budget') or DEFAULT_RESCAN_BUDGET
+    top_k = params.get('top_k') or 10
+    airlines = params.get('airlines') or ()
+    
+    cells = build_search_grid(departure_dates_of(params), params['stay_days'])
+    since = datetime.now() - timedelta(days=RESCAN_LOOKBACK_DAYS)
+    observations = history.cell_observations(params['origin'], params['destination'], airlines, since=since)
+    latest = history.latest_flights(params['origin'], params['destination'], airlines)
+    
+    scored = score_rescan_cells(cells, observations, top_k)
+    selected = sorted(cell for _, cell, _ in scored[:budget])
+    
+    print(f"증분 재검색: 전체 조합 {len(cells)}개 중 {len(selected)}개 다시 검색 (예산 {budget}회, "
+          f"관측 없음 {sum(1 for score, _, _ in scored if score == float('inf'))}개)")
+    for score, cell, reason in scored[:min(budget, 10)]:
+        print(f"  - {cell[0]} → {cell[1]}: {reason}")
+    
+    fresh = search_flights_naver(params, cells=selected, on_result=on_result) if selected else []
+    
+    # 다시 검색한 조합의 가격 변동
+    changes = []
+    unchanged = 0
+    for result in fresh:
+        series = observations.get((result['departure_date'], result['return_date']))
+        fare = _fare_of(result['flight_info'])
+        if not series or fare is None:
+            continue
+        previous = series[-1][1]
+        if fare == previous:
+            unchanged += 1
+        else:
+            changes.append((result['departure_date'], result['return_date'], previous, fare))
+    
+    if changes:
+        print(f"\n=== 가격 변동 {len(changes)}건 ===")
+        print("| 출발일 | 복귀일 | 이전 | 현재 | 변동 |")
+        print("| --- | --- | ---- | ---- | -- |")
+        for dep, ret, previous, fare in sorted(changes, key=lambda c: (c[3] - c[2]) / c[2]):
+            mark = '▼' if fare < previous else '▲'
+            print(f"| {dep} | {ret} | ₩{previous:,} | ₩{fare:,} | {mark} {abs(fare - previous) / previous:.1%} |")
+    print(f"\n가격 변동 {len(changes)}건, 변동 없음 {unchanged}건, 재검색 생략 {len(cells) - len(selected)}건")
+    
+    # 전체 순위: 새 결과 + 다시 검색하지 않은 조합의 최근 관측
+    fresh_keys = {(r['departure_date'], r['return_date']) for r in fresh}
+    results_data = list(fresh)
+    for cell in cells:
+        key = (cell[0].strftime('%Y-%m-%d'), cell[1].strftime('%Y-%m-%d'))
+        if key in fresh_keys or key not in latest:
+            continue
+        results_data.append({
+            'departure_date': key[0],
+            'return_date': key[1],
+            'stay_days': (cell[1] - cell[0]).days + 1,
+            'flight_info': _cached_flight_info(latest[key]),
+            'cached': True
+        })
+    return results_data
+
+
+def build_fare_matrix(results_data):
+    """결과를 {출발일: {체류일: 최저가}} 격자로 정리"""
+    matrix = {}
+    for result in results_data:
+        fare = _fare_of(result.get('flight_info'))
+        if fare is None:
+            continue
+        row = matrix.setdefault(result['departure_date'], {})
+        stay = result['stay_days']
+        row[stay] = min(fare, row.get(stay, fare))
+    return matrix
+
+
+def display_matrix(results_data, params):
+    """출발일 × 체류일 최저가 격자 출력"""
+    matrix = build_fare_matrix(results_data)
+    if not matrix:
         return
     
-    # 결과를 가격순으로 정렬
-    results_data.sort(key=lambda x: parse_price(x.get('flight_info', {}).get('total_price', '0')))
+    stay_days = params['stay_days']
+    lowest = min(fare for row in matrix.values() for fare in row.values())
+    
+    print(f"\n=== {params['origin']} ↔ {params['destination']} 출발일 × 체류일 최저가 ===")
+    print("| 출발일 | " + " | ".join(f"{stay}일" for stay in stay_days) + " |")
+    print("| --- | " + " | ".join("----" for _ in stay_days) + " |")
+    
+    for depart_date in sorted(matrix):
+        row = matrix[depart_date]
+        cells = []
+        for stay in stay_days:
+            fare = row.get(stay)
+            if fare is None:
+                cells.append("-")
+            else:
+                cells.append(f"**{fare:,}**" if fare == lowest else f"{fare:,}")
+        print(f"| {depart_date} | " + " | ".join(cells) + " |")
+
+# 도시 코드 -> 공항 코드 (--expand-cities)
+CITY_AIRPORTS = {
+    'TYO': ['NRT', 'HND'],
+    'OSA': ['KIX', 'ITM'],
+    'SEL': ['ICN', 'GMP'],
+    'SPK': ['CTS'],
+    'BJS': ['PEK', 'PKX'],
+}
+
+
+def expand_city(code, expand=True):
+    """도시 코드를 공항 코드 목록으로 (공항 코드는 그대로)"""
+    return CITY_AIRPORTS.get(code, [code]) if expand else [code]
+
+
+def parse_deadline(value, started_at):
+    """마감 시각 해석: ISO 날짜시각(2025-12-01T18:00) 또는 시작 후 분 단위 숫자(30)"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)) or str(value).replace('.', '', 1).isdigit():
+        return started_at + timedelta(minutes=float(value))
+    return datetime.fromisoformat(str(value))
+
+
+def parse_route(spec):
+    """"PUS-NRT" 또는 "PUS-NRT:2"(우선순위) -> 작업 dict"""
+    route, _, priority = spec.partition(':')
+    origin, sep, destination = route.partition('-')
+    if not sep or not origin or not destination:
+        raise ValueError(f"노선 형식이 올바르지 않습니다: {spec} (예: PUS-NRT, PUS-NRT:2)")
+    job = {'origin': origin, 'destination': destination}
+    if priority:
+        job['priority'] = priority
+    return job
+
+
+def load_jobs(path):
+    """CSV 또는 JSON 작업 파일 읽기
+
+    열(키): origin, destination, start_date, end_date, stay_days, airlines, priority, deadline
+    origin / destination 외에는 비워 두면 명령행 기본값을 쓴다. CSV 의 airlines 는 공백 또는 ; 로 구분.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            data = json.load(f)
+            jobs = data.get('jobs', []) if isinstance(data, dict) else data
+        else:
+            jobs = []
+            for row in csv.DictReader(f):
+                row = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+                if row.get('airlines'):
+                    row['airlines'] = row['airlines'].replace(';', ' ').split()
+                jobs.append({k: v for k, v in row.items() if v})
+    return jobs
+
+
+def build_route_params(jobs, defaults, expand_cities=False, started_at=None):
+    """작업 목록을 노선별 검색 조건으로 변환 (도시 코드 확장, 같은 노선·조건은 하나로)"""
+    started_at = started_at or datetime.now()
+    routes = []
+    seen = set()
+    for job in jobs:
+        stay_days = job.get('stay_days', defaults['stay_days'])
+        if not isinstance(stay_days, list):
+            stay_days = parse_stay_days(stay_days)
+        airlines = job.get('airlines', defaults.get('airlines'))
+        if isinstance(airlines, str):
+            airlines = airlines.split()
+        deadline = parse_deadline(job.get('deadline'), started_at)
+        
+        for origin in expand_city(str(job['origin']).upper(), expand_cities):
+            for destination in expand_city(str(job['destination']).upper(), expand_cities):
+                params = dict(defaults)
+                params.update({
+                    'origin': origin,
+                    'destination': destination,
+                    'start_date': job.get('start_date', defaults['start_date']),
+                    'end_date': job.get('end_date', defaults['end_date']),
+                    'stay_days': stay_days,
+                    'airlines': airlines,
+                    'priority': max(1, int(job.get('priority', 1))),
+                    'deadline': deadline.strftime('%Y-%m-%d %H:%M:%S') if deadline else None,
+                })
+                key = (origin, destination, params['start_date'], params['end_date'],
+                       tuple(stay_days), journal_key('', '', airlines)[2])
+                if origin == destination or key in seen:
+                    continue
+                seen.add(key)
+                params['journal'] = default_journal_path(params) if defaults.get('journal') else None
+                routes.append(params)
+    return routes
+
+
+class FairScheduler:
+    """노선별 대기열을 우선순위 가중치로 번갈아 꺼내는 스케줄러 (smooth weighted round-robin)
+
+    마감 시각이 지난 노선은 남은 검색을 버리고 expired 로 넘긴다.
+    """
+
+    def __init__(self):
+        self._routes = []
+        self._lock = threading.Lock()
+        self.expired = {}
+
+    def add(self, name, tasks, weight=1, deadline=None):
+        if tasks:
+            self._routes.append({'name': name, 'tasks': deque(tasks), 'weight': weight,
+                                 'current': 0, 'deadline': deadline})
+
+    def next(self):
+        """다음에 검색할 (노선, 작업), 남은 작업이 없으면 None"""
+        with self._lock:
+            now = datetime.now()
+            live = []
+            for route in self._routes:
+                if route['deadline'] and now >= route['deadline'] and route['tasks']:
+                    self.expired.setdefault(route['name'], []).extend(route['tasks'])
+                    route['tasks'].clear()
+                if route['tasks']:
+                    live.append(route)
+            if not live:
+                return None
+            
+            total = 0
+            chosen = None
+            for route in live:
+                route['current'] += route['weight']
+                total += route['weight']
+                if chosen is None or route['current'] > chosen['current']:
+                    chosen = route
+            chosen['current'] -= total
+            return chosen['name'], chosen['tasks'].popleft()
+
+    def expire(self, name, task):
+        """제한 시간에 걸려 끝내지 못한 작업 하나를 expired 로"""
+        with self._lock:
+            self.expired.setdefault(name, []).append(task)
+
+    def expire_all(self):
+        """전체 시간 예산 소진: 모든 노선의 남은 작업을 expired 로"""
+        with self._lock:
+            for route in self._routes:
+                if route['tasks']:
+                    self.expired.setdefault(route['name'], []).extend(route['tasks'])
+                    route['tasks'].clear()
+
+
+def run_batch(routes, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_SEARCH_RATE, save=False, deadline=None,
+              save_quotes=False):
+    """여러 노선을 하나의 속도 제한과 MCP 세션 풀로 공정하게 번갈아 검색
+
+    deadline(time.monotonic() 기준)이 지나면 남은 검색은 모두 마감 초과로 넘긴다.
+    노선 마감 시각도 검색 한 번의 제한 시간에 반영된다.
+    """
+    concurrency = max(1, concurrency or 1)
+    print(f"=== 네이버 항공권 다중 노선 검색 ({len(routes)}개 노선) ===")
+    print(f"  - 동시 검색: {concurrency}개, 속도 제한: {f'초당 {rate}회' if rate > 0 else '없음'}")
+    
+    # 여러 노선이 같은 (공항, 날짜, 항공사) 조합을 요청하면 한 번만 검색하고 모든 노선에 기록
+    owners = {}
+    scheduler = FairScheduler()
+    route_keys = []
+    journals = {}
+    ok_results = {}  # 노선별로 결과가 있는 조합을 기록할 때 바로 모은다 (끝난 뒤 저널을 다시 읽지 않음)
+    
+    try:
+        for index, params in enumerate(routes):
+            airlines = params.get('airlines')
+            cells = build_search_grid(departure_dates_of(params), params['stay_days'])
+            keys = [journal_key(d.strftime('%Y-%m-%d'), r.strftime('%Y-%m-%d'), airlines) for d, r in cells]
+            route_keys.append(keys)
+            
+            done = set()
+            if params.get('journal'):
+                if params.get('resume'):
+                    wanted = set(keys)
+                    for key, record in SweepJournal.load(params['journal']).items():
+                        if record.get('status') in ('ok', 'empty'):
+                            done.add(key)
+                        if record.get('status') == 'ok' and key in wanted:
+                            ok_results.setdefault(index, {})[key] = record
+                journals[index] = SweepJournal(params['journal'], resume=params.get('resume', False))
+            
+            tasks = []
+            for cell, key in zip(cells, keys):
+                if key in done:
+                    continue
+                cell_key = (params['origin'], params['destination']) + key
+                if cell_key in owners:
+                    owners[cell_key].append(index)
+                    continue
+                owners[cell_key] = [index]
+                tasks.append((cell, cell_key))
+            
+            # 노선 마감 시각 (datetime) - 전체 시간 예산 deadline (time.monotonic() 기준)과 따로 둔다
+            route_deadline = datetime.fromisoformat(params['deadline']) if params.get('deadline') else None
+            scheduler.add(index, tasks, weight=params['priority'], deadline=route_deadline)
+            print(f"  - [{index + 1}] {params['origin']} → {params['destination']}: "
+                  f"{len(tasks)}개 검색 (우선순위 {params['priority']}"
+                  f"{', 마감 ' + params['deadline'] if params.get('deadline') else ''})")
+        
+        total = sum(len(keys) for keys in route_keys)
+        unique = len(owners)
+        print(f"\n총 조합 {total}개 중 중복 제외 {unique}개 검색")
+        
+        pool = get_mcp_pool(size=concurrency, env=client_rate_limited_env(rate))
+        bucket = TokenBucket(rate)
+        completed = itertools.count(1)
+        
+        def record(indexes, cell, status, flight_info=None, error=None):
+            for position, index in enumerate(indexes):
+                entry = make_journal_entry(cell[0], cell[1], status, routes[index].get('airlines'),
+                                           flight_info, error)
+                if position == 0:
+                    # 같은 조합을 여러 작업이 나눠 가져도 관측은 한 번
+                    record_price_history(routes[index]['origin'], routes[index]['destination'], entry)
+                if index in journals:
+                    journals[index].append(entry)
+                if status == 'ok':
+                    ok_results.setdefault(index, {})[
+                        journal_key(entry['departure_date'], entry['return_date'], entry['airlines'])] = entry
+        
+        def call_deadline(params):
+            """전체 시간 예산과 노선 마감 시각 중 이른 쪽 (time.monotonic() 기준)"""
+            if not params.get('deadline'):
+                return deadline
+            route_deadline = time.monotonic() + (
+                datetime.fromisoformat(params['deadline']) - datetime.now()).total_seconds()
+            return route_deadline if deadline is None else min(deadline, route_deadline)
+        
+        stop = threading.Event()  # 중단(Ctrl+C, SIGTERM)되면 남은 조합을 가져가지 않는다
+        
+        def worker():
+            while not stop.is_set():
+                if deadline_spent(deadline):
+                    scheduler.expire_all()
+                    return
+                item = scheduler.next()
+                if item is None:
+                    return
+                index, ((depart_date, return_date), cell_key) = item
+                params = routes[index]
+                profile_record('rate_wait', bucket.acquire())
+                usage = {}
+                try:
+                    flight_info = call_naver_flight_mcp(
+                        departure=params['origin'],
+                        arrival=params['destination'],
+                        departure_date=depart_date.strftime('%Y-%m-%d'),
+                        return_date=return_date.strftime('%Y-%m-%d'),
+                        airlines=params.get('airlines'),
+                        pool=pool,
+                        top_k=params.get('top_k'),
+                        filters=search_filter_args(params),
+                        usage=usage,
+                        deadline=call_deadline(params)
+                    )
+                    if flight_info is None and usage.get('deadline_exceeded'):
+                        if deadline_spent(call_deadline(params)):
+                            # 마감에 걸린 조합은 결과 없음으로 기록하지 않는다
+                            scheduler.expire(index, ((depart_date, return_date), cell_key))
+                            continue
+                        raise DeadlineExceeded("검색 제한 시간 초과")
+                    record(owners[cell_key], (depart_date, return_date), 'ok' if flight_info else 'empty', flight_info)
+                except Exception as e:
+                    flight_info = None
+                    record(owners[cell_key], (depart_date, return_date), 'error', error=f"{type(e).__name__}: {e}")
+                print(f"진행률: {next(completed)}/{unique} - {params['origin']} → {params['destination']} "
+                      f"{depart_date} → {return_date}: {flight_info.get('total_price', 'N/A') if flight_info else '결과 없음'}")
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for future in [executor.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        except BaseException:
+            # 진행 중인 검색만 마치고 멈춘다 (저널이 있으면 --resume 으로 이어서 검색)
+            stop.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        for journal in journals.values():
+            journal.close()
+    
+    # 노선별 결과 파일 + 전체 요약
+    summary = []
+    for index, params in enumerate(routes):
+        results_data = collect_results(ok_results.get(index, {}), route_keys[index])
+        expired = len(scheduler.expired.get(index, []))
+        
+        entry = {
+            'origin': params['origin'],
+            'destination': params['destination'],
+            'start_date': params['start_date'],
+            'end_date': params['end_date'],
+            'stay_days': params['stay_days'],
+            'airlines': params.get('airlines'),
+            'priority': params['priority'],
+            'deadline': params.get('deadline'),
+            'combinations': len(route_keys[index]),
+            'found': len(results_data),
+            'expired': expired,
+            'journal': params.get('journal'),
+            'lowest': None,
+        }
+        best = None
+        for result in results_data:
+            fare = _fare_of(result['flight_info'])
+            if fare is not None and (best is None or fare < best[0]):
+                best = (fare, result)
+        if best:
+            fare, best = best
+            entry['lowest'] = {
+                'fare': fare,
+                'departure_date': best['departure_date'],
+                'return_date': best['return_date'],
+                'outbound_flight': best['flight_info'].get('outbound_flight'),
+                'return_flight': best['flight_info'].get('return_flight'),
+            }
+        if save and results_data:
+            entry['result_file'] = save_results(results_data, params)
+        if save_quotes and results_data:
+            entry['quote_file'] = save_quote_file(results_data, params)
+        summary.append(entry)
+    
+    display_batch_summary(summary)
+    return summary
+
+
+def display_batch_summary(summary):
+    """노선별 최저가 요약 출력"""
+    print(f"\n=== 노선별 최저가 요약 ===")
+    print("| 노선 | 우선순위 | 조합 | 결과 | 마감 초과 | 최저가 | 출발일 | 복귀일 | 항공편 |")
+    print("| --- | -- | -- | -- | -- | ---- | --- | --- | --- |")
+    for entry in sorted(summary, key=lambda e: e['lowest']['fare'] if e['lowest'] else float('inf')):
+        lowest = entry['lowest'] or {}
+        fare = f"₩{lowest['fare']:,}" if lowest else '-'
+        flights = f"{lowest.get('outbound_flight', '')}/{lowest.get('return_flight', '')}" if lowest else '-'
+        print(f"| {entry['origin']} → {entry['destination']} | {entry['priority']} | {entry['combinations']} | "
+              f"{entry['found']} | {entry['expired']} | {fare} | {lowest.get('departure_date', '-')} | "
+              f"{lowest.get('return_date', '-')} | {flights} |")
+
+
+def save_batch_summary(summary):
+    """다중 노선 검색 요약을 JSON 파일로 저장"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"naver_flights_batch_summary_{timestamp}.json"
+    output_data = {
+        'routes': summary,
+        'search_summary': {
+            'total_routes': len(summary),
+            'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'source': 'naver_flight_mcp'
+        }
+    }
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 전체 요약이 '{filename}' 파일에 저장되었습니다.")
+    return filename
+
+
+class LiveRanking:
+    """결과가 들어오는 대로 유지하는 최저가 상위 k개와 가격 통계
+
+    전체 결과를 들고 정렬하지 않고, k개짜리 최대 힙과 최저/최고/합계만 갱신한다.
+    같은 가격이면 먼저 들어온 결과가 앞선다.
+    """
+
+    def __init__(self, k=5):
+        self.k = k
+        self.seen = 0  # 들어온 결과 수 (가격을 알 수 없는 결과 포함)
+        self.count = 0  # 가격이 있는 결과 수
+        self.min = None
+        self.max = None
+        self.total = 0
+        self._heap = []  # (-가격, -순번, 결과) 최대 힙
+        self._seq = itertools.count()
+
+    def add(self, result):
+        """결과 하나를 반영하고 상위 k개가 바뀌었으면 True"""
+        self.seen += 1
+        fare = _fare_of(result.get('flight_info'))
+        if fare is None:
+            return False
+        self.count += 1
+        self.total += fare
+        self.min = fare if self.min is None else min(self.min, fare)
+        self.max = fare if self.max is None else max(self.max, fare)
+        
+        item = (-fare, -next(self._seq), result)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+            return True
+        if fare < -self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def top(self):
+        """상위 k개 결과 (싼 순서)"""
+        return [result for _, _, result in sorted(self._heap, reverse=True)]
+
+    def summary(self):
+        """NDJSON 출력용 통계"""
+        return {
+            'results': self.seen,
+            'priced': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.mean) if self.count else None,
+        }
+
+
+class LiveResultView:
+    """스윕 결과를 받아 상위 k개 변동을 터미널에 바로 보여주고, ndjson 이면 한 줄씩 내보냄
+
+    ndjson 에는 파일 객체(보통 원래의 stdout)를 넘긴다. 이때 사람이 보는 출력은 stderr 로 돌린다.
+    """
+
+    def __init__(self, k=5, ndjson=None):
+        self.ranking = LiveRanking(k)
+        self.ndjson = ndjson
+
+    def _emit(self, record):
+        self.ndjson.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.ndjson.flush()
+
+    def __call__(self, entry):
+        if self.ndjson:
+            self._emit({'type': 'result', **entry})
+        if entry.get('status') != 'ok' or not self.ranking.add(entry):
+            return
+        leaders = ' | '.join(
+            f"{result['flight_info'].get('total_price', 'N/A')} ({result['departure_date'][5:]}→{result['return_date'][5:]})"
+            for result in self.ranking.top())
+        print(f"🏆 현재 상위 {self.ranking.k}: {leaders} · 평균 ₩{self.ranking.mean:,.0f} ({self.ranking.count}개)")
+
+    def finish(self, partial=False):
+        """NDJSON 마지막 줄: 최종(또는 중단 시점) 상위 k개와 통계"""
+        if self.ndjson:
+            self._emit({'type': 'summary', 'partial': partial, **self.ranking.summary(),
+                        'top': [{'departure_date': r['departure_date'], 'return_date': r['return_date'],
+                                 'total_fare': _fare_of(r['flight_info'])} for r in self.ranking.top()]})
+
+
+def display_results(results_data, params, ranking=None, partial=False):
+    """결과 출력 (ranking 을 주면 스윕 중에 모은 상위 k개와 통계를 그대로 사용)"""
+    if ranking is None:
+        ranking = LiveRanking(5)
+        for result in results_data or []:
+            ranking.add(result)
+    if not ranking.seen:
+        print("\n❌ 검색 결과가 없습니다.")
+        return
     
     # 상위 5개 결과 출력
-    print(f"\n=== {params['origin']} ↔ {params['destination']} 네이버 항공권 최저가 상위 5개 ===")
+    title = "중단 시점까지의 " if partial else ""
+    print(f"\n=== {params['origin']} ↔ {params['destination']} 네이버 항공권 {title}최저가 상위 {ranking.k}개 ===")
     print("| 순위 | 출발일 | 복귀일 | 항공편 | 총요금 | 출발시간 | 도착시간 | 소요시간 |")
     print("| -- | --- | --- | --- | ---- | ---- | ---- | ---- |")
     
-    for i, result in enumerate(results_data[:5], 1):
+    for i, result in enumerate(ranking.top(), 1):
         flight_info = result.get('flight_info', {})
         
         print(f"| {i} | {result['departure_date']} | {result['return_date']} | {flight_info.get('outbound_flight', 'N/A')} | {flight_info.get('total_price', 'N/A')} | {flight_info.get('outbound_departure', 'N/A')} | {flight_info.get('outbound_arrival', 'N/A')} | {flight_info.get('outbound_duration', 'N/A')} |")
     
     # 통계 정보
-    prices = [parse_price(r.get('flight_info', {}).get('total_price', '0')) for r in results_data]
-    valid_prices = [p for p in prices if p != float('inf')]
-    
-    if valid_prices:
-        min_price = min(valid_prices)
-        max_price = max(valid_prices)
-        avg_price = sum(valid_prices) / len(valid_prices)
-        
+    if ranking.count:
         print(f"\n### 통계 정보")
-        print(f"- **총 조합 수**: {len(results_data)}개")
-        print(f"- **최저가**: ₩{min_price:,}")
-        print(f"- **최고가**: ₩{max_price:,}")
-        print(f"- **평균가**: ₩{avg_price:,.0f}")
+        print(f"- **총 조합 수**: {ranking.seen}개")
+        print(f"- **최저가**: ₩{ranking.min:,}")
+        print(f"- **최고가**: ₩{ranking.max:,}")
+        print(f"- **평균가**: ₩{ranking.mean:,.0f}")
 
 def save_results(results_data, params):
     """결과를 JSON 파일로 저장"""
@@ -283,6 +2177,7 @@ def save_results(results_data, params):
     output_data = {
         'search_parameters': params,
         'naver_flight_results': results_data,
+        'fare_matrix': build_fare_matrix(results_data),
         'search_summary': {
             'total_combinations': len(results_data),
             'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -295,6 +2190,25 @@ def save_results(results_data, params):
         json.dump(output_data, f, ensure_ascii=False, indent=2)
     
     print(f"\n💾 결과가 '{filename}' 파일에 저장되었습니다.")
+    return filename
+
+
+def save_quote_file(results_data, params):
+    """순위별 전체 항공편을 압축 견적 파일(.quotes.json.gz)로 저장 (process_naver_flight_data.py 입력용)"""
+    quotes = list(quotes_from_results(results_data or []))
+    if not quotes:
+        return None
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{params['origin']}_{params['destination']}_naver_flights_{timestamp}{QUOTE_FILE_SUFFIX}"
+    dump_quotes(quotes, filename, origin=params['origin'], destination=params['destination'],
+                airlines=params.get('airlines') or [],
+                search_date=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    print(f"💾 항공편 {len(quotes)}개가 '{filename}' 견적 파일에 저장되었습니다.")
+    return filename
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
 
 def main():
     """메인 실행 함수"""
@@ -303,10 +2217,64 @@ def main():
     parser.add_argument('--destination', '-d', default='NRT', help='도착지 공항코드 (기본값: NRT)')
     parser.add_argument('--start-date', '-s', help='검색 시작일 (YYYY-MM-DD)')
     parser.add_argument('--end-date', '-e', help='검색 종료일 (YYYY-MM-DD)')
-    parser.add_argument('--stay-days', type=int, default=5, help='체류일 수 (기본값: 5일)')
+    parser.add_argument('--stay-days', type=parse_stay_days, default=[5],
+                        help='체류일 수 (기본값: 5일). 3-7 또는 3,5,7 처럼 여러 개를 주면 출발일 × 체류일 격자 검색')
+    parser.add_argument('--open-return-days', type=int, default=0,
+                        help=f'같은 출발일의 복귀일을 이 일수 범위로 묶어 한 번에 검색 (기본값: 0, 최대 {MAX_OPEN_RETURN_DAYS})')
     parser.add_argument('--adults', type=int, default=1, help='성인 승객 수 (기본값: 1)')
     parser.add_argument('--airlines', nargs='*', help='검색할 항공사 코드 또는 이름 (예: KE, 7C, 대한항공, 제주항공)')
     parser.add_argument('--save', action='store_true', help='결과를 JSON 파일로 저장')
+    parser.add_argument('--save-quotes', action='store_true',
+                        help='순위별 전체 항공편을 압축 견적 파일(.quotes.json.gz)로 저장')
+    parser.add_argument('--top-k', type=int, help='출발일마다 받을 최저가 항공편 수 (기본값: 서버 기본값 10, 최대 200)')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'동시에 진행할 검색 수 (기본값: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_SEARCH_RATE,
+                        help='전체 검색 속도 제한, 초당 검색 횟수 (기본값: 0.33, 0이면 제한 없음)')
+    parser.add_argument('--optimize-top-k', type=int, metavar='K',
+                        help='최저가 상위 K개만 찾는 가지치기 검색 (가망 없는 날짜의 정밀 검색 생략). '
+                             '추정 가격은 하한이 아니므로 결과는 휴리스틱이며 실제 상위 K개 중 일부를 놓칠 수 있음')
+    parser.add_argument('--prune-slack', type=float, default=DEFAULT_PRUNE_SLACK,
+                        help=f'가지치기 여유 비율 (기본값: {DEFAULT_PRUNE_SLACK}, 클수록 덜 건너뛰고 놓칠 가능성도 줄어듦)')
+    parser.add_argument('--journal', help='검색 결과를 즉시 기록할 JSONL 저널 경로 (기본값: 노선/기간/체류일별 자동 생성)')
+    parser.add_argument('--no-journal', action='store_true', help='저널을 쓰지 않고 결과를 메모리에만 보관')
+    parser.add_argument('--resume', action='store_true', help='저널에 기록된 완료 조합은 건너뛰고 이어서 검색')
+    parser.add_argument('--routes', nargs='+', metavar='ORIGIN-DEST[:PRIORITY]',
+                        help='여러 노선을 한 번에 검색 (예: PUS-NRT ICN-HND:2). 날짜/체류일/항공사는 명령행 값 사용')
+    parser.add_argument('--jobs', help='노선별 조건을 담은 CSV 또는 JSON 작업 파일 '
+                                       '(origin, destination, start_date, end_date, stay_days, airlines, priority, deadline)')
+    parser.add_argument('--history', nargs='?', const=DEFAULT_HISTORY_PATH, metavar='DB',
+                        help=f'검색 결과를 가격 이력 저장소(SQLite)에 기록 (기본 경로: {DEFAULT_HISTORY_PATH})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='가격 이력을 바탕으로 바뀌었을 가능성이 큰 조합만 다시 검색 (--history 저장소 사용)')
+    parser.add_argument('--budget', type=int, default=DEFAULT_RESCAN_BUDGET,
+                        help=f'증분 재검색 한 번에 다시 검색할 최대 조합 수 (기본값: {DEFAULT_RESCAN_BUDGET})')
+    parser.add_argument('--outbound-time', type=parse_time_window, metavar='HH:MM-HH:MM',
+                        help='가는편 출발 시각 범위 (예: 06:00-12:00, 자정을 넘는 22:00-02:00 도 가능)')
+    parser.add_argument('--return-time', type=parse_time_window, metavar='HH:MM-HH:MM',
+                        help='오는편 출발 시각 범위 (예: 14:00-22:00)')
+    parser.add_argument('--max-duration', type=int, metavar='MINUTES', help='편도 여정 최대 소요시간 (분)')
+    parser.add_argument('--max-fare', type=int, metavar='WON', help='최대 총요금 (원)')
+    parser.add_argument('--max-via', type=int, choices=range(0, MAX_VIA_COUNT + 1),
+                        help=f'최대 경유 횟수 (기본값: 직항만, 최대 {MAX_VIA_COUNT})')
+    parser.add_argument('--limit', type=int,
+                        help=f'네이버가 돌려줄 여정 수 (기본값: {MAX_UPSTREAM_LIMIT}, 작을수록 응답이 가벼움)')
+    parser.add_argument('--record', metavar='DIR',
+                        help='MCP 서버가 받은 검색 응답(SSE 본문과 도착 시각)을 이 디렉터리에 기록')
+    parser.add_argument('--replay', metavar='DIR',
+                        help='--record 로 남긴 기록을 네이버 API 대신 재생 (오프라인 재현 / 부하 시험)')
+    parser.add_argument('--replay-speed', type=float, default=DEFAULT_REPLAY_SPEED,
+                        help=f'재생 배속 (기본값: {DEFAULT_REPLAY_SPEED:g}, 0이면 기다리지 않음). 검색 속도 제한도 같은 배율로 풂')
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                        help='스윕 전체 시간 예산(초). 다 쓰면 새 검색을 시작하지 않고 그때까지의 결과를 출력')
+    parser.add_argument('--profile', action='store_true',
+                        help='검색이 끝나면 단계별(프로세스 기동, 속도 제한 대기, MCP 호출, 서버 단계) 소요 시간 출력')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='MCP 호출마다 요청 id 와 클라이언트 / 서버 단계별 시간을 JSON 한 줄씩 기록')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='조합마다 결과를 NDJSON 한 줄로 stdout 에 내보냄 (사람이 보는 출력은 stderr)')
+    parser.add_argument('--expand-cities', action='store_true',
+                        help='도시 코드를 공항 코드로 나눠 검색 (TYO→NRT/HND, OSA→KIX/ITM, SEL→ICN/GMP)')
     
     args = parser.parse_args()
     
@@ -323,26 +2291,108 @@ def main():
         'end_date': args.end_date,
         'stay_days': args.stay_days,
         'adults': args.adults,
-        'airlines': args.airlines
+        'airlines': args.airlines,
+        'top_k': args.top_k,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'open_return_days': max(0, min(args.open_return_days, MAX_OPEN_RETURN_DAYS)),
+        'optimize_top_k': args.optimize_top_k,
+        'prune_slack': args.prune_slack,
+        'outbound_time': args.outbound_time,
+        'return_time': args.return_time,
+        'max_duration': args.max_duration if args.max_duration and args.max_duration > 0 else None,
+        'max_fare': args.max_fare if args.max_fare and args.max_fare > 0 else None,
+        'max_via': args.max_via,
+        'limit': max(1, min(args.limit, MAX_UPSTREAM_LIMIT)) if args.limit else None
     }
+    if args.incremental:
+        params['budget'] = max(1, args.budget)
+        # 증분 재검색은 일부 조합만 검색하므로 전체 스윕 저널을 덮어쓰지 않는다
+        if not args.journal:
+            args.no_journal = True
+        args.history = args.history or DEFAULT_HISTORY_PATH
+    if args.replay:
+        # 기록 재생: 서버는 네이버 API 대신 기록을 돌려주고, 클라이언트 속도 제한은 배속만큼 푼다
+        speed = max(0.0, args.replay_speed)
+        os.environ.update({
+            'NAVER_FLIGHT_REPLAY_DIR': os.path.abspath(args.replay),
+            'NAVER_FLIGHT_REPLAY_SPEED': str(speed),
+            'NAVER_FLIGHT_CACHE': 'off',  # 캐시가 재생 경로를 가리지 않도록
+        })
+        params['rate'] = params['rate'] * speed if speed > 0 else 0
+        print(f"🔁 기록 재생: {args.replay} ({f'{speed:g}배속' if speed > 0 else '대기 없음'})")
+        # 재생 결과로 실제 스윕 저널을 덮어쓰지 않는다
+        if not args.journal:
+            args.no_journal = True
+    elif args.record:
+        os.environ['NAVER_FLIGHT_RECORD_DIR'] = os.path.abspath(args.record)
+        print(f"⏺️ 검색 응답 기록: {args.record}")
+    if not args.no_journal:
+        params['journal'] = args.journal or default_journal_path(params)
+        params['resume'] = args.resume
+    elif args.resume:
+        print("⚠️ --no-journal 과 --resume 은 함께 쓸 수 없어 --resume 을 무시합니다.")
     
-    try:
-        # 항공편 검색
-        results_data = search_flights_naver(params)
-        
-        # 결과 출력
-        display_results(results_data, params)
-        
-        # 결과 저장
-        if args.save and results_data:
-            save_results(results_data, params)
-        
-        print("\n✅ 네이버 항공권 검색 완료!")
-        
-    except KeyboardInterrupt:
-        print("\n\n👋 검색이 취소되었습니다.")
-    except Exception as e:
-        print(f"\n❌ 오류가 발생했습니다: {e}")
+    if args.history:
+        open_price_history(args.history)
+    if args.profile or args.trace:
+        open_profiler(args.trace)
+    
+    # 종료 신호를 받아도 중단 시점까지의 순위를 남긴다
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    if args.time_budget and args.time_budget > 0:
+        params['sweep_deadline'] = time.monotonic() + args.time_budget
+    
+    view = LiveResultView(ndjson=sys.stdout if args.ndjson else None)
+    with contextlib.redirect_stdout(sys.stderr if args.ndjson else sys.stdout):
+        try:
+            # 여러 노선: 하나의 스케줄러로 번갈아 검색하고 노선별 결과 + 전체 요약 저장
+            if args.routes or args.jobs:
+                jobs = [parse_route(spec) for spec in args.routes or []]
+                if args.jobs:
+                    jobs.extend(load_jobs(args.jobs))
+                routes = build_route_params(jobs, params, expand_cities=args.expand_cities)
+                summary = run_batch(routes, concurrency=args.concurrency, rate=args.rate, save=args.save,
+                                    deadline=params.get('sweep_deadline'), save_quotes=args.save_quotes)
+                save_batch_summary(summary)
+                print("\n✅ 네이버 항공권 다중 노선 검색 완료!")
+                return
+            
+            # 항공편 검색 (이력 기반 증분 재검색 / 상위 k개만 필요하면 가지치기 스윕)
+            if args.incremental:
+                results_data = incremental_search_flights_naver(params, on_result=view)
+            elif params['optimize_top_k']:
+                results_data = optimize_flights_naver(params, on_result=view)
+            else:
+                results_data = search_flights_naver(params, on_result=view)
+            # 시간 예산이 끝나 검색하지 못한 조합이 있으면 부분 결과로 표시
+            partial = bool(params.get('unfinished'))
+            view.finish(partial=partial)
+            
+            # 결과 출력
+            display_results(results_data, params, partial=partial)
+            if len(params['stay_days']) > 1:
+                display_matrix(results_data, params)
+            
+            # 결과 저장
+            if args.save and results_data:
+                save_results(results_data, params)
+            if args.save_quotes and results_data:
+                save_quote_file(results_data, params)
+            
+            print("\n✅ 네이버 항공권 검색 완료!")
+            
+        except KeyboardInterrupt:
+            print("\n\n👋 검색이 취소되었습니다.")
+            # 그때까지 받은 결과로 순위를 보여준다 (저널이 있으면 --resume 으로 이어서 검색 가능)
+            view.finish(partial=True)
+            display_results(None, params, ranking=view.ranking, partial=True)
+        except Exception as e:
+            print(f"\n❌ 오류가 발생했습니다: {e}")
+        finally:
+            close_mcp_pool()
+            close_price_history()
+            close_profiler(report=args.profile)
 
 if __name__ == "__main__":
     main()
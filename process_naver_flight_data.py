@@ -2,14 +2,317 @@
 # -*- coding: utf-8 -*-
 
 import json
+import os
 import sys
 import glob
+import heapq
 import argparse
-from datetime import datetime, timedelta
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from flight_quote import (
+    QUOTE_FILE_SUFFIX, FlightQuote, format_clock, format_minutes, is_quote_file, load_quotes, parse_fare,
+)
 
 # UTF-8 인코딩 설정
 sys.stdout.reconfigure(encoding='utf-8')
 
+
+def weekend_days_before(ordinal):
+    """1일(0001-01-01, 월요일)부터 ordinal 일까지의 토·일요일 수"""
+    weeks, rest = divmod(ordinal, 7)
+    return weeks * 2 + (1 if rest == 6 else 0)
+
+
+def count_weekend_days(departure_ordinal, return_ordinal):
+    """출발일~복귀일(양끝 포함) 사이 토·일요일 수 (날짜를 하루씩 세지 않는 폐형식)"""
+    return weekend_days_before(return_ordinal) - weekend_days_before(departure_ordinal - 1)
+
+
+class FlightTable:
+    """검색 결과를 열 단위로 보관하는 표
+
+    가격·날짜는 표준 라이브러리 정수 배열(array)로 두고, 견적(FlightQuote)은 행 번호로만 참조한다.
+    numpy 를 쓰지 않으므로 벡터 연산은 없다. 중복 제거·주말 수·부분 선택은 행을 한 번씩 도는
+    파이썬 루프이며, 행마다 dict 를 만들거나 날짜를 하루씩 세거나 전체 정렬하지 않는 것으로 줄인다.
+    화면·파일에 쓸 행만 record() 로 dict 를 만든다.
+    """
+
+    def __init__(self):
+        self.departure = array('l')  # 출발일 (date.toordinal)
+        self.return_ = array('l')  # 복귀일 (date.toordinal)
+        self.price = array('q')  # 총요금 (원)
+        self.quotes = []  # 행별 견적
+
+    def __len__(self):
+        return len(self.price)
+
+    def extend(self, quotes):
+        """견적들을 표에 추가"""
+        for quote in quotes:
+            self.departure.append(quote.departure)
+            self.return_.append(quote.return_)
+            self.price.append(quote.fare)
+            self.quotes.append(quote)
+        return self
+
+    def unique_min_rows(self):
+        """같은 출발일-복귀일 조합 중 최저가 행 번호 (처음 나온 조합 순서, 행을 한 번 훑는 dict 그룹)"""
+        best = {}
+        price = self.price
+        for row, key in enumerate(zip(self.departure, self.return_)):
+            current = best.get(key)
+            if current is None or price[row] < price[current]:
+                best[key] = row
+        return list(best.values())
+
+    def weekend_counts(self, rows):
+        """행별 여행 기간 중 토·일요일 수"""
+        departure, return_ = self.departure, self.return_
+        return [count_weekend_days(departure[row], return_[row]) for row in rows]
+
+    def cheapest(self, rows, n):
+        """가격이 낮은 순서로 n개 (전체 정렬 없이 부분 선택, 같은 가격은 원래 순서)"""
+        return heapq.nsmallest(n, rows, key=self.price.__getitem__)
+
+    def price_statistics(self, rows):
+        prices = [self.price[row] for row in rows]
+        return {
+            'min_price': min(prices),
+            'max_price': max(prices),
+            'avg_price': sum(prices) / len(prices),
+        }
+
+    def flight_statistics(self, rows):
+        """항공편(가는편)별 조합 수와 최저가 (최저가 순)"""
+        stats = {}
+        first_seen = {}  # 같은 최저가끼리는 그 가격이 먼저 나온 항공편을 앞에
+        for position, row in enumerate(rows):
+            flight_num = self.quotes[row].outbound_flight or 'N/A'
+            price = self.price[row]
+            entry = stats.get(flight_num)
+            if entry is None:
+                stats[flight_num] = {'count': 1, 'min_price': price}
+                first_seen[flight_num] = position
+            else:
+                entry['count'] += 1
+                if price < entry['min_price']:
+                    entry['min_price'] = price
+                    first_seen[flight_num] = position
+        return dict(sorted(stats.items(), key=lambda item: (item[1]['min_price'], first_seen[item[0]])))
+
+    def record(self, row):
+        """보고서·결과 파일에 쓰는 항공편 dict"""
+        quote = self.quotes[row]
+        return {
+            'departure_date': quote.departure_date,
+            'return_date': quote.return_date,
+            'stay_days': quote.stay_days,
+            'flight_number': quote.outbound_flight or 'N/A',
+            'total_price': quote.total_price,
+            'price_numeric': quote.fare,
+            'departure_time': format_clock(quote.outbound_departure, 'N/A'),
+            'arrival_time': format_clock(quote.outbound_arrival, 'N/A'),
+            'duration': format_minutes(quote.outbound_duration, 'N/A'),
+            'return_departure_time': format_clock(quote.return_departure, 'N/A'),
+            'return_arrival_time': format_clock(quote.return_arrival, 'N/A'),
+            'return_duration': format_minutes(quote.return_duration, 'N/A')
+        }
+
+
+_JSON_DECODER = json.JSONDecoder()
+_STREAM_CHUNK_SIZE = 1 << 16
+
+
+class JSONStream:
+    """파일을 조각 단위로 읽으며 JSON 값을 하나씩 꺼내는 reader (문서 전체를 메모리에 올리지 않음)"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(_STREAM_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """공백을 건너뛴 다음 글자 (파일 끝이면 '')"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def take(self, expected):
+        """다음 글자를 읽어 expected 중 하나인지 확인"""
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(f"JSON 형식 오류: {expected!r} 위치에 {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """다음 JSON 값 하나"""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # 버퍼 끝에서 끝난 숫자는 잘렸을 수 있으므로 더 읽어 다시 확인
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_flight_results(f, meta):
+    """save_results JSON 의 naver_flight_results 항목을 하나씩 반환 (나머지 최상위 키는 meta 에 저장)"""
+    stream = JSONStream(f)
+    stream.take('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.take(':')
+        if key == 'naver_flight_results':
+            stream.take('[')
+            if stream.peek() == ']':
+                stream.take(']')
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.take(',]') == ']':
+                        break
+        else:
+            meta[key] = stream.value()
+        if stream.take(',}') == '}':
+            return
+
+
+def iter_journal_results(f):
+    """flight_search_naver.py 저널(JSONL)에서 결과가 있는 항목을 하나씩 반환 (깨진 줄은 건너뜀)
+
+    f 는 바이너리 모드로 연 파일이다 (쓰다 만 줄이 UTF-8 문자 중간에서 끊겼을 수 있음).
+    """
+    for line in f:
+        try:
+            record = json.loads(line.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            continue
+        if isinstance(record, dict) and record.get('status') == 'ok':
+            yield record
+
+
+def route_from_filename(file_path):
+    """"PUS_NRT_naver_flights_....json" -> ("PUS", "NRT")"""
+    parts = os.path.basename(file_path).split('_')
+    if len(parts) >= 3 and parts[2] == 'naver':
+        return parts[0], parts[1]
+    return None, None
+
+
+def scan_flight_file(file_path):
+    """결과 파일 하나를 스트림으로 읽어 (출발일, 복귀일)별 최저가 견적만 남김
+
+    반환값: {'file', 'origin', 'destination', 'rows', 'skipped', 'best'}
+    skipped 는 가격 / 날짜를 읽을 수 없어 건너뛴 항목 수 (요금이 없는 항목은 세지 않음)
+    best 는 {(출발일 ordinal, 복귀일 ordinal): FlightQuote} 이며 조합이 처음 나온 순서를 유지한다.
+    """
+    meta = {}
+    best = {}
+    rows = 0
+    skipped = 0
+    if is_quote_file(file_path):
+        # 견적 파일은 이미 정수 형식이므로 문자열을 다시 해석하지 않는다
+        quotes, quote_meta = load_quotes(file_path)
+        meta['search_parameters'] = quote_meta
+        rows = len(quotes)
+        for quote in quotes:
+            key = quote.key
+            current = best.get(key)
+            if current is None or quote.fare < current.fare:
+                best[key] = quote
+    else:
+        is_journal = file_path.endswith('.jsonl')
+        with open(file_path, 'rb') if is_journal else open(file_path, 'r', encoding='utf-8') as f:
+            if is_journal:
+                options = iter_journal_results(f)
+            else:
+                options = iter_flight_results(f, meta)
+            # 파일 안에서는 날짜 문자열 그대로 비교하고, 견적은 최저가가 바뀔 때만 만든다
+            cells = {}
+            for option in options:
+                rows += 1
+                try:
+                    flight_info = option.get('flight_info') or {}
+                    price = flight_info.get('total_fare') or parse_fare(flight_info.get('total_price'))
+                    if price is None:
+                        continue
+                    cell = (option['departure_date'], option['return_date'])
+                    current = cells.get(cell)
+                    if current is None or price < current.fare:
+                        cells[cell] = FlightQuote.from_result(option)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    skipped += 1
+            for quote in cells.values():
+                current = best.get(quote.key)
+                if current is None or quote.fare < current.fare:
+                    best[quote.key] = quote
+    
+    search_params = meta.get('search_parameters') or {}
+    file_origin, file_destination = route_from_filename(file_path)
+    return {
+        'file': file_path,
+        'origin': search_params.get('origin') or file_origin or 'UNKNOWN',
+        'destination': search_params.get('destination') or file_destination or 'UNKNOWN',
+        'rows': rows,
+        'skipped': skipped,
+        'best': best,
+    }
+
+
+def print_skipped_rows(scanned):
+    """가격 / 날짜 파싱에 실패해 건너뛴 항목 수 경고"""
+    if scanned['skipped']:
+        print(f"[WARNING] 가격 / 날짜 파싱 실패로 {scanned['skipped']}개 항공편 건너뜀")
+
+
+def _scan_flight_file_safe(file_path):
+    """프로세스 풀 작업: 파일 하나가 깨져도 전체 처리는 계속되도록 오류를 결과로 반환"""
+    try:
+        return scan_flight_file(file_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def resolve_input_files(inputs):
+    """파일 / 디렉터리 / glob 패턴을 결과 파일 목록으로 (중복 제거, 이름순)"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, '*_naver_flights_*.json')))
+            files.extend(glob.glob(os.path.join(item, '*_naver_sweep_*.jsonl')))
+            files.extend(glob.glob(os.path.join(item, f'*_naver_flights_*{QUOTE_FILE_SUFFIX}')))
+        elif any(ch in item for ch in '*?['):
+            files.extend(glob.glob(item))
+        else:
+            files.append(item)
+    return sorted(set(files))
+
+
 def process_naver_flight_data(file_path, origin=None, destination=None):
     """네이버 항공권 데이터 통합 처리 (단일 파일)"""
     
@@ -17,23 +320,19 @@ def process_naver_flight_data(file_path, origin=None, destination=None):
     print(f"처리할 파일: {file_path}")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            flight_results = data['naver_flight_results']
-            print(f"✓ {file_path}: {len(flight_results)}개 항공편 로드")
-            
-            # 파일에서 출발지/목적지 자동 감지
-            if not origin or not destination:
-                search_params = data.get('search_parameters', {})
-                detected_origin = search_params.get('origin', 'UNKNOWN')
-                detected_destination = search_params.get('destination', 'UNKNOWN')
+        # 문서 전체를 올리지 않고 항목을 하나씩 읽으며 조합별 최저가만 남김
+        scanned = scan_flight_file(file_path)
+        print(f"✓ {file_path}: {scanned['rows']}개 항공편 로드")
+        print_skipped_rows(scanned)
+        
+        # 파일에서 출발지/목적지 자동 감지
+        if not origin or not destination:
+            if not origin:
+                origin = scanned['origin']
+            if not destination:
+                destination = scanned['destination']
                 
-                if not origin:
-                    origin = detected_origin
-                if not destination:
-                    destination = detected_destination
-                    
-                print(f"✓ 출발지/목적지 자동 감지: {origin} ↔ {destination}")
+            print(f"✓ 출발지/목적지 자동 감지: {origin} ↔ {destination}")
                 
     except FileNotFoundError:
         print(f"❌ {file_path} 파일을 찾을 수 없습니다.")
@@ -42,98 +341,110 @@ def process_naver_flight_data(file_path, origin=None, destination=None):
         print(f"❌ {file_path} 처리 중 오류: {e}")
         return []
     
+    return analyze_flight_results(list(scanned['best'].values()), origin, destination, file_path)
+
+
+def process_naver_flight_files(inputs, origin=None, destination=None, workers=None):
+    """여러 결과 파일을 병렬로 읽어 (노선, 출발일, 복귀일)별 최저가로 합친 뒤 노선별로 분석"""
+    files = resolve_input_files(inputs)
+    
+    print(f"=== 네이버 항공권 데이터 통합 처리 (파일 {len(files)}개) ===")
+    if not files:
+        print("처리할 파일이 없습니다.")
+        return {}
+    
+    # 노선별 {(출발일, 복귀일): (견적, 파일)} - 메모리는 조합 수에 비례
+    merged = {}
+    failed = []
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_path, (scanned, error) in zip(files, executor.map(_scan_flight_file_safe, files)):
+            if error:
+                failed.append({'file': file_path, 'error': error})
+                print(f"⚠️ {file_path} 건너뜀: {error}")
+                continue
+            
+            route = (scanned['origin'], scanned['destination'])
+            if (origin and route[0] != origin) or (destination and route[1] != destination):
+                continue
+            total_rows += scanned['rows']
+            print(f"✓ {file_path}: {scanned['rows']}개 항공편 ({route[0]} ↔ {route[1]})")
+            print_skipped_rows(scanned)
+            
+            best = merged.setdefault(route, {})
+            for key, quote in scanned['best'].items():
+                current = best.get(key)
+                if current is None or quote.fare < current[0].fare:
+                    best[key] = (quote, file_path)
+    
+    unique = sum(len(best) for best in merged.values())
+    print(f"\n총 {total_rows}개 항공편 → 노선·출발일·복귀일 기준 {unique}개 조합 (실패 파일 {len(failed)}개)")
+    
+    # 노선별 최저가 통합 결과
+    merged_view = {
+        f"{route[0]}-{route[1]}": [
+            {
+                'departure_date': quote.departure_date,
+                'return_date': quote.return_date,
+                'stay_days': quote.stay_days,
+                'price_numeric': quote.fare,
+                'flight_number': quote.outbound_flight or 'N/A',
+                'source_file': source_file,
+            }
+            for key, (quote, source_file) in sorted(best.items())
+        ]
+        for route, best in sorted(merged.items())
+    }
+    output_filename = "naver_flight_merged_min_prices.json"
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        json.dump({
+            'routes': merged_view,
+            'search_summary': {
+                'source_files': len(files),
+                'failed_files': failed,
+                'total_rows': total_rows,
+                'unique_combinations': unique,
+                'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'source': 'naver_flight_mcp'
+            }
+        }, f, ensure_ascii=False, indent=2)
+    print(f"통합 최저가 결과가 '{output_filename}' 파일에 저장되었습니다.")
+    
+    # 노선별 분석 (기존 단일 파일 분석과 같은 결과 파일 / 요약 보고서)
+    results = {}
+    for route, best in sorted(merged.items()):
+        print()
+        quotes = [quote for quote, _ in best.values()]
+        results[route] = analyze_flight_results(quotes, route[0], route[1], f"{len(files)}개 파일")
+    return results
+
+
+def analyze_flight_results(quotes, origin, destination, source_file):
+    """견적(FlightQuote)들을 분석해 최저가 / 주말 포함 상위 결과와 요약 보고서 생성"""
     route_name = f"{origin} ↔ {destination}"
     
-    if not flight_results:
+    if not quotes:
         print("처리할 데이터가 없습니다.")
         return []
     
-    # 유효한 항공편만 필터링
-    valid_flights = []
-    
-    for option in flight_results:
-        flight_info = option.get('flight_info', {})
-        
-        # 가격이 있는 항공편만 유지
-        if flight_info.get('total_price') and flight_info['total_price'] != "0" and flight_info['total_price'] != "":
-            # 가격에서 숫자만 추출 (₩ 기호와 쉼표 제거)
-            price_str = str(flight_info['total_price']).replace('₩', '').replace(',', '').replace('원', '')
-            try:
-                price_numeric = int(price_str)
-                valid_flights.append({
-                    'departure_date': option['departure_date'],
-                    'return_date': option['return_date'],
-                    'stay_days': option['stay_days'],
-                    'flight_number': flight_info.get('outbound_flight', 'N/A'),
-                    'total_price': flight_info.get('total_price', 'N/A'),
-                    'price_numeric': price_numeric,
-                    'departure_time': flight_info.get('outbound_departure', 'N/A'),
-                    'arrival_time': flight_info.get('outbound_arrival', 'N/A'),
-                    'duration': flight_info.get('outbound_duration', 'N/A'),
-                    'return_departure_time': flight_info.get('return_departure', 'N/A'),
-                    'return_arrival_time': flight_info.get('return_arrival', 'N/A'),
-                    'return_duration': flight_info.get('return_duration', 'N/A')
-                })
-            except ValueError:
-                print(f"[WARNING] 가격 파싱 실패: {flight_info['total_price']}")
-                continue
+    # 열 단위 표로 (가격·날짜는 정수 배열)
+    table = FlightTable().extend(quotes)
     
     # 중복 제거 (같은 출발일-복귀일 조합 중 최저가만 유지)
-    unique_flights = {}
-    for flight in valid_flights:
-        key = f"{flight['departure_date']}-{flight['return_date']}"
-        if key not in unique_flights or flight['price_numeric'] < unique_flights[key]['price_numeric']:
-            unique_flights[key] = flight
-    
-    # 중복 제거된 항공편을 리스트로 변환
-    unique_flights_list = list(unique_flights.values())
-    
-    # 가격순으로 정렬
-    unique_flights_list.sort(key=lambda x: x['price_numeric'])
+    unique_rows = table.unique_min_rows()
+    if not unique_rows:
+        print("처리할 데이터가 없습니다.")
+        return []
     
-    # 상위 5개 결과
-    top_5_results = unique_flights_list[:5]
+    # 주말 일수 (출발일~복귀일 사이 토·일요일 수)
+    weekend_counts = table.weekend_counts(unique_rows)
+    weekend_one_day_rows = [row for row, count in zip(unique_rows, weekend_counts) if count == 1]
+    weekend_all_rows = [row for row, count in zip(unique_rows, weekend_counts) if count >= 2]
     
-    # 주말 필터링 함수
-    def is_weekend_included(departure_date, return_date):
-        """출발일과 복귀일 사이에 주말이 포함되는지 확인"""
-        try:
-            dep_date = datetime.strptime(departure_date, '%Y-%m-%d')
-            ret_date = datetime.strptime(return_date, '%Y-%m-%d')
-            
-            # 출발일부터 복귀일까지의 모든 날짜 확인
-            current_date = dep_date
-            weekend_count = 0
-            
-            while current_date <= ret_date:
-                # 토요일(5) 또는 일요일(6)인지 확인
-                if current_date.weekday() in [5, 6]:
-                    weekend_count += 1
-                current_date += timedelta(days=1)
-            
-            return weekend_count
-        except:
-            return 0
-    
-    # 주말 하루 포함된 항공편 필터링
-    weekend_one_day_flights = []
-    for flight in unique_flights_list:
-        weekend_count = is_weekend_included(flight['departure_date'], flight['return_date'])
-        if weekend_count == 1:
-            weekend_one_day_flights.append(flight)
-    
-    # 주말 모두 포함된 항공편 필터링 (2일 이상)
-    weekend_all_flights = []
-    for flight in unique_flights_list:
-        weekend_count = is_weekend_included(flight['departure_date'], flight['return_date'])
-        if weekend_count >= 2:
-            weekend_all_flights.append(flight)
-    
-    # 주말 하루 포함 상위 3개
-    weekend_one_day_top3 = weekend_one_day_flights[:3]
-    
-    # 주말 모두 포함 상위 3개
-    weekend_all_top3 = weekend_all_flights[:3]
+    # 상위 5개 결과 / 주말 하루 포함 상위 3개 / 주말 모두 포함 상위 3개 (부분 선택)
+    top_5_results = [table.record(row) for row in table.cheapest(unique_rows, 5)]
+    weekend_one_day_top3 = [table.record(row) for row in table.cheapest(weekend_one_day_rows, 3)]
+    weekend_all_top3 = [table.record(row) for row in table.cheapest(weekend_all_rows, 3)]
     
     # 결과 출력
     print(f"\n=== {route_name} 네이버 항공권 최저가 상위 5개 ===")
@@ -179,14 +490,16 @@ def process_naver_flight_data(file_path, origin=None, destination=None):
             'source': 'naver_flight_mcp',
             'period': '검색 기간',
             'passengers': '성인 1명',
-            'total_combinations': len(unique_flights_list),
+            'total_combinations': len(unique_rows),
             'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'source_file': file_path
+            'source_file': source_file
         },
         'top_5_results': top_5_results,
         'weekend_one_day_top3': weekend_one_day_top3,
         'weekend_all_top3': weekend_all_top3,
-        'all_results': unique_flights_list[:10]  # 상위 10개만 저장
+        'all_results': [table.record(row) for row in table.cheapest(unique_rows, 10)],  # 상위 10개만 저장
+        'price_statistics': table.price_statistics(unique_rows),
+        'flight_statistics': table.flight_statistics(unique_rows)
     }
     
     # 파일명 생성
@@ -194,16 +507,20 @@ def process_naver_flight_data(file_path, origin=None, destination=None):
     with open(output_filename, 'w', encoding='utf-8') as f:
         json.dump(results_data, f, ensure_ascii=False, indent=2)
     
-    print(f"총 {len(unique_flights_list)}개의 왕복 조합을 분석했습니다.")
+    print(f"총 {len(unique_rows)}개의 왕복 조합을 분석했습니다.")
     print(f"결과가 '{output_filename}' 파일에 저장되었습니다.")
     
     # 최종 요약 보고서 생성
-    create_naver_summary_report(results_data, unique_flights_list, origin, destination)
+    create_naver_summary_report(results_data, None, origin, destination)
     
     return top_5_results
 
-def create_naver_summary_report(results_data, unique_flights_list, origin='PUS', destination='NRT'):
-    """네이버 항공권 최종 요약 보고서 생성 (재사용 가능)"""
+def create_naver_summary_report(results_data, unique_flights_list=None, origin='PUS', destination='NRT'):
+    """네이버 항공권 최종 요약 보고서 생성 (재사용 가능)
+
+    results_data 에 price_statistics / flight_statistics 가 있으면 그대로 쓰고,
+    없으면 unique_flights_list 에서 계산한다.
+    """
     route_name = f"{origin} ↔ {destination}"
     
     # 공항명 매핑
@@ -262,15 +579,22 @@ def create_naver_summary_report(results_data, unique_flights_list, origin='PUS',
             summary_content += f"| {i} | {result['departure_date']} | {result['return_date']} | {result['flight_number']} | {result['total_price']} | {result['departure_time']} | {result['arrival_time']} | {result['duration']} |\n"
     
     # 통계 정보
-    price_range = [f['price_numeric'] for f in unique_flights_list]
-    min_price = min(price_range)
-    max_price = max(price_range)
-    avg_price = sum(price_range) / len(price_range)
+    price_stats = results_data.get('price_statistics')
+    if price_stats is None:
+        price_range = [f['price_numeric'] for f in unique_flights_list]
+        price_stats = {
+            'min_price': min(price_range),
+            'max_price': max(price_range),
+            'avg_price': sum(price_range) / len(price_range),
+        }
+    min_price = price_stats['min_price']
+    max_price = price_stats['max_price']
+    avg_price = price_stats['avg_price']
     
     summary_content += f"""
 ## 검색 요약
 
-- **총 조합 수**: {len(unique_flights_list)}개
+- **총 조합 수**: {results_data['search_summary']['total_combinations']}개
 - **분석 일시**: {results_data['search_summary']['analysis_date']}
 - **데이터 소스**: 네이버 항공권 MCP
 - **오류 발생**: 없음
@@ -286,13 +610,15 @@ def create_naver_summary_report(results_data, unique_flights_list, origin='PUS',
 """
     
     # 항공편별 통계
-    flights = {}
-    for result in unique_flights_list:
-        flight_num = result['flight_number']
-        if flight_num not in flights:
-            flights[flight_num] = {'count': 0, 'min_price': float('inf')}
-        flights[flight_num]['count'] += 1
-        flights[flight_num]['min_price'] = min(flights[flight_num]['min_price'], result['price_numeric'])
+    flights = results_data.get('flight_statistics')
+    if flights is None:
+        flights = {}
+        for result in unique_flights_list:
+            flight_num = result['flight_number']
+            if flight_num not in flights:
+                flights[flight_num] = {'count': 0, 'min_price': float('inf')}
+            flights[flight_num]['count'] += 1
+            flights[flight_num]['min_price'] = min(flights[flight_num]['min_price'], result['price_numeric'])
     
     for flight_num, stats in sorted(flights.items(), key=lambda x: x[1]['min_price']):
         summary_content += f"- **{flight_num}**: {stats['count']}개 조합, 최저가 ₩{stats['min_price']:,}\n"
@@ -331,19 +657,33 @@ def create_naver_summary_report(results_data, unique_flights_list, origin='PUS',
 def main():
     """메인 실행 함수"""
     parser = argparse.ArgumentParser(description='네이버 항공권 데이터 통합 처리 도구')
-    parser.add_argument('file_path', help='처리할 JSON 파일 경로')
+    parser.add_argument('file_path', nargs='+',
+                        help='처리할 JSON / JSONL / 견적(.quotes.json.gz) 파일, 디렉터리 또는 glob 패턴 (여러 개면 노선별로 합쳐서 분석)')
     parser.add_argument('--origin', '-o', help='출발지 공항코드 (자동 감지 가능)')
     parser.add_argument('--destination', '-d', help='도착지 공항코드 (자동 감지 가능)')
+    parser.add_argument('--workers', '-w', type=int, help='여러 파일을 읽을 프로세스 수 (기본값: CPU 수)')
     
     args = parser.parse_args()
     
     try:
-        # 네이버 항공권 데이터 처리
-        results = process_naver_flight_data(
-            file_path=args.file_path,
-            origin=args.origin.upper() if args.origin else None,
-            destination=args.destination.upper() if args.destination else None
-        )
+        origin = args.origin.upper() if args.origin else None
+        destination = args.destination.upper() if args.destination else None
+        files = resolve_input_files(args.file_path)
+        
+        # 네이버 항공권 데이터 처리 (파일 하나면 기존 단일 파일 처리)
+        if len(files) == 1:
+            results = process_naver_flight_data(
+                file_path=files[0],
+                origin=origin,
+                destination=destination
+            )
+        else:
+            results = process_naver_flight_files(
+                files,
+                origin=origin,
+                destination=destination,
+                workers=args.workers
+            )
         
         if results:
             print(f"\n✅ 네이버 항공권 데이터 처리 완료!")
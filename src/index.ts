@@ -4,7 +4,19 @@ import { McpServer } from "@modelcontextprotocol/sdk/server/mcp.js";
 import { StdioServerTransport } from "@modelcontextprotocol/sdk/server/stdio.js";
 import { z } from "zod";
 import type { CallToolResult } from "@modelcontextprotocol/sdk/types.js";
-import { searchNaverFlights } from "./tools/NaverFlightSearch.js";
+import {
+  DEFAULT_TOP_K,
+  DEFAULT_UPSTREAM_LIMIT,
+  MAX_OPEN_RETURN_DAYS,
+  MAX_SEARCH_TIMEOUT_MS,
+  MAX_TOP_K,
+  MAX_VIA_COUNT,
+  getSearchMetrics,
+  getSearchStats,
+  parseTimeWindow,
+  searchNaverFlights,
+  type SearchFilters,
+} from "./tools/NaverFlightSearch.js";
 
 // Create server instance
 const server = new McpServer({
@@ -12,6 +24,13 @@ const server = new McpServer({
   version: "1.0.0",
 });
 
+// 출발 시각 범위 인자 ("06:00-12:00", 자정을 넘는 "22:00-02:00"도 가능)
+const timeWindowArg = z
+  .string()
+  .refine((value) => parseTimeWindow(value) !== null, {
+    message: "HH:MM-HH:MM 형식이어야 합니다",
+  });
+
 // Register flight search tool
 server.tool(
   "search_naver_flights",
@@ -27,20 +46,133 @@ server.tool(
       .describe(
         "항공사 코드 배열 (예: ['7C', 'KE', 'OZ'] - 제주항공, 대한항공, 아시아나항공)"
       ),
+    format: z
+      .enum(["text", "json"])
+      .optional()
+      .describe(
+        "결과 형식 (기본값: text). json이면 순위별 전체 항공편을 구조화된 JSON으로 반환"
+      ),
+    topK: z
+      .number()
+      .int()
+      .min(1)
+      .max(MAX_TOP_K)
+      .optional()
+      .describe(
+        `반환할 최저가 항공편 수 (기본값: ${DEFAULT_TOP_K}, 최대 ${MAX_TOP_K})`
+      ),
+    openReturnDays: z
+      .number()
+      .int()
+      .min(0)
+      .max(MAX_OPEN_RETURN_DAYS)
+      .optional()
+      .describe(
+        `복귀일을 returnDate부터 며칠 더 열어 둘지 (기본값: 0, 최대 ${MAX_OPEN_RETURN_DAYS}). 0보다 크면 복귀일마다 topK개씩 반환`
+      ),
+    coarse: z
+      .boolean()
+      .optional()
+      .describe(
+        "true이면 첫 검색 결과만 받아 대략적인 최저가를 빠르게 반환 (판매처 응답을 끝까지 기다리지 않음)"
+      ),
+    outboundDepartureTime: timeWindowArg
+      .optional()
+      .describe("가는편 출발 시각 범위 (예: 06:00-12:00)"),
+    returnDepartureTime: timeWindowArg
+      .optional()
+      .describe("오는편 출발 시각 범위 (예: 14:00-22:00)"),
+    maxDurationMinutes: z
+      .number()
+      .int()
+      .positive()
+      .optional()
+      .describe("편도 여정 최대 소요시간 (분)"),
+    maxFare: z.number().int().positive().optional().describe("최대 총요금 (원)"),
+    maxVia: z
+      .number()
+      .int()
+      .min(0)
+      .max(MAX_VIA_COUNT)
+      .optional()
+      .describe(
+        `최대 경유 횟수 (기본값: 직항만, 최대 ${MAX_VIA_COUNT}). 1 이상이면 경유편도 검색`
+      ),
+    limit: z
+      .number()
+      .int()
+      .min(1)
+      .max(DEFAULT_UPSTREAM_LIMIT)
+      .optional()
+      .describe(
+        `네이버 API가 돌려줄 여정 수 (기본값: ${DEFAULT_UPSTREAM_LIMIT}). 작을수록 응답이 가벼움`
+      ),
+    requestId: z
+      .string()
+      .max(64)
+      .optional()
+      .describe("호출 측 요청 id (단계별 소요 시간 추적에 함께 기록)"),
+    timeoutMs: z
+      .number()
+      .int()
+      .min(1000)
+      .max(MAX_SEARCH_TIMEOUT_MS)
+      .optional()
+      .describe(
+        "검색 전체 제한 시간 (ms). 속도 제한 대기, 재시도, 재시도 대기를 모두 포함하며 넘기면 그때까지의 결과로 응답"
+      ),
   },
-  async ({
-    departure,
-    arrival,
-    departureDate,
-    returnDate,
-    airlines,
-  }): Promise<CallToolResult> => {
+  async (
+    {
+      departure,
+      arrival,
+      departureDate,
+      returnDate,
+      airlines,
+      format,
+      topK,
+      openReturnDays,
+      coarse,
+      outboundDepartureTime,
+      returnDepartureTime,
+      maxDurationMinutes,
+      maxFare,
+      maxVia,
+      limit,
+      requestId,
+      timeoutMs,
+    },
+    extra
+  ): Promise<CallToolResult> => {
+    const filters: SearchFilters = {
+      ...(outboundDepartureTime && {
+        outboundDepartureTime: parseTimeWindow(outboundDepartureTime)!,
+      }),
+      ...(returnDepartureTime && {
+        returnDepartureTime: parseTimeWindow(returnDepartureTime)!,
+      }),
+      ...(maxDurationMinutes !== undefined && { maxDurationMinutes }),
+      ...(maxFare !== undefined && { maxFare }),
+      ...(maxVia !== undefined && { maxVia }),
+      ...(limit !== undefined && { limit }),
+    };
+    // 같은 조건으로 동시에 들어온 검색은 업스트림 요청을 공유한다 (searchNaverFlights 참고)
     const result = await searchNaverFlights(
       departure,
       arrival,
       departureDate,
       returnDate,
-      airlines
+      airlines,
+      {
+        format,
+        topK,
+        openReturnDays,
+        coarse,
+        filters,
+        requestId,
+        timeoutMs,
+        signal: extra.signal,
+      }
     );
 
     // ✅ 반드시 type: "text" 를 리터럴로 명시
@@ -48,6 +180,40 @@ server.tool(
   }
 );
 
+// Register server stats tool
+server.tool(
+  "get_naver_flight_stats",
+  "검색 응답 캐시, 요청 속도 제어, 연결 재사용, 동일 검색 합치기 등 서버 상태 통계를 JSON으로 조회합니다",
+  {},
+  async (): Promise<CallToolResult> => {
+    return {
+      content: [
+        {
+          type: "text",
+          text: JSON.stringify(getSearchStats(), null, 2),
+        },
+      ],
+    };
+  }
+);
+
+// Register metrics tool
+server.tool(
+  "get_naver_flight_metrics",
+  "검색 단계별(대기, 첫 바이트, SSE 다운로드 / 파싱, 데이터 처리, 포맷팅) 소요 시간 히스토그램과 재시도 / 429 / 캐시 적중 / 빈 결과 카운터를 조회합니다",
+  {
+    format: z
+      .enum(["prometheus", "json"])
+      .optional()
+      .describe("출력 형식: prometheus(기본값, 텍스트) 또는 json"),
+  },
+  async ({ format }): Promise<CallToolResult> => {
+    return {
+      content: [{ type: "text", text: getSearchMetrics(format ?? "prometheus") }],
+    };
+  }
+);
+
 // Start the server
 async function main() {
   const transport = new StdioServerTransport();
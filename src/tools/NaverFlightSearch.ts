@@ -1,14 +1,53 @@
 import { z } from "zod";
 import fetch from "node-fetch";
-
+import { parseNumberEnv } from "../utils/env.js";
+import {
+  KeepAliveAgents,
+  keepAliveAgentOptionsFromEnv,
+} from "../utils/HttpAgent.js";
+import { TopK } from "../utils/TopK.js";
+import {
+  RateController,
+  type RequestOutcome,
+  rateControllerOptionsFromEnv,
+} from "../utils/RateController.js";
+import {
+  ResponseCache,
+  hashPayload,
+  responseCacheOptionsFromEnv,
+} from "../utils/ResponseCache.js";
+import {
+  SearchAbortError,
+  SearchDeadline,
+  type SearchAbortReason,
+} from "../utils/Deadline.js";
+import {
+  SearchMetrics,
+  type SearchPhase,
+  type SearchTrace,
+  type TraceSummary,
+  metricsOptionsFromEnv,
+} from "../utils/Metrics.js";
+import {
+  SearchRecorder,
+  type SearchResponse,
+  searchRecorderOptionsFromEnv,
+} from "../utils/SearchRecorder.js";
+import {
+  Singleflight,
+  SingleflightExpiredError,
+} from "../utils/Singleflight.js";
+
+// 벤치마크 / 오프라인 실행에서는 로컬 대역 서버로 바꿔 쓸 수 있다
 const NAVER_FLIGHT_API_BASE =
+  process.env.NAVER_FLIGHT_API_BASE ||
   "https://flight-api.naver.com/flight/international/searchFlights";
 const USER_AGENT =
   "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36";
 
-// 전역 검색 간격 제어 (Rate Limiting 방지)
-let lastSearchTime = 0;
-const MIN_SEARCH_INTERVAL = 3000; // 3초 최소 간격 (네이버 API 특성 고려)
+// 검색 간격 / 동시 요청 수 제어 (Rate Limiting 방지)
+// 429와 타임아웃에 맞춰 적응하며, 같은 호스트의 다른 서버 / CLI 프로세스와 상태를 공유한다.
+const rateController = new RateController(rateControllerOptionsFromEnv());
 
 // API 응답 타입 정의
 interface FlightSegment {
@@ -97,6 +136,11 @@ interface NaverFlightApiResponse {
   popularFlights: any[];
 }
 
+// 검색 응답 캐시 (여러 서버 프로세스가 같은 디렉터리를 공유할 수 있음)
+const responseCache = new ResponseCache<NaverFlightApiResponse>(
+  responseCacheOptionsFromEnv()
+);
+
 interface ProcessedFlight {
   rank: number;
   departureDate: string;
@@ -110,89 +154,349 @@ interface ProcessedFlight {
   returnDeparture: string;
   returnArrival: string;
   returnDuration: number;
+  outboundStops: number;
+  returnStops: number;
+  partnerCode: string;
 }
 
-// Helper function for making Naver Flight API requests with retry logic
-async function makeNaverFlightRequest<T>(
-  payload: any,
-  retryCount = 3
-): Promise<T | null> {
-  const headers = {
-    "Content-Type": "application/json",
-    Accept: "text/event-stream",
-    "User-Agent": USER_AGENT,
-    Referer: "https://flight.naver.com/",
-    "Accept-Language": "ko-KR,ko;q=0.9,en;q=0.8",
-    "Cache-Control": "no-cache",
-    Pragma: "no-cache",
-  };
+// 결과로 돌려주는 최저가 항공편 수 (기본값 / 최대값)
+export const DEFAULT_TOP_K = 10;
+export const MAX_TOP_K = 200;
+// 복귀일을 며칠까지 열어 둘 수 있는지 (openReturnDays 상한)
+export const MAX_OPEN_RETURN_DAYS = 7;
+// 업스트림이 한 번에 돌려주는 여정 수 (flightFilter.limit 기본값 / 최대값)
+export const DEFAULT_UPSTREAM_LIMIT = 200;
+// 허용할 수 있는 최대 경유 횟수 (maxVia 상한)
+export const MAX_VIA_COUNT = 2;
+
+// 출발 시각 범위 ("HHMM", from > to 이면 자정을 넘는 범위)
+export interface TimeWindow {
+  from: string;
+  to: string;
+}
 
-  for (let attempt = 1; attempt <= retryCount; attempt++) {
-    try {
-      console.log(`네이버 항공권 API 요청 시도 ${attempt}/${retryCount}`);
+// 업스트림 flightFilter 로 내려보내는 검색 조건
+// (응답 자체를 줄이고, 업스트림이 무시하는 경우에 대비해 결과에도 같은 조건을 다시 적용)
+export interface SearchFilters {
+  outboundDepartureTime?: TimeWindow; // 가는편 출발 시각 범위
+  returnDepartureTime?: TimeWindow; // 오는편 출발 시각 범위
+  maxDurationMinutes?: number; // 편도 여정 최대 소요시간 (분)
+  maxFare?: number; // 최대 총요금 (원)
+  maxVia?: number; // 최대 경유 횟수 (지정하지 않으면 직항만 검색)
+  limit?: number; // 업스트림이 돌려줄 여정 수 (기본값 200)
+}
 
-      // 요청 간 지연 시간 추가 (Rate Limiting 방지)
-      if (attempt > 1) {
-        const delay = attempt * 3000; // 3초, 6초, 9초... (네이버 API 특성 고려)
-        console.log(`${delay}ms 대기 중...`);
-        await new Promise((resolve) => setTimeout(resolve, delay));
-      }
+// "06:00-12:00" / "0600-1200" -> { from: "0600", to: "1200" }
+export function parseTimeWindow(value: string): TimeWindow | null {
+  const match = /^(\d{1,2}):?(\d{2})\s*-\s*(\d{1,2}):?(\d{2})$/.exec(
+    value.trim()
+  );
+  if (!match) return null;
+  const [hh1, mm1, hh2, mm2] = match.slice(1).map(Number);
+  if (hh1 > 24 || hh2 > 24 || mm1 > 59 || mm2 > 59) return null;
+  const hhmm = (h: number, m: number) =>
+    `${String(h).padStart(2, "0")}${String(m).padStart(2, "0")}`;
+  return { from: hhmm(hh1, mm1), to: hhmm(hh2, mm2) };
+}
+
+function inTimeWindow(time: string, window?: TimeWindow): boolean {
+  if (!window) return true;
+  const t = time.padStart(4, "0");
+  return window.from <= window.to
+    ? t >= window.from && t <= window.to
+    : t >= window.from || t <= window.to;
+}
 
-      const controller = new AbortController();
-      const timeoutId = setTimeout(() => controller.abort(), 10000); // 10초 타임아웃 (네이버 API 특성 고려)
+// flightFilter.departureTime 의 한 여정분 (자정을 넘는 범위는 두 구간으로 나눔)
+function departureTimeFilter(window?: TimeWindow) {
+  if (!window) return [];
+  return window.from <= window.to
+    ? [{ from: window.from, to: window.to }]
+    : [
+        { from: window.from, to: "2359" },
+        { from: "0000", to: window.to },
+      ];
+}
+
+const REQUEST_HEADERS = {
+  "Content-Type": "application/json",
+  Accept: "text/event-stream",
+  "User-Agent": USER_AGENT,
+  Referer: "https://flight.naver.com/",
+  "Accept-Language": "ko-KR,ko;q=0.9,en;q=0.8",
+  "Cache-Control": "no-cache",
+  Pragma: "no-cache",
+};
+
+const REQUEST_TIMEOUT = 10000; // 10초 타임아웃 (네이버 API 특성 고려)
+export const MAX_SEARCH_TIMEOUT_MS = 600000; // timeoutMs 인자 상한 (10분)
+
+// 모든 검색 요청이 공유하는 keep-alive 연결 (TCP / TLS 핸드셰이크 재사용)
+const httpAgents = new KeepAliveAgents(keepAliveAgentOptionsFromEnv());
+
+// 검색이 덜 끝난 경우 같은 검색을 이어서 조회하는 간격과 전체 제한 시간
+const POLL_INTERVAL = parseNumberEnv(
+  process.env.NAVER_FLIGHT_POLL_INTERVAL_MS,
+  2000
+);
+const POLL_DEADLINE = parseNumberEnv(
+  process.env.NAVER_FLIGHT_POLL_DEADLINE_MS,
+  8000
+);
+// 요청한 판매처 중 이 비율 이상이 응답했으면 충분한 결과로 간주
+const MIN_COMPLETED_PARTNER_RATIO = 0.8;
+
+function sleep(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+// 검색 단계별 소요 시간과 카운터 (get_naver_flight_metrics, NAVER_FLIGHT_TRACE_FILE)
+const searchMetrics = new SearchMetrics(metricsOptionsFromEnv());
 
-      const response = await fetch(NAVER_FLIGHT_API_BASE, {
+// 검색 요청 기록 / 재생 (NAVER_FLIGHT_RECORD_DIR / NAVER_FLIGHT_REPLAY_DIR)
+const searchRecorder = new SearchRecorder(searchRecorderOptionsFromEnv());
+
+// 검색 요청 하나 전송 (요청마다 새 AbortController / 타임아웃 사용)
+// controller 는 응답 본문을 읽는 동안에도 살아 있으므로 검색 제한 시간 / 취소로 본문 읽기도 끊을 수 있다.
+// 재생 모드에서는 네트워크 대신 기록된 응답을 돌려준다.
+async function postSearch(
+  payload: any,
+  controller = new AbortController(),
+  timeoutMs = REQUEST_TIMEOUT
+): Promise<SearchResponse> {
+  return searchRecorder.request(payload, async () => {
+    const timeoutId = setTimeout(() => controller.abort(), timeoutMs);
+    try {
+      return await fetch(NAVER_FLIGHT_API_BASE, {
         method: "POST",
-        headers,
+        headers: REQUEST_HEADERS,
         body: JSON.stringify(payload),
         signal: controller.signal,
+        agent: httpAgents.agentFor,
       });
-
+    } finally {
       clearTimeout(timeoutId);
+    }
+  });
+}
 
-      if (!response.ok) {
-        if (response.status === 429) {
-          console.log(
-            `Rate limit 도달 (429), ${attempt * 5000}ms 대기 후 재시도`
-          );
-          await new Promise((resolve) => setTimeout(resolve, attempt * 5000));
+function isTimeoutError(error: unknown): boolean {
+  return (
+    (error as any)?.name === "AbortError" ||
+    (error as any)?.message?.includes("timeout")
+  );
+}
+
+// 검색 한 번이 네이버 API에 실제로 보낸 요청 수 (재시도, 후속 조회 포함)
+// trace 가 있으면 대기 / 전송 / SSE 처리 구간도 함께 기록한다.
+// deadline 이 있으면 속도 제어 대기, 요청, 재시도 대기가 모두 그 안에서 끝나야 한다.
+interface RequestUsage {
+  upstreamRequests: number;
+  trace?: SearchTrace;
+  deadline?: SearchDeadline;
+}
+
+// 제한 시간 / 취소를 따르는 대기 (중단되면 SearchAbortError)
+async function pause(
+  ms: number,
+  phase: SearchPhase,
+  usage?: RequestUsage
+): Promise<void> {
+  const wait = () => (usage?.deadline ? usage.deadline.sleep(ms) : sleep(ms));
+  await (usage?.trace ? usage.trace.time(phase, wait) : wait());
+}
+
+// 속도 제어 슬롯을 얻어 검색 요청 하나를 보내고 SSE 응답까지 처리
+// 결과(성공 / 429 / 타임아웃)는 속도 제어기에 반영된다.
+async function requestSearch(
+  payload: any,
+  usage?: RequestUsage,
+  sseOptions: SSEStreamOptions = {}
+): Promise<{
+  ok: boolean;
+  status: number;
+  result: NaverFlightApiResponse | null;
+}> {
+  const trace = usage?.trace;
+  const deadline = usage?.deadline;
+  const waitStartedAt = performance.now();
+  const lease = await rateController.acquire(deadline);
+  trace?.add("rate_wait", performance.now() - waitStartedAt, waitStartedAt);
+  let outcome: RequestOutcome = "error";
+  // 검색 제한 시간 / 취소가 진행 중인 요청도 끊도록 연결
+  const controller = new AbortController();
+  const abort = () => controller.abort();
+  deadline?.signal.addEventListener("abort", abort, { once: true });
+  try {
+    if (usage) usage.upstreamRequests++;
+    trace?.count("upstream_requests");
+    const sentAt = performance.now();
+    const response = await postSearch(
+      payload,
+      controller,
+      deadline ? deadline.cap(REQUEST_TIMEOUT) : REQUEST_TIMEOUT
+    );
+    trace?.add("http_ttfb", performance.now() - sentAt, sentAt);
+    if (!response.ok) {
+      outcome = response.status === 429 ? "rate_limited" : "error";
+      // 본문을 끝까지 읽어야 연결이 keep-alive 풀로 돌아간다
+      await response.arrayBuffer().catch(() => undefined);
+      return { ok: false, status: response.status, result: null };
+    }
+    const result = await processSSEStream(response, {
+      ...sseOptions,
+      trace,
+      signal: deadline?.signal,
+    });
+    // 중단된 스트림의 부분 결과는 쓰되 속도 조정에는 반영하지 않는다
+    outcome = deadline?.done ? "cancelled" : "success";
+    return { ok: true, status: response.status, result };
+  } catch (error) {
+    if (deadline?.done) {
+      // 업스트림 탓이 아닌 중단은 속도 조정에 반영하지 않는다
+      outcome = "cancelled";
+      throw new SearchAbortError(deadline.reason ?? "deadline");
+    }
+    outcome = isTimeoutError(error) ? "timeout" : "error";
+    throw error;
+  } finally {
+    deadline?.signal.removeEventListener("abort", abort);
+    if (outcome === "rate_limited") trace?.count("rate_limited");
+    if (outcome === "timeout") trace?.count("timeouts");
+    if (outcome === "error") trace?.count("errors");
+    await rateController.release(lease, outcome);
+  }
+}
+
+// 더 기다려도 결과가 늘어나지 않는 상태인지 (검색 완료 또는 판매처 대부분 응답)
+function isSearchSettled(result: NaverFlightApiResponse | null): boolean {
+  if (!result) return false;
+  const status = result.status;
+  if (!status || status.isCompleted) return true;
+  const requested = status.requestedPartnerCount || 0;
+  return (
+    requested > 0 &&
+    status.completedPartnerCount >= requested * MIN_COMPLETED_PARTNER_RATIO
+  );
+}
+
+// 이미 시작된 검색(status.searchKey)을 initialRequest: false 로 이어서 조회
+// 새 검색을 다시 시작하지 않고 판매처 응답이 충분히 모일 때까지 기다린다.
+async function pollSearch(
+  payload: any,
+  initial: NaverFlightApiResponse | null,
+  usage?: RequestUsage
+): Promise<NaverFlightApiResponse | null> {
+  const pollPayload = { ...payload, initialRequest: false };
+  // 검색 제한 시간이 더 짧으면 그때까지만 조회
+  const deadline = Math.min(
+    Date.now() + POLL_DEADLINE,
+    usage?.deadline?.expiresAt ?? Infinity
+  );
+  let best = initial;
+  let polls = 0;
+
+  while (!isSearchSettled(best) && Date.now() + POLL_INTERVAL < deadline) {
+    const status = best?.status;
+    console.log(
+      `검색 진행 중 (판매처 ${status?.completedPartnerCount ?? 0}/${
+        status?.requestedPartnerCount ?? "?"
+      }), ${POLL_INTERVAL}ms 후 이어서 조회...`
+    );
+
+    let response;
+    try {
+      await pause(POLL_INTERVAL, "poll_wait", usage);
+      polls++;
+      response = await requestSearch(pollPayload, usage);
+    } catch (error) {
+      // 제한 시간 / 취소: 그때까지 모인 부분 결과를 돌려준다
+      if (!(error instanceof SearchAbortError)) throw error;
+      console.log(`${error.message}, 후속 조회 중단`);
+      break;
+    }
+    const { ok, status: httpStatus, result: next } = response;
+    if (!ok) {
+      console.log(`후속 조회 실패 (status: ${httpStatus}), 조회 중단`);
+      break;
+    }
+
+    if (
+      next &&
+      (!best ||
+        (next.status?.completedPartnerCount ?? 0) >=
+          (best.status?.completedPartnerCount ?? 0))
+    ) {
+      best = next;
+    }
+  }
+
+  console.log(
+    `후속 조회 ${polls}회 완료 - 항공편 ${best?.itineraries?.length ?? 0}개`
+  );
+  return best;
+}
+
+interface FlightRequestOptions {
+  // 첫 유효 프레임만 받고 후속 조회 없이 반환 (대략적인 가격 확인용)
+  coarse?: boolean;
+  usage?: RequestUsage;
+}
+
+// Helper function for making Naver Flight API requests with retry logic
+// 429 / 타임아웃 뒤의 대기는 속도 제어기가 늘린 간격으로 처리된다.
+async function makeNaverFlightRequest(
+  payload: any,
+  retryCount = 3,
+  options: FlightRequestOptions = {}
+): Promise<NaverFlightApiResponse | null> {
+  const { coarse = false, usage } = options;
+  try {
+    return await requestWithRetry(payload, retryCount, coarse, usage);
+  } catch (error) {
+    // 제한 시간 / 취소: 재시도하지 않고 끝낸다
+    if (!(error instanceof SearchAbortError)) throw error;
+    console.log(`${error.message}, 검색 중단`);
+    return null;
+  }
+}
+
+// 재시도 루프 (제한 시간 / 취소는 SearchAbortError 로 빠져나온다)
+async function requestWithRetry(
+  payload: any,
+  retryCount: number,
+  coarse: boolean,
+  usage?: RequestUsage
+): Promise<NaverFlightApiResponse | null> {
+  for (let attempt = 1; attempt <= retryCount; attempt++) {
+    try {
+      console.log(`네이버 항공권 API 요청 시도 ${attempt}/${retryCount}`);
+
+      const { ok, status, result: first } = await requestSearch(
+        payload,
+        usage,
+        coarse ? { minItineraries: 1 } : {}
+      );
+
+      if (!ok) {
+        if (status === 429) {
+          console.log("Rate limit 도달 (429), 요청 간격을 늘린 뒤 재시도");
+          if (attempt < retryCount) usage?.trace?.count("retries");
           continue;
         }
-        throw new Error(`HTTP error! status: ${response.status}`);
+        throw new Error(`HTTP error! status: ${status}`);
       }
 
-      // SSE 스트림 처리 - 여러 번 시도해서 완전한 데이터 수집
-      let result = (await processSSEStream(response)) as T;
-
-      // 데이터가 부족한 경우 추가 대기 후 재시도
-      if (!result || (result as any).itineraries?.length < 5) {
-        console.log("데이터가 부족함, 추가 대기 후 재시도...");
-        await new Promise((resolve) => setTimeout(resolve, 3000)); // 3초 대기
-
-        // 같은 요청을 다시 시도
-        const retryResponse = await fetch(NAVER_FLIGHT_API_BASE, {
-          method: "POST",
-          headers,
-          body: JSON.stringify(payload),
-          signal: controller.signal,
-        });
-
-        if (retryResponse.ok) {
-          const retryResult = (await processSSEStream(retryResponse)) as T;
-          if (
-            retryResult &&
-            (retryResult as any).itineraries?.length >
-              (result as any)?.itineraries?.length
-          ) {
-            result = retryResult;
-            console.log("재시도로 더 많은 데이터 획득");
-          }
-        }
-      }
+      // 검색이 아직 진행 중이면 같은 검색을 다시 시작하지 않고 이어서 조회
+      const result =
+        coarse || isSearchSettled(first)
+          ? first
+          : await pollSearch(payload, first, usage);
 
       console.log(`API 요청 성공 (시도 ${attempt}/${retryCount})`);
       return result;
     } catch (error) {
+      if (error instanceof SearchAbortError) throw error;
       console.error(
         `네이버 항공권 API 요청 실패 (시도 ${attempt}/${retryCount}):`,
         error
@@ -203,19 +507,21 @@ async function makeNaverFlightRequest<T>(
         return null;
       }
 
-      // 네트워크 오류나 타임아웃의 경우 더 긴 대기 (네이버 API 특성 고려)
-      if (
-        (error as any).name === "AbortError" ||
-        (error as any).message?.includes("timeout")
-      ) {
-        console.log(
-          `타임아웃 또는 네트워크 오류, ${attempt * 2000}ms 대기 후 재시도`
-        );
-        await new Promise((resolve) => setTimeout(resolve, attempt * 2000));
+      usage?.trace?.count("retries");
+      // 타임아웃이 아닌 오류 (서버 오류, 네트워크 오류)는 잠시 대기 후 재시도
+      if (!isTimeoutError(error)) {
+        const delay = attempt * 3000; // 3초, 6초... (네이버 API 특성 고려)
+        if (usage?.deadline && usage.deadline.remainingMs() <= delay) {
+          // 대기가 끝나기 전에 제한 시간이 지나므로 바로 포기
+          throw new SearchAbortError("deadline");
+        }
+        console.log(`${delay}ms 대기 후 재시도`);
+        await pause(delay, "retry_backoff", usage);
       }
     }
   }
 
+  console.error("모든 재시도 실패");
   return null;
 }
 
@@ -265,52 +571,187 @@ function parseSSE(text: string): any {
   return JSON.parse(dataLine.substring(6));
 }
 
-// SSE 스트림을 완전히 처리하는 함수 (node-fetch 호환)
-async function processSSEStream(response: any): Promise<any> {
-  const text = await response.text();
-  const lines = text.split("\n");
+// SSE 스트림 처리 옵션
+export interface SSEStreamOptions {
+  // 항공편 수가 이 값 이상인 프레임을 받으면 스트림 끝을 기다리지 않고 반환
+  minItineraries?: number;
+  // 본문 조각을 기다린 시간(sse_download)과 프레임 처리 시간(sse_parse)을 기록
+  trace?: SearchTrace;
+  // 중단되면 남은 본문을 읽지 않고 그때까지 받은 프레임으로 반환, 쓸 프레임이 없으면 signal.reason 을 던짐
+  // (재생 모드 본문에도 적용)
+  signal?: AbortSignal;
+}
 
-  let lastValidData: any = null;
+// JSON 파싱 없이 프레임 내용을 확인하기 위한 패턴
+const NON_EMPTY_ITINERARIES = /"itineraries"\s*:\s*\[\s*\{/;
+const NON_EMPTY_FARE_MAPPINGS = /"fareMappings"\s*:\s*\[\s*\{/;
+const SEARCH_COMPLETED = /"isCompleted"\s*:\s*true/;
+
+// 마지막 프레임이 잘리거나 깨졌을 때 대신 쓸 이전 프레임 수
+const MAX_FALLBACK_FRAMES = 2;
+
+// SSE 스트림을 조각 단위로 읽으며 처리하는 함수 (node-fetch 호환)
+// - 조각 경계에 걸친 프레임은 이어 붙여서 처리
+// - 뒤에 더 새로운 프레임이 오면 이전 프레임은 JSON 파싱하지 않고 버림
+// - status.isCompleted 프레임이나 minItineraries 를 만족하는 프레임을 받으면 바로 반환
+// - 끝에서 가장 새로운 프레임부터 거꾸로 파싱해 처음 파싱되는 프레임을 쓴다
+//   (제한 시간 / 중단으로 끊긴 스트림의 마지막 프레임은 잘려 있는 경우가 많음)
+// 메모리에는 읽는 중인 프레임과 최근 유효 프레임 몇 개만 남는다.
+export async function processSSEStream(
+  response: any,
+  options: SSEStreamOptions = {}
+): Promise<any> {
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let scanFrom = 0;
+  let dataLines: string[] = [];
+  let frameCount = 0;
+
+  // 최근 유효 프레임 (오래된 순, 필요할 때만 파싱)과 마지막으로 파싱에 성공한 프레임
+  let candidates: string[] = [];
+  let lastParsed: any = null;
 
   console.log("SSE 응답 처리 시작...");
 
-  for (const line of lines) {
-    if (line.startsWith("data: ")) {
-      try {
-        const data = JSON.parse(line.substring(6));
-        console.log(
-          `SSE 데이터 수신: 항공편 ${data.itineraries?.length || 0}개, 요금 ${
-            data.fareMappings?.length || 0
-          }개`
-        );
+  // 완성된 프레임 하나를 처리하고, 더 읽을 필요가 없으면 true 반환
+  const handleFrame = (data: string): boolean => {
+    frameCount++;
+    const completed = SEARCH_COMPLETED.test(data);
+
+    // 데이터가 있는 프레임만 유효한 결과로 취급
+    if (
+      !NON_EMPTY_ITINERARIES.test(data) ||
+      !NON_EMPTY_FARE_MAPPINGS.test(data)
+    ) {
+      return completed && (candidates.length > 0 || lastParsed !== null);
+    }
 
-        // 데이터가 있는 경우에만 업데이트
-        if (
-          data.itineraries &&
-          data.itineraries.length > 0 &&
-          data.fareMappings &&
-          data.fareMappings.length > 0
-        ) {
-          lastValidData = data;
-          console.log(
-            `유효한 데이터 발견: 항공편 ${data.itineraries.length}개, 요금 ${data.fareMappings.length}개`
-          );
-        }
+    candidates.push(data);
+    if (candidates.length > MAX_FALLBACK_FRAMES + 1) candidates.shift();
+    if (completed) return true;
+
+    if (options.minItineraries) {
+      try {
+        const parsed = JSON.parse(data);
+        const enough = parsed.itineraries.length >= options.minItineraries;
+        // 파싱된 프레임이 남은 후보보다 새로우므로 후보는 더 필요 없다
+        lastParsed = parsed;
+        candidates = [];
+        if (enough) return true;
       } catch (error) {
+        // 깨진 프레임만 버리고 이전 프레임은 대체용으로 남긴다
         console.log(`SSE 데이터 파싱 오류: ${error}`);
+        candidates.pop();
       }
     }
+    return false;
+  };
+
+  // 한 줄 처리 (빈 줄이면 프레임 끝)
+  const handleLine = (rawLine: string): boolean => {
+    const line = rawLine.endsWith("\r") ? rawLine.slice(0, -1) : rawLine;
+    if (line === "") {
+      if (dataLines.length === 0) return false;
+      const data = dataLines.join("\n");
+      dataLines = [];
+      return handleFrame(data);
+    }
+    if (line.startsWith("data:")) {
+      dataLines.push(line.slice(line.startsWith("data: ") ? 6 : 5));
+    }
+    return false;
+  };
+
+  const streamStartedAt = performance.now();
+  let waitStartedAt = streamStartedAt;
+  let downloadMs = 0;
+  let parseMs = 0;
+
+  let finishedEarly = false;
+  let aborted = false;
+  try {
+    readLoop: for await (const chunk of response.body) {
+      if (options.signal?.aborted) {
+        aborted = true;
+        break;
+      }
+      const chunkAt = performance.now();
+      downloadMs += chunkAt - waitStartedAt;
+      try {
+        buffer +=
+          typeof chunk === "string"
+            ? chunk
+            : decoder.decode(chunk, { stream: true });
+
+        let newline: number;
+        while ((newline = buffer.indexOf("\n", scanFrom)) !== -1) {
+          const line = buffer.slice(0, newline);
+          buffer = buffer.slice(newline + 1);
+          scanFrom = 0;
+          if (handleLine(line)) {
+            finishedEarly = true;
+            // 루프를 빠져나가면 응답 스트림도 닫힌다
+            break readLoop;
+          }
+        }
+        scanFrom = buffer.length;
+      } finally {
+        parseMs += performance.now() - chunkAt;
+        waitStartedAt = performance.now();
+      }
+    }
+  } catch (error) {
+    // 중단으로 본문 읽기가 끊긴 경우만 그때까지 받은 프레임으로 처리
+    if (!options.signal?.aborted) throw error;
+    aborted = true;
+  }
+  const parseStartedAt = performance.now();
+
+  if (aborted) {
+    console.log("검색 중단, 그때까지 받은 프레임으로 처리");
   }
+  if (!finishedEarly) {
+    // 스트림 끝 / 중단: 남은 줄과 마지막 프레임 처리 (잘린 프레임이면 이전 프레임 사용)
+    buffer += decoder.decode();
+    if (buffer !== "") handleLine(buffer);
+    handleLine("");
+  } else {
+    console.log("검색 완료 또는 충분한 데이터 수신, 나머지 스트림은 읽지 않음");
+  }
+
+  console.log(`SSE 프레임 ${frameCount}개 수신`);
 
-  if (!lastValidData) {
+  // 가장 새로운 프레임부터 거꾸로, 파싱되는 첫 프레임을 쓴다
+  let parsed: any = null;
+  while (parsed === null && candidates.length > 0) {
+    const frame = candidates.pop()!;
+    try {
+      const candidate = JSON.parse(frame);
+      if (
+        Array.isArray(candidate?.itineraries) &&
+        Array.isArray(candidate?.fareMappings)
+      ) {
+        parsed = candidate;
+      }
+    } catch (error) {
+      console.log(`SSE 데이터 파싱 오류: ${error}`);
+    }
+  }
+  parsed = parsed ?? lastParsed;
+  parseMs += performance.now() - parseStartedAt;
+  options.trace?.add("sse_download", downloadMs, streamStartedAt);
+  options.trace?.add("sse_parse", parseMs, streamStartedAt);
+
+  if (!parsed) {
+    if (aborted) throw options.signal!.reason;
     console.log("유효한 데이터를 찾을 수 없음");
     return null;
   }
 
   console.log(
-    `최종 데이터: 항공편 ${lastValidData.itineraries.length}개, 요금 ${lastValidData.fareMappings.length}개`
+    `최종 데이터: 항공편 ${parsed.itineraries.length}개, 요금 ${parsed.fareMappings.length}개`
   );
-  return lastValidData;
+  return parsed;
 }
 
 function validateDate(dateStr: string): boolean {
@@ -347,17 +788,26 @@ function createFlightSearchPayload(
   arrival: string,
   departureDate: string,
   returnDate: string,
-  airlines?: string[]
+  airlines?: string[],
+  openReturnDays = 0,
+  filters: SearchFilters = {}
 ) {
   // 항공사 필터가 있으면 isSameAirlines를 true로 설정
   const hasAirlineFilter = airlines && airlines.length > 0;
+  const hasTimeFilter =
+    filters.outboundDepartureTime !== undefined ||
+    filters.returnDepartureTime !== undefined;
+  const durationSeconds =
+    filters.maxDurationMinutes !== undefined
+      ? [0, filters.maxDurationMinutes * 60]
+      : null;
 
   return {
     adultCount: 1,
     childCount: 0,
     infantCount: 0,
     device: "pc",
-    isNonstop: true,
+    isNonstop: (filters.maxVia ?? 0) === 0, // 경유를 허용하면 직항 전용 검색을 끔
     seatClass: "Y",
     tripType: "RT",
     itineraries: [
@@ -376,41 +826,101 @@ function createFlightSearchPayload(
         departureDate: formatDate(returnDate),
       },
     ],
-    openReturnDays: 0,
+    openReturnDays, // 0보다 크면 복귀일을 그만큼 열어 두고 한 번에 검색
     flightFilter: {
       filter: {
         airlines: airlines || [],
         departureAirports: [[departure], []],
         arrivalAirports: [[], [departure]],
-        departureTime: [],
+        // 여정별 (가는편, 오는편) 조건, 조건이 없으면 기존처럼 빈 배열
+        departureTime: hasTimeFilter
+          ? [
+              departureTimeFilter(filters.outboundDepartureTime),
+              departureTimeFilter(filters.returnDepartureTime),
+            ]
+          : [],
         fareTypes: [],
-        flightDurationSeconds: [],
+        flightDurationSeconds: durationSeconds
+          ? [durationSeconds, durationSeconds]
+          : [],
         hasCardBenefit: true,
         isIndividual: false,
         isLowCarbonEmission: false,
         isSameAirlines: hasAirlineFilter, // 항공사 필터가 있으면 true로 설정
         isSameDepArrAirport: true,
         isTravelClub: false,
-        minFare: {},
-        viaCount: [],
+        minFare: filters.maxFare !== undefined ? { max: filters.maxFare } : {},
+        viaCount:
+          filters.maxVia !== undefined
+            ? Array.from({ length: filters.maxVia + 1 }, (_, i) => i)
+            : [],
         selectedItineraries: [],
       },
-      limit: 200,
+      limit: filters.limit ?? DEFAULT_UPSTREAM_LIMIT,
       skip: 0,
       sort: { adultMinFare: 1 },
     },
-    initialRequest: false, // 사용자 요청 형식에 맞게 false로 변경
+    initialRequest: true, // 새 검색 시작 (후속 조회는 pollSearch 에서 false 로 전송)
+  };
+}
+
+// 여정(가는편 또는 오는편) 요약
+interface LegSummary {
+  flight: string;
+  departure: string;
+  arrival: string;
+  duration: number;
+  date: string;
+  stops: number;
+}
+
+// 경유편이면 모든 구간의 편명을 "+"로 잇고, 출발은 첫 구간 / 도착은 마지막 구간 기준
+function summarizeItinerary(itinerary: Itinerary): LegSummary | null {
+  if (!itinerary.segments || itinerary.segments.length === 0) {
+    return null;
+  }
+  const segments = itinerary.segments;
+  const first = segments[0];
+  const last = segments[segments.length - 1];
+  return {
+    flight: segments
+      .map(
+        (seg) =>
+          seg.marketingCarrier.airlineCode + seg.marketingCarrier.flightNumber
+      )
+      .join("+"),
+    departure: first.departure.time,
+    arrival: last.arrival.time,
+    duration: formatDuration(itinerary.duration),
+    date: first.departure.date,
+    stops: segments.length - 1,
   };
 }
 
-function processFlightData(
-  apiResponse: NaverFlightApiResponse
+// 업스트림이 조건을 무시하거나 일부만 적용해도 결과가 조건을 벗어나지 않도록 여정을 다시 확인
+function legMatchesFilters(
+  leg: LegSummary,
+  window: TimeWindow | undefined,
+  filters: SearchFilters
+): boolean {
+  if (!inTimeWindow(leg.departure, window)) return false;
+  if (
+    filters.maxDurationMinutes !== undefined &&
+    leg.duration > filters.maxDurationMinutes
+  ) {
+    return false;
+  }
+  return filters.maxVia === undefined || leg.stops <= filters.maxVia;
+}
+
+// groupByReturnDate 가 true 이면 복귀일마다 최저가 k개씩 고른다 (복귀일을 열어 둔 검색용)
+export function processFlightData(
+  apiResponse: NaverFlightApiResponse,
+  topK = DEFAULT_TOP_K,
+  groupByReturnDate = false,
+  filters: SearchFilters = {}
 ): ProcessedFlight[] {
   try {
-    console.log(
-      `API 응답 처리 시작 - 항공편: ${apiResponse.itineraries.length}개, 요금: ${apiResponse.fareMappings.length}개`
-    );
-
     // API 응답 유효성 검사
     if (!apiResponse.itineraries || apiResponse.itineraries.length === 0) {
       console.log("항공편 정보가 없습니다");
@@ -422,78 +932,102 @@ function processFlightData(
       return [];
     }
 
-    // 모든 fare 추출 및 평탄화
-    const allFares = apiResponse.fareMappings.flatMap((mapping) =>
-      mapping.fares.map((f) => ({
-        itineraryIds: mapping.itineraryIds.split("-"),
-        totalFare: f.adult.totalFare,
-        partnerCode: f.partnerCode,
-        fareType: f.fareType,
-        isConfirmed: f.isConfirmed,
-      }))
+    console.log(
+      `API 응답 처리 시작 - 항공편: ${apiResponse.itineraries.length}개, 요금: ${apiResponse.fareMappings.length}개`
     );
 
-    console.log(`총 ${allFares.length}개의 요금 정보 발견`);
+    const k = Math.min(Math.max(1, Math.floor(topK) || 1), MAX_TOP_K);
 
-    // 가격 순 정렬
-    const sortedFares = allFares.sort((a, b) => a.totalFare - b.totalFare);
+    // itineraryId 색인 (요금마다 항공편 배열을 선형 탐색하지 않도록)
+    const legs = new Map<string, LegSummary | null>();
+    for (const itinerary of apiResponse.itineraries) {
+      legs.set(itinerary.itineraryId, summarizeItinerary(itinerary));
+    }
 
-    // 상위 10개 선택
-    const top10 = sortedFares.slice(0, 10);
+    // 같은 여정 조합 + 판매처 중 최저가만 남김
+    const cheapest = new Map<
+      string,
+      { itineraryIds: string; partnerCode: string; totalFare: number }
+    >();
+    let fareCount = 0;
+    for (const mapping of apiResponse.fareMappings) {
+      for (const fare of mapping.fares ?? []) {
+        fareCount++;
+        const totalFare = fare.adult?.totalFare;
+        if (!(totalFare > 0)) continue;
+        if (filters.maxFare !== undefined && totalFare > filters.maxFare) {
+          continue;
+        }
 
-    // 항공편 정보와 조합
-    const flightInfo = top10
-      .map((fare, idx) => {
-        const itinerary1 = apiResponse.itineraries.find(
-          (it) => it.itineraryId === fare.itineraryIds[0]
-        );
-        const itinerary2 = apiResponse.itineraries.find(
-          (it) => it.itineraryId === fare.itineraryIds[1]
-        );
+        const key = `${mapping.itineraryIds}|${fare.partnerCode}`;
+        const existing = cheapest.get(key);
+        if (!existing || totalFare < existing.totalFare) {
+          cheapest.set(key, {
+            itineraryIds: mapping.itineraryIds,
+            partnerCode: fare.partnerCode,
+            totalFare,
+          });
+        }
+      }
+    }
 
-        const getFlightInfo = (itinerary: Itinerary | undefined) => {
-          if (
-            !itinerary ||
-            !itinerary.segments ||
-            itinerary.segments.length === 0
-          ) {
-            return null;
-          }
-          const seg = itinerary.segments[0];
-          return {
-            airline:
-              seg.marketingCarrier.airlineCode +
-              seg.marketingCarrier.flightNumber,
-            departure: seg.departure.time,
-            arrival: seg.arrival.time,
-            duration: formatDuration(itinerary.duration),
-            date: seg.departure.date,
-          };
-        };
+    console.log(
+      `총 ${fareCount}개의 요금 정보 발견 (여정·판매처별 최저가 ${cheapest.size}개)`
+    );
 
-        const out = getFlightInfo(itinerary1);
-        const ret = getFlightInfo(itinerary2);
-
-        return {
-          rank: idx + 1,
-          departureDate: out?.date || "",
-          returnDate: ret?.date || "",
-          outboundFlight: out?.airline || "",
-          returnFlight: ret?.airline || "",
-          totalFare: fare.totalFare,
-          outboundDeparture: out?.departure || "",
-          outboundArrival: out?.arrival || "",
-          outboundDuration: out?.duration || 0,
-          returnDeparture: ret?.departure || "",
-          returnArrival: ret?.arrival || "",
-          returnDuration: ret?.duration || 0,
-        };
-      })
-      .filter(
-        (flight) =>
-          // 유효한 데이터만 필터링
-          flight.outboundFlight && flight.returnFlight && flight.totalFare > 0
-      );
+    // 전체 정렬 대신 크기 k의 힙으로 최저가 k개 선택 (복귀일별로 나눌 때는 힙도 복귀일별)
+    const tops = new Map<string, TopK<Omit<ProcessedFlight, "rank">>>();
+    for (const fare of cheapest.values()) {
+      const [outboundId, returnId] = fare.itineraryIds.split("-");
+      const out = legs.get(outboundId);
+      const ret = legs.get(returnId);
+
+      // 유효한 데이터만 사용
+      if (!out || !ret) continue;
+
+      const group = groupByReturnDate ? ret.date : "";
+      let top = tops.get(group);
+      if (!top) {
+        top = new TopK<Omit<ProcessedFlight, "rank">>(k);
+        tops.set(group, top);
+      }
+
+      // 현재 k번째보다 비싸면 항공편 정보를 조합할 필요도 없음
+      if (fare.totalFare >= top.threshold) continue;
+
+      if (
+        !legMatchesFilters(out, filters.outboundDepartureTime, filters) ||
+        !legMatchesFilters(ret, filters.returnDepartureTime, filters)
+      ) {
+        continue;
+      }
+
+      top.push(fare.totalFare, {
+        departureDate: out.date,
+        returnDate: ret.date,
+        outboundFlight: out.flight,
+        returnFlight: ret.flight,
+        totalFare: fare.totalFare,
+        outboundDeparture: out.departure,
+        outboundArrival: out.arrival,
+        outboundDuration: out.duration,
+        returnDeparture: ret.departure,
+        returnArrival: ret.arrival,
+        returnDuration: ret.duration,
+        outboundStops: out.stops,
+        returnStops: ret.stops,
+        partnerCode: fare.partnerCode,
+      });
+    }
+
+    const selected = [...tops.values()].flatMap((top) => top.sorted());
+    if (tops.size > 1) {
+      selected.sort((a, b) => a.totalFare - b.totalFare);
+    }
+    const flightInfo = selected.map((flight, idx) => ({
+      rank: idx + 1,
+      ...flight,
+    }));
 
     console.log(`처리 완료 - ${flightInfo.length}개의 유효한 항공편`);
     return flightInfo;
@@ -503,6 +1037,28 @@ function processFlightData(
   }
 }
 
+// 텍스트 결과의 검색 요약에 붙일 조건 설명
+function describeFilters(filters: SearchFilters): string {
+  const window = (w: TimeWindow) => `${formatTime(w.from)}~${formatTime(w.to)}`;
+  const lines: string[] = [];
+  if (filters.outboundDepartureTime) {
+    lines.push(`가는편 출발 ${window(filters.outboundDepartureTime)}`);
+  }
+  if (filters.returnDepartureTime) {
+    lines.push(`오는편 출발 ${window(filters.returnDepartureTime)}`);
+  }
+  if (filters.maxDurationMinutes !== undefined) {
+    lines.push(`편도 ${filters.maxDurationMinutes}분 이내`);
+  }
+  if (filters.maxFare !== undefined) {
+    lines.push(`${filters.maxFare.toLocaleString()}원 이하`);
+  }
+  if (filters.maxVia !== undefined) {
+    lines.push(filters.maxVia === 0 ? "직항만" : `경유 ${filters.maxVia}회까지`);
+  }
+  return lines.length > 0 ? `\n- 검색 조건: ${lines.join(", ")}` : "";
+}
+
 // Format flight data
 function formatFlight(flight: ProcessedFlight): string {
   return [
@@ -522,14 +1078,211 @@ function formatFlight(flight: ProcessedFlight): string {
   ].join("\n");
 }
 
+// 서버 상태 통계 (get_naver_flight_stats 도구에서 사용)
+export function getSearchStats() {
+  return {
+    cache: responseCache.getStats(),
+    rateController: rateController.getStats(),
+    http: httpAgents.getStats(),
+    recorder: searchRecorder.getStats(),
+    singleflight: upstreamFlight.getStats(),
+    metrics: searchMetrics.toJSON(),
+  };
+}
+
+// 단계별 소요 시간 히스토그램과 카운터 (Prometheus 텍스트 또는 JSON)
+export function getSearchMetrics(format: "prometheus" | "json" = "prometheus"): string {
+  return format === "json"
+    ? JSON.stringify(searchMetrics.toJSON(), null, 2)
+    : searchMetrics.toPrometheus();
+}
+
+// 검색 결과 출력 형식 ("text": 사람이 읽는 한국어 텍스트, "json": 구조화된 결과)
+export type SearchResultFormat = "text" | "json";
+
+export interface SearchOptions {
+  format?: SearchResultFormat;
+  topK?: number;
+  openReturnDays?: number; // 복귀일을 열어 둘 일수 (결과는 복귀일마다 topK개씩)
+  coarse?: boolean; // 첫 결과만 받아 대략적인 가격을 빠르게 확인 (후속 조회 생략)
+  filters?: SearchFilters; // 업스트림 flightFilter 로 내려보내는 검색 조건
+  requestId?: string; // 호출 측이 붙인 요청 id (단계별 추적 기록에 함께 남음)
+  timeoutMs?: number; // 검색 전체 제한 시간 (속도 제어 대기, 재시도, 재시도 대기 포함)
+  signal?: AbortSignal; // 호출 측 취소 (MCP notifications/cancelled)
+}
+
+// 응답의 status 에서 뽑은 검색 진행 상태와 가격 범위
+interface SearchStatusSummary {
+  isCompleted: boolean;
+  completedPartnerCount: number;
+  requestedPartnerCount: number;
+  lowestFare: Record<string, number> | null;
+  priceRange: { min: number; max: number } | null;
+}
+
+function summarizeStatus(
+  apiResponse: NaverFlightApiResponse | null
+): SearchStatusSummary | null {
+  const status = apiResponse?.status;
+  if (!status) return null;
+  return {
+    isCompleted: status.isCompleted === true,
+    completedPartnerCount: status.completedPartnerCount ?? 0,
+    requestedPartnerCount: status.requestedPartnerCount ?? 0,
+    lowestFare: status.lowestFare ?? null,
+    priceRange: status.priceRange ?? null,
+  };
+}
+
+// format: "json" 일 때 반환하는 구조화된 결과
+interface StructuredSearchResult {
+  ok: boolean;
+  message?: string;
+  departure: string;
+  arrival: string;
+  departureDate: string;
+  returnDate: string;
+  openReturnDays: number;
+  coarse: boolean;
+  filters: SearchFilters;
+  airlines: string[];
+  count: number;
+  lowestFare: number | null;
+  searchStatus: SearchStatusSummary | null;
+  upstreamRequests: number;
+  timings: TraceSummary; // 요청 id 와 단계별 소요 시간 (ms)
+  deadlineExceeded: boolean; // 제한 시간에 걸려 중단됨 (flights 는 그때까지의 부분 결과)
+  error: boolean; // 업스트림 오류로 결과를 받지 못함 (결과 없음과 구분, 다시 검색할 대상)
+  flights: ProcessedFlight[];
+}
+
+type SearchToolResult = { content: Array<{ type: "text"; text: string }> };
+
+// 업스트림 검색 결과 (같은 검색을 기다리는 요청이 함께 받음)
+interface UpstreamResult {
+  apiResponse: NaverFlightApiResponse | null;
+  upstreamRequests: number;
+  abortReason: SearchAbortReason | null; // 제한 시간 / 취소로 중단됨
+}
+
+// 같은 조건으로 동시에 들어온 검색은 업스트림 요청을 한 번만 보내고 응답을 공유
+// format / topK 는 응답을 받은 뒤 요청마다 따로 적용하므로 키에 넣지 않는다.
+// 제한 시간은 키 대신 만료 시각으로 맞춘다: 자기보다 먼저 끝나는 검색에는 합류하지 않고 (잘리지 않도록),
+// 더 늦게 끝나는 검색에 합류한 요청은 자기 만료 시각에 먼저 빠진다 (자기 제한 시간을 넘겨 기다리지 않도록).
+// 거의 동시에 들어온 같은 제한 시간의 요청은 UPSTREAM_JOIN_SLACK_MS 안쪽 차이면 합친다.
+const UPSTREAM_JOIN_SLACK_MS = 250;
+const upstreamFlight = new Singleflight<UpstreamResult>(UPSTREAM_JOIN_SLACK_MS);
+
+// 같은 업스트림 검색인지 판단하는 키 (정규화된 검색 페이로드 + 대략 검색 여부의 해시)
+function upstreamRequestKey(payload: any, options: SearchOptions): string {
+  return hashPayload({
+    payload,
+    coarse: options.coarse ?? false,
+  });
+}
+
+// 캐시 조회 후 없으면 API 호출 (단계별 구간은 처음 요청한 쪽의 trace 에 기록)
+// expiresAt 은 처음 요청한 쪽의 만료 시각 (Date.now() 기준, 제한 없으면 Infinity)
+async function fetchUpstream(
+  payload: any,
+  options: SearchOptions,
+  expiresAt: number,
+  trace: SearchTrace,
+  signal: AbortSignal
+): Promise<UpstreamResult> {
+  const deadline = new SearchDeadline(
+    expiresAt === Infinity ? undefined : Math.max(1, expiresAt - Date.now()),
+    signal
+  );
+  const usage: RequestUsage = { upstreamRequests: 0, trace, deadline };
+  try {
+    // 같은 조건의 검색이 만료되지 않은 채 캐시에 있으면 API를 호출하지 않음 (속도 제어 대기도 없음)
+    let apiResponse = await trace.time("cache_lookup", () =>
+      responseCache.get(payload)
+    );
+    trace.count(apiResponse ? "cache_hits" : "cache_misses");
+    if (apiResponse) {
+      console.log("캐시된 검색 결과 사용");
+    } else {
+      apiResponse = await makeNaverFlightRequest(payload, 3, {
+        coarse: options.coarse ?? false,
+        usage,
+      });
+
+      // 검색이 끝난 응답만 캐시 (진행 중인 부분 결과는 저장하지 않음)
+      if (apiResponse && apiResponse.status?.isCompleted !== false) {
+        await responseCache.set(
+          payload,
+          apiResponse,
+          apiResponse.status?.expireAt
+        );
+      }
+    }
+    return {
+      apiResponse,
+      upstreamRequests: usage.upstreamRequests,
+      abortReason: deadline.reason,
+    };
+  } finally {
+    deadline.dispose();
+  }
+}
+
 // Export the tool function for use in index.ts
 export async function searchNaverFlights(
   departure: string,
   arrival: string,
   departureDate: string,
   returnDate: string,
-  airlines?: string[]
-): Promise<{ content: Array<{ type: "text"; text: string }> }> {
+  airlines?: string[],
+  options: SearchOptions = {}
+): Promise<SearchToolResult> {
+  const format = options.format ?? "text";
+  const openReturnDays = options.openReturnDays ?? 0;
+  const coarse = options.coarse ?? false;
+  const filters = options.filters ?? {};
+  const trace = searchMetrics.startTrace(options.requestId);
+  let upstream: UpstreamResult | null = null;
+  let apiResponse: NaverFlightApiResponse | null = null;
+
+  // 응답 생성 (json 형식이면 안내 문구도 구조화된 결과의 message로 전달)
+  const reply = (
+    text: string,
+    flights: ProcessedFlight[] = [],
+    normalizedAirlines: string[] = [],
+    failed = false
+  ): SearchToolResult => {
+    let replyText = text;
+    if (format === "json") {
+      const formatStartedAt = performance.now();
+      const result: StructuredSearchResult = {
+        ok: flights.length > 0,
+        ...(flights.length > 0 ? {} : { message: text }),
+        departure,
+        arrival,
+        departureDate,
+        returnDate,
+        openReturnDays,
+        coarse,
+        filters,
+        airlines: normalizedAirlines,
+        count: flights.length,
+        lowestFare: flights[0]?.totalFare ?? null,
+        searchStatus: summarizeStatus(apiResponse),
+        upstreamRequests: upstream?.upstreamRequests ?? 0,
+        timings: trace.summary(),
+        deadlineExceeded: upstream?.abortReason === "deadline",
+        error: failed,
+        flights,
+      };
+      replyText = JSON.stringify(result);
+      trace.add("format", performance.now() - formatStartedAt, formatStartedAt);
+    }
+    // 구간 기록은 응답을 늦추지 않도록 기다리지 않는다
+    void trace.finish();
+    return { content: [{ type: "text", text: replyText }] };
+  };
+
   try {
     // 항공사 코드 정규화
     const normalizedAirlines = airlines
@@ -544,52 +1297,24 @@ export async function searchNaverFlights(
       }`
     );
 
-    // 검색 간격 제어 (Rate Limiting 방지)
-    const currentTime = Date.now();
-    const timeSinceLastSearch = currentTime - lastSearchTime;
-
-    if (timeSinceLastSearch < MIN_SEARCH_INTERVAL) {
-      const waitTime = MIN_SEARCH_INTERVAL - timeSinceLastSearch;
-      console.log(`검색 간격 제어: ${waitTime}ms 대기 중...`);
-      await new Promise((resolve) => setTimeout(resolve, waitTime));
-    }
-    lastSearchTime = Date.now();
-
     // 입력 유효성 검사
     if (!validateDate(departureDate)) {
-      return {
-        content: [
-          {
-            type: "text",
-            text: "출발일 형식이 올바르지 않거나 과거 날짜입니다. YYYY-MM-DD 형식으로 입력해주세요.",
-          },
-        ],
-      };
+      return reply(
+        "출발일 형식이 올바르지 않거나 과거 날짜입니다. YYYY-MM-DD 형식으로 입력해주세요."
+      );
     }
 
     if (!validateDate(returnDate)) {
-      return {
-        content: [
-          {
-            type: "text",
-            text: "복귀일 형식이 올바르지 않거나 과거 날짜입니다. YYYY-MM-DD 형식으로 입력해주세요.",
-          },
-        ],
-      };
+      return reply(
+        "복귀일 형식이 올바르지 않거나 과거 날짜입니다. YYYY-MM-DD 형식으로 입력해주세요."
+      );
     }
 
     const departureDateObj = new Date(departureDate);
     const returnDateObj = new Date(returnDate);
 
     if (returnDateObj <= departureDateObj) {
-      return {
-        content: [
-          {
-            type: "text",
-            text: "복귀일은 출발일보다 늦어야 합니다.",
-          },
-        ],
-      };
+      return reply("복귀일은 출발일보다 늦어야 합니다.");
     }
 
     // API 호출
@@ -598,78 +1323,121 @@ export async function searchNaverFlights(
       arrival,
       departureDate,
       returnDate,
-      normalizedAirlines
+      normalizedAirlines,
+      openReturnDays,
+      filters
     );
 
     console.log("API 요청 페이로드 생성 완료");
-    const apiResponse = await makeNaverFlightRequest<NaverFlightApiResponse>(
-      payload
-    );
+
+    // 호출 측 취소(options.signal)는 같은 검색을 기다리는 요청이 모두 취소되었을 때만 업스트림 요청을 끊는다
+    const expiresAt =
+      options.timeoutMs !== undefined && options.timeoutMs > 0
+        ? Date.now() + options.timeoutMs
+        : Infinity;
+    try {
+      upstream = await upstreamFlight.do(
+        upstreamRequestKey(payload, options),
+        (signal) => fetchUpstream(payload, options, expiresAt, trace, signal),
+        options.signal,
+        expiresAt
+      );
+    } catch (error) {
+      if (error instanceof SingleflightExpiredError) {
+        // 더 늦게 끝나는 검색을 기다리다 자기 제한 시간이 지남 (아래에서 제한 시간 초과로 응답)
+        upstream = {
+          apiResponse: null,
+          upstreamRequests: 0,
+          abortReason: "deadline",
+        };
+      } else {
+        if (!options.signal?.aborted) throw error;
+        console.log("API 응답 없이 검색 중단 (cancelled)");
+        trace.count("cancelled");
+        return reply("검색이 취소되었습니다.", [], normalizedAirlines);
+      }
+    }
+    apiResponse = upstream.apiResponse;
+
+    const abortReason = upstream.abortReason;
+    if (!apiResponse && abortReason) {
+      console.log(`API 응답 없이 검색 중단 (${abortReason})`);
+      trace.count(
+        abortReason === "deadline" ? "deadline_exceeded" : "cancelled"
+      );
+      return reply(
+        abortReason === "deadline"
+          ? `검색 제한 시간(${options.timeoutMs}ms) 안에 결과를 받지 못했습니다.\n\n**검색 조건:**\n- 출발지: ${departure} → 도착지: ${arrival}\n- 출발일: ${departureDate}\n- 복귀일: ${returnDate}`
+          : "검색이 취소되었습니다.",
+        [],
+        normalizedAirlines
+      );
+    }
 
     if (!apiResponse) {
       console.log("API 응답이 없습니다");
-      return {
-        content: [
-          {
-            type: "text",
-            text: `항공권 검색 중 오류가 발생했습니다.\n\n**가능한 원인:**\n- 네이버 API 서버 응답 지연 (일반적으로 4-5초 소요)\n- 네트워크 연결 문제\n- 서버 일시적 오류\n- 검색 제한 (Rate Limiting)\n\n**해결방법:**\n- 잠시 후 다시 시도해주세요 (네이버 API는 응답이 느릴 수 있습니다)\n- 다른 날짜나 노선으로 검색해보세요\n- 연속 검색 시 첫 번째가 실패할 수 있으니 재시도해주세요\n\n**검색 조건:**\n- 출발지: ${departure} → 도착지: ${arrival}\n- 출발일: ${departureDate}\n- 복귀일: ${returnDate}`,
-          },
-        ],
-      };
+      trace.count("empty_results");
+      return reply(
+        `항공권 검색 중 오류가 발생했습니다.\n\n**가능한 원인:**\n- 네이버 API 서버 응답 지연 (일반적으로 4-5초 소요)\n- 네트워크 연결 문제\n- 서버 일시적 오류\n- 검색 제한 (Rate Limiting)\n\n**해결방법:**\n- 잠시 후 다시 시도해주세요 (네이버 API는 응답이 느릴 수 있습니다)\n- 다른 날짜나 노선으로 검색해보세요\n- 연속 검색 시 첫 번째가 실패할 수 있으니 재시도해주세요\n\n**검색 조건:**\n- 출발지: ${departure} → 도착지: ${arrival}\n- 출발일: ${departureDate}\n- 복귀일: ${returnDate}`,
+        [],
+        normalizedAirlines,
+        true
+      );
     }
 
     console.log("API 응답 수신 완료, 데이터 처리 시작");
 
     // 데이터 처리
-    const processedFlights = processFlightData(apiResponse);
+    const response = apiResponse;
+    const processedFlights = await trace.time("process", () =>
+      processFlightData(response, options.topK, openReturnDays > 0, filters)
+    );
 
     if (processedFlights.length === 0) {
       console.log("처리된 항공편이 없습니다");
-      return {
-        content: [
-          {
-            type: "text",
-            text: `검색 결과가 없습니다.\n\n**검색 조건:**\n- 출발지: ${departure} → 도착지: ${arrival}\n- 출발일: ${departureDate}\n- 복귀일: ${returnDate}\n\n**가능한 원인:**\n- 해당 날짜에 운항하지 않는 항공편\n- 직항편이 없는 노선\n- 항공사 스케줄 변경\n- 네이버 API 응답 지연 (4-5초 소요)\n\n**권장사항:**\n- 다른 날짜로 검색해보세요\n- 경유편 포함 검색을 고려해보세요\n- 인근 공항으로 검색해보세요\n- 잠시 후 재시도해보세요 (API 응답이 느릴 수 있습니다)`,
-          },
-        ],
-      };
+      trace.count("empty_results");
+      return reply(
+        `검색 결과가 없습니다.\n\n**검색 조건:**\n- 출발지: ${departure} → 도착지: ${arrival}\n- 출발일: ${departureDate}\n- 복귀일: ${returnDate}\n\n**가능한 원인:**\n- 해당 날짜에 운항하지 않는 항공편\n- 직항편이 없는 노선\n- 항공사 스케줄 변경\n- 네이버 API 응답 지연 (4-5초 소요)\n\n**권장사항:**\n- 다른 날짜로 검색해보세요\n- 경유편 포함 검색을 고려해보세요\n- 인근 공항으로 검색해보세요\n- 잠시 후 재시도해보세요 (API 응답이 느릴 수 있습니다)`,
+        [],
+        normalizedAirlines
+      );
     }
 
     console.log(`검색 완료: ${processedFlights.length}개 항공편 발견`);
 
+    // 구조화된 결과는 텍스트 포맷팅 없이 그대로 반환
+    if (format === "json") {
+      return reply("", processedFlights, normalizedAirlines);
+    }
+
     // 결과 포맷팅
+    const formatStartedAt = performance.now();
     const formattedFlights = processedFlights.map(formatFlight);
     const flightsText = `항공권 검색 결과 (${departure} → ${arrival}):\n\n${formattedFlights.join(
       "\n"
     )}`;
 
     const summary = `\n\n**검색 요약:**\n- 출발지: ${departure} → 도착지: ${arrival}\n- 출발일: ${departureDate}\n- 복귀일: ${returnDate}${
+      openReturnDays > 0 ? ` (+${openReturnDays}일까지)` : ""
+    }${
       airlines && airlines.length > 0
         ? `\n- 항공사 필터: ${airlines.join(", ")}`
         : ""
-    }\n- 총 ${
+    }${describeFilters(filters)}\n- 총 ${
       processedFlights.length
     }개 항공권 발견\n- 최저가: ${processedFlights[0]?.totalFare.toLocaleString()}원`;
+    trace.add("format", performance.now() - formatStartedAt, formatStartedAt);
 
-    return {
-      content: [
-        {
-          type: "text",
-          text: flightsText + summary,
-        },
-      ],
-    };
+    return reply(flightsText + summary, processedFlights);
   } catch (error) {
     console.error("네이버 항공권 검색 중 예상치 못한 오류:", error);
-    return {
-      content: [
-        {
-          type: "text",
-          text: `항공권 검색 중 예상치 못한 오류가 발생했습니다.\n\n**오류 정보:** ${
-            (error as any).message || "알 수 없는 오류"
-          }\n\n**네이버 API 특성:**\n- 일반적으로 4-5초 응답 시간 소요\n- 첫 번째 검색이 실패할 수 있음\n- 연속 검색 시 성공률 향상\n\n**해결방법:**\n- 잠시 후 다시 시도해주세요\n- 다른 검색 조건으로 시도해보세요\n- 연속으로 2-3회 재시도해보세요\n- 문제가 지속되면 관리자에게 문의해주세요`,
-        },
-      ],
-    };
+    return reply(
+      `항공권 검색 중 예상치 못한 오류가 발생했습니다.\n\n**오류 정보:** ${
+        (error as any).message || "알 수 없는 오류"
+      }\n\n**네이버 API 특성:**\n- 일반적으로 4-5초 응답 시간 소요\n- 첫 번째 검색이 실패할 수 있음\n- 연속 검색 시 성공률 향상\n\n**해결방법:**\n- 잠시 후 다시 시도해주세요\n- 다른 검색 조건으로 시도해보세요\n- 연속으로 2-3회 재시도해보세요\n- 문제가 지속되면 관리자에게 문의해주세요`,
+      [],
+      [],
+      true
+    );
   }
 }
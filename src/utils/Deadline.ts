@@ -0,0 +1,98 @@
+// 검색 하나의 제한 시간과 취소 신호
+// - 호출 측이 준 제한 시간(timeoutMs)이 지나거나 상위 signal(MCP 취소 알림)이 중단되면 signal 이 abort 된다
+// - 속도 제어 대기, 재시도 대기, 후속 조회 대기, HTTP 요청과 SSE 본문 읽기가 모두 같은 signal 을 따른다
+
+export type SearchAbortReason = "deadline" | "cancelled";
+
+export class SearchAbortError extends Error {
+  readonly reason: SearchAbortReason;
+
+  constructor(reason: SearchAbortReason) {
+    super(reason === "deadline" ? "검색 제한 시간 초과" : "검색 취소됨");
+    this.name = "SearchAbortError";
+    this.reason = reason;
+  }
+}
+
+export class SearchDeadline {
+  // Date.now() 기준 만료 시각 (제한 시간이 없으면 Infinity)
+  readonly expiresAt: number;
+  private readonly controller = new AbortController();
+  private readonly timer: NodeJS.Timeout | null = null;
+  private readonly parent?: AbortSignal;
+  private readonly onParentAbort = () =>
+    this.abort(new SearchAbortError("cancelled"));
+
+  constructor(timeoutMs?: number, parent?: AbortSignal) {
+    this.expiresAt =
+      timeoutMs !== undefined && timeoutMs > 0
+        ? Date.now() + timeoutMs
+        : Infinity;
+    if (this.expiresAt !== Infinity) {
+      this.timer = setTimeout(
+        () => this.abort(new SearchAbortError("deadline")),
+        timeoutMs
+      );
+      this.timer.unref();
+    }
+    this.parent = parent;
+    if (parent?.aborted) this.onParentAbort();
+    else parent?.addEventListener("abort", this.onParentAbort, { once: true });
+  }
+
+  get signal(): AbortSignal {
+    return this.controller.signal;
+  }
+
+  // 제한 시간이 지났거나 취소됨 (타이머가 돌기 직전의 경계도 포함)
+  get done(): boolean {
+    return this.signal.aborted || this.remainingMs() <= 0;
+  }
+
+  get reason(): SearchAbortReason | null {
+    if (this.signal.aborted) {
+      return (this.signal.reason as SearchAbortError).reason;
+    }
+    return this.remainingMs() <= 0 ? "deadline" : null;
+  }
+
+  remainingMs(): number {
+    return this.expiresAt - Date.now();
+  }
+
+  // ms 와 남은 시간 중 짧은 쪽
+  cap(ms: number): number {
+    return Math.max(0, Math.min(ms, this.remainingMs()));
+  }
+
+  throwIfDone(): void {
+    const reason = this.reason;
+    if (reason) throw new SearchAbortError(reason);
+  }
+
+  // 중단되면 바로 SearchAbortError 로 끝나는 대기
+  sleep(ms: number): Promise<void> {
+    this.throwIfDone();
+    return new Promise((resolve, reject) => {
+      const onAbort = () => {
+        clearTimeout(timer);
+        reject(this.signal.reason);
+      };
+      const timer = setTimeout(() => {
+        this.signal.removeEventListener("abort", onAbort);
+        resolve();
+      }, ms);
+      this.signal.addEventListener("abort", onAbort, { once: true });
+    });
+  }
+
+  // 검색이 끝나면 타이머와 상위 signal 구독 해제
+  dispose(): void {
+    if (this.timer) clearTimeout(this.timer);
+    this.parent?.removeEventListener("abort", this.onParentAbort);
+  }
+
+  private abort(error: SearchAbortError): void {
+    if (!this.signal.aborted) this.controller.abort(error);
+  }
+}
@@ -0,0 +1,88 @@
+import http from "http";
+import https from "https";
+import { parseNumberEnv } from "./env.js";
+
+// flight-api.naver.com 으로의 연결을 재사용하는 keep-alive 에이전트
+// 검색마다 TCP / TLS 연결을 새로 맺지 않도록 모든 fetch 가 같은 에이전트를 사용한다.
+
+export interface KeepAliveAgentOptions {
+  maxSockets: number;
+  idleTimeoutMs: number;
+}
+
+export function keepAliveAgentOptionsFromEnv(): KeepAliveAgentOptions {
+  return {
+    maxSockets: Math.max(
+      1,
+      parseNumberEnv(process.env.NAVER_FLIGHT_MAX_SOCKETS, 8)
+    ),
+    idleTimeoutMs: parseNumberEnv(
+      process.env.NAVER_FLIGHT_SOCKET_IDLE_MS,
+      30000
+    ),
+  };
+}
+
+function countSockets(sockets: NodeJS.ReadOnlyDict<unknown[]>): number {
+  return Object.values(sockets).reduce(
+    (total, list) => total + (list ? list.length : 0),
+    0
+  );
+}
+
+export class KeepAliveAgents {
+  private readonly options: KeepAliveAgentOptions;
+  private readonly httpsAgent: https.Agent;
+  private readonly httpAgent: http.Agent;
+  private requests = 0;
+  private socketsCreated = 0;
+
+  constructor(options: KeepAliveAgentOptions) {
+    this.options = options;
+    const agentOptions = {
+      keepAlive: true,
+      keepAliveMsecs: 1000,
+      maxSockets: options.maxSockets,
+      maxFreeSockets: options.maxSockets,
+      // 쉬고 있는 소켓은 이 시간이 지나면 닫힌다
+      timeout: options.idleTimeoutMs,
+      scheduling: "lifo" as const,
+    };
+    this.httpsAgent = this.countNewSockets(new https.Agent(agentOptions));
+    this.httpAgent = this.countNewSockets(new http.Agent(agentOptions));
+  }
+
+  // node-fetch 의 agent 옵션으로 넘기는 함수 (요청마다 한 번 호출됨)
+  readonly agentFor = (url: URL): http.Agent => {
+    this.requests++;
+    return url.protocol === "http:" ? this.httpAgent : this.httpsAgent;
+  };
+
+  private countNewSockets<A extends http.Agent>(agent: A): A {
+    const createConnection = (agent as any).createConnection.bind(agent);
+    (agent as any).createConnection = (...args: unknown[]) => {
+      this.socketsCreated++;
+      return createConnection(...args);
+    };
+    return agent;
+  }
+
+  getStats() {
+    const agents = [this.httpsAgent, this.httpAgent];
+    return {
+      maxSockets: this.options.maxSockets,
+      idleTimeoutMs: this.options.idleTimeoutMs,
+      requests: this.requests,
+      socketsCreated: this.socketsCreated,
+      // 새 소켓을 만들지 않고 기존 연결로 처리된 요청 수
+      connectionsReused: Math.max(0, this.requests - this.socketsCreated),
+      activeSockets: agents.reduce((n, a) => n + countSockets(a.sockets), 0),
+      idleSockets: agents.reduce((n, a) => n + countSockets(a.freeSockets), 0),
+    };
+  }
+
+  destroy(): void {
+    this.httpsAgent.destroy();
+    this.httpAgent.destroy();
+  }
+}
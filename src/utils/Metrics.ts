@@ -0,0 +1,205 @@
+import { randomBytes } from "crypto";
+import { promises as fs } from "fs";
+
+// 검색 단계별 소요 시간과 카운터
+// - SearchTrace: 검색 하나의 단계별 구간(span)을 요청 id 와 함께 모음
+// - SearchMetrics: 프로세스 전체의 단계별 히스토그램과 카운터 (Prometheus 텍스트 / JSON 으로 내보냄)
+// NAVER_FLIGHT_TRACE_FILE 을 지정하면 구간마다 JSON 한 줄씩 덧붙인다.
+
+export type SearchPhase =
+  | "cache_lookup" // 응답 캐시 조회
+  | "rate_wait" // 검색 간격 / 동시 요청 수 슬롯 대기
+  | "http_ttfb" // 요청 전송부터 응답 헤더까지
+  | "sse_download" // SSE 본문 조각을 기다린 시간
+  | "sse_parse" // SSE 프레임 처리와 JSON 파싱
+  | "poll_wait" // 진행 중인 검색을 이어서 조회하기 전 대기
+  | "retry_backoff" // 실패 후 재시도 대기
+  | "process" // processFlightData
+  | "format"; // 결과 텍스트 / JSON 생성
+
+export type SearchCounter =
+  | "searches"
+  | "upstream_requests"
+  | "retries"
+  | "rate_limited"
+  | "timeouts"
+  | "errors"
+  | "cache_hits"
+  | "cache_misses"
+  | "empty_results"
+  | "deadline_exceeded"
+  | "cancelled";
+
+export interface MetricsOptions {
+  traceFile: string | null;
+}
+
+export interface TraceSpan {
+  requestId: string;
+  phase: SearchPhase;
+  startMs: number; // 검색 시작 기준
+  durationMs: number;
+}
+
+// 검색 결과에 붙이는 단계별 합계
+export interface TraceSummary {
+  requestId: string;
+  totalMs: number;
+  phases: Partial<Record<SearchPhase, number>>;
+}
+
+// 히스토그램 경계 (초)
+const BUCKETS = [0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30];
+
+export function metricsOptionsFromEnv(): MetricsOptions {
+  return { traceFile: process.env.NAVER_FLIGHT_TRACE_FILE || null };
+}
+
+export function newRequestId(): string {
+  return randomBytes(6).toString("hex");
+}
+
+const round = (ms: number) => Math.round(ms * 1000) / 1000;
+
+export class SearchMetrics {
+  private readonly options: MetricsOptions;
+  private readonly counters = new Map<SearchCounter, number>();
+  private readonly histograms = new Map<
+    SearchPhase,
+    { counts: number[]; sum: number; count: number }
+  >();
+
+  constructor(options: MetricsOptions) {
+    this.options = options;
+  }
+
+  increment(counter: SearchCounter, n = 1): void {
+    this.counters.set(counter, (this.counters.get(counter) ?? 0) + n);
+  }
+
+  observe(phase: SearchPhase, ms: number): void {
+    let histogram = this.histograms.get(phase);
+    if (!histogram) {
+      histogram = { counts: BUCKETS.map(() => 0), sum: 0, count: 0 };
+      this.histograms.set(phase, histogram);
+    }
+    const seconds = ms / 1000;
+    BUCKETS.forEach((bound, i) => {
+      if (seconds <= bound) histogram!.counts[i]++;
+    });
+    histogram.sum += seconds;
+    histogram.count++;
+  }
+
+  startTrace(requestId = newRequestId()): SearchTrace {
+    this.increment("searches");
+    return new SearchTrace(requestId, this);
+  }
+
+  // 검색 하나가 끝나면 구간을 파일에 기록 (설정한 경우)
+  async flush(spans: TraceSpan[], summary: TraceSummary): Promise<void> {
+    if (!this.options.traceFile) return;
+    const lines = [
+      ...spans.map((span) => JSON.stringify({ type: "span", ...span })),
+      JSON.stringify({ type: "search", ...summary }),
+    ];
+    await fs
+      .appendFile(this.options.traceFile, lines.join("\n") + "\n")
+      .catch((error) => console.error("추적 기록 실패:", error));
+  }
+
+  toJSON() {
+    return {
+      counters: Object.fromEntries(this.counters),
+      phases: Object.fromEntries(
+        [...this.histograms].map(([phase, h]) => [
+          phase,
+          {
+            count: h.count,
+            totalMs: round(h.sum * 1000),
+            meanMs: round(h.count ? (h.sum * 1000) / h.count : 0),
+          },
+        ])
+      ),
+    };
+  }
+
+  // Prometheus 텍스트 형식
+  toPrometheus(): string {
+    const lines: string[] = [];
+    for (const [counter, value] of this.counters) {
+      const name = `naver_flight_${counter}_total`;
+      lines.push(`# TYPE ${name} counter`, `${name} ${value}`);
+    }
+    lines.push("# TYPE naver_flight_phase_seconds histogram");
+    for (const [phase, h] of this.histograms) {
+      BUCKETS.forEach((bound, i) => {
+        lines.push(
+          `naver_flight_phase_seconds_bucket{phase="${phase}",le="${bound}"} ${h.counts[i]}`
+        );
+      });
+      lines.push(
+        `naver_flight_phase_seconds_bucket{phase="${phase}",le="+Inf"} ${h.count}`,
+        `naver_flight_phase_seconds_sum{phase="${phase}"} ${h.sum}`,
+        `naver_flight_phase_seconds_count{phase="${phase}"} ${h.count}`
+      );
+    }
+    return lines.join("\n") + "\n";
+  }
+}
+
+export class SearchTrace {
+  readonly requestId: string;
+  private readonly metrics: SearchMetrics;
+  private readonly startedAt = performance.now();
+  private readonly spans: TraceSpan[] = [];
+  private readonly totals: Partial<Record<SearchPhase, number>> = {};
+
+  constructor(requestId: string, metrics: SearchMetrics) {
+    this.requestId = requestId;
+    this.metrics = metrics;
+  }
+
+  // 이미 잰 구간 추가 (startedAt 은 performance.now() 기준)
+  add(phase: SearchPhase, durationMs: number, startedAt = performance.now() - durationMs): void {
+    this.spans.push({
+      requestId: this.requestId,
+      phase,
+      startMs: round(startedAt - this.startedAt),
+      durationMs: round(durationMs),
+    });
+    this.totals[phase] = (this.totals[phase] ?? 0) + durationMs;
+    this.metrics.observe(phase, durationMs);
+  }
+
+  async time<T>(phase: SearchPhase, fn: () => Promise<T> | T): Promise<T> {
+    const startedAt = performance.now();
+    try {
+      return await fn();
+    } finally {
+      this.add(phase, performance.now() - startedAt, startedAt);
+    }
+  }
+
+  count(counter: SearchCounter, n = 1): void {
+    this.metrics.increment(counter, n);
+  }
+
+  summary(): TraceSummary {
+    const phases: Partial<Record<SearchPhase, number>> = {};
+    for (const [phase, ms] of Object.entries(this.totals)) {
+      phases[phase as SearchPhase] = round(ms as number);
+    }
+    return {
+      requestId: this.requestId,
+      totalMs: round(performance.now() - this.startedAt),
+      phases,
+    };
+  }
+
+  async finish(): Promise<TraceSummary> {
+    const summary = this.summary();
+    await this.metrics.flush(this.spans, summary);
+    return summary;
+  }
+}
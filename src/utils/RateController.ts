@@ -0,0 +1,379 @@
+import { randomBytes } from "crypto";
+import { promises as fs } from "fs";
+import os from "os";
+import path from "path";
+import { SearchAbortError, type SearchDeadline } from "./Deadline.js";
+import { parseNumberEnv } from "./env.js";
+
+// 호스트 전체에서 공유하는 적응형(AIMD) 요청 속도 제어기
+// - 성공하면 요청 간격을 조금씩 줄이고 동시 요청 수를 조금씩 늘린다 (additive increase)
+// - 429 / 타임아웃이면 간격을 두 배로, 동시 요청 수를 절반으로 줄인다 (multiplicative decrease)
+// - 응답이 느려지면 (latencyTargetMs 초과) 늘리지 않고 유지한다
+// 상태는 잠금 파일로 보호되는 JSON 파일에 저장되므로 같은 호스트의
+// MCP 서버 / CLI 프로세스들이 하나의 속도 제한을 함께 따른다.
+// 검색 제한 시간(SearchDeadline)을 넘기는 슬롯은 잡지 않고, 취소되면 대기를 바로 멈춘다.
+
+export interface RateControllerOptions {
+  stateDir: string;
+  initialIntervalMs: number;
+  minIntervalMs: number;
+  maxIntervalMs: number;
+  intervalStepMs: number;
+  maxConcurrency: number;
+  latencyTargetMs: number;
+}
+
+// cancelled: 검색 제한 시간 / 취소로 중단 (업스트림 탓이 아니므로 속도 조정에 반영하지 않음)
+export type RequestOutcome =
+  | "success"
+  | "rate_limited"
+  | "timeout"
+  | "error"
+  | "cancelled";
+
+export interface RateLease {
+  id: string;
+  startedAt: number;
+  waitedMs: number;
+}
+
+interface Lease {
+  id: string;
+  pid: number;
+  expiresAt: number;
+}
+
+interface RateState {
+  intervalMs: number;
+  concurrency: number;
+  nextSlotAt: number;
+  leases: Lease[];
+  updatedAt: number;
+}
+
+const LOCK_RETRY_MS = 10;
+// 살아 있는 프로세스의 잠금은 이보다 오래 잡혀 있을 때만 깬다 (상태 갱신 한 번은 수 ms)
+const LOCK_STALE_MS = 30000;
+const LEASE_TTL_MS = 60000; // 프로세스가 죽어 반납되지 않은 슬롯은 이 시간 뒤 회수
+const SLOT_RETRY_MS = 250;
+
+function sleep(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+function isProcessAlive(pid: number): boolean {
+  try {
+    process.kill(pid, 0);
+    return true;
+  } catch (error) {
+    return (error as NodeJS.ErrnoException).code === "EPERM";
+  }
+}
+
+export class RateController {
+  private readonly options: RateControllerOptions;
+  private readonly statePath: string;
+  private readonly lockPath: string;
+  // 상태 디렉터리를 쓸 수 없으면 프로세스 내부 상태만 사용
+  private localState: RateState | null = null;
+  private readonly counters = {
+    requests: 0,
+    successes: 0,
+    rateLimited: 0,
+    timeouts: 0,
+    errors: 0,
+    cancelled: 0,
+    waitedMs: 0,
+  };
+  private lastState: RateState | null = null;
+
+  constructor(options: RateControllerOptions) {
+    this.options = options;
+    this.statePath = path.join(options.stateDir, "rate-state.json");
+    this.lockPath = path.join(options.stateDir, "rate-state.lock");
+  }
+
+  // 요청을 시작해도 되는 슬롯을 얻을 때까지 대기
+  // deadline 안에 시작할 수 없는 슬롯이면 잡지 않고 SearchAbortError 를 던진다.
+  async acquire(deadline?: SearchDeadline): Promise<RateLease> {
+    const id = `${process.pid}-${randomBytes(4).toString("hex")}`;
+    const deadlineAt = deadline?.expiresAt ?? Infinity;
+    let waitedMs = 0;
+
+    for (;;) {
+      deadline?.throwIfDone();
+      const grant = await this.update((state, now) => {
+        this.pruneLeases(state, now);
+        if (state.leases.length >= Math.floor(state.concurrency)) {
+          return { granted: false, waitMs: SLOT_RETRY_MS };
+        }
+        const slotAt = Math.max(now, state.nextSlotAt);
+        if (slotAt >= deadlineAt) {
+          // 다음 슬롯이 제한 시간 뒤: 슬롯을 차지하지 않고 포기
+          return { granted: false, waitMs: -1 };
+        }
+        state.nextSlotAt = slotAt + state.intervalMs;
+        state.leases.push({
+          id,
+          pid: process.pid,
+          expiresAt: slotAt + LEASE_TTL_MS,
+        });
+        return { granted: true, waitMs: slotAt - now };
+      });
+      if (grant.waitMs < 0) throw new SearchAbortError("deadline");
+
+      if (grant.waitMs > 0) {
+        try {
+          await (deadline
+            ? deadline.sleep(grant.waitMs)
+            : sleep(grant.waitMs));
+        } catch (error) {
+          // 슬롯을 잡은 뒤 취소되면 바로 반납
+          if (grant.granted) {
+            await this.release(
+              { id, startedAt: Date.now(), waitedMs },
+              "cancelled"
+            );
+          }
+          throw error;
+        }
+        waitedMs += grant.waitMs;
+      }
+      if (grant.granted) break;
+    }
+
+    if (waitedMs > 0) {
+      console.log(`요청 속도 제어: ${waitedMs}ms 대기`);
+    }
+    this.counters.requests++;
+    this.counters.waitedMs += waitedMs;
+    return { id, startedAt: Date.now(), waitedMs };
+  }
+
+  // 슬롯 반납과 함께 결과를 반영해 간격 / 동시 요청 수 조정
+  async release(lease: RateLease, outcome: RequestOutcome): Promise<void> {
+    const latencyMs = Date.now() - lease.startedAt;
+    if (outcome === "success") this.counters.successes++;
+    else if (outcome === "rate_limited") this.counters.rateLimited++;
+    else if (outcome === "timeout") this.counters.timeouts++;
+    else if (outcome === "cancelled") this.counters.cancelled++;
+    else this.counters.errors++;
+
+    const o = this.options;
+    await this.update((state, now) => {
+      state.leases = state.leases.filter((l) => l.id !== lease.id);
+
+      if (outcome === "rate_limited" || outcome === "timeout") {
+        state.intervalMs = Math.min(
+          o.maxIntervalMs,
+          Math.max(state.intervalMs * 2, o.intervalStepMs)
+        );
+        state.concurrency = Math.max(1, state.concurrency / 2);
+        state.nextSlotAt = Math.max(state.nextSlotAt, now + state.intervalMs);
+        console.log(
+          `요청 속도 감소: 간격 ${Math.round(
+            state.intervalMs
+          )}ms, 동시 요청 ${Math.floor(state.concurrency)}개`
+        );
+      } else if (outcome === "success" && latencyMs <= o.latencyTargetMs) {
+        state.intervalMs = Math.max(
+          o.minIntervalMs,
+          state.intervalMs - o.intervalStepMs
+        );
+        state.concurrency = Math.min(
+          o.maxConcurrency,
+          state.concurrency + 1 / Math.max(1, state.concurrency)
+        );
+      }
+      return undefined;
+    });
+  }
+
+  getStats() {
+    const state = this.lastState;
+    return {
+      shared: this.localState === null,
+      stateFile: this.statePath,
+      intervalMs: state ? Math.round(state.intervalMs) : null,
+      concurrency: state ? Math.floor(state.concurrency) : null,
+      inFlight: state ? state.leases.length : null,
+      ...this.counters,
+    };
+  }
+
+  private initialState(): RateState {
+    return {
+      intervalMs: this.options.initialIntervalMs,
+      concurrency: 1,
+      nextSlotAt: 0,
+      leases: [],
+      updatedAt: Date.now(),
+    };
+  }
+
+  private pruneLeases(state: RateState, now: number): void {
+    state.leases = state.leases.filter(
+      (lease) =>
+        lease.expiresAt > now &&
+        (lease.pid === process.pid || isProcessAlive(lease.pid))
+    );
+  }
+
+  // 잠금을 잡은 상태에서 공유 상태를 읽고 수정한 뒤 저장
+  private async update<R>(
+    mutate: (state: RateState, now: number) => R
+  ): Promise<R> {
+    if (this.localState) {
+      const result = mutate(this.localState, Date.now());
+      this.lastState = this.localState;
+      return result;
+    }
+
+    let lockContent: string;
+    try {
+      lockContent = await this.lock();
+    } catch (error) {
+      console.error(
+        "공유 속도 제어 상태를 사용할 수 없어 프로세스 내부 상태로 전환:",
+        error
+      );
+      this.localState = this.lastState ?? this.initialState();
+      return this.update(mutate);
+    }
+
+    try {
+      const state = await this.readState();
+      const result = mutate(state, Date.now());
+      state.updatedAt = Date.now();
+      await this.writeState(state);
+      this.lastState = state;
+      return result;
+    } finally {
+      await this.removeLock(lockContent).catch(() => undefined);
+    }
+  }
+
+  // 잠금 파일을 만들어 pid 와 토큰을 기록하고, 그 내용을 반환 (풀 때 자기 잠금인지 확인용)
+  private async lock(): Promise<string> {
+    await fs.mkdir(this.options.stateDir, { recursive: true });
+    const content = JSON.stringify({
+      pid: process.pid,
+      token: randomBytes(8).toString("hex"),
+    });
+    for (;;) {
+      try {
+        await fs.writeFile(this.lockPath, content, { flag: "wx" });
+        return content;
+      } catch (error) {
+        if ((error as NodeJS.ErrnoException).code !== "EEXIST") throw error;
+      }
+
+      const stale = await this.staleLock();
+      if (stale !== null) {
+        await this.removeLock(stale);
+        continue;
+      }
+      await sleep(LOCK_RETRY_MS);
+    }
+  }
+
+  // 깨도 되는 잠금이면 그 내용을 반환
+  // 잡은 프로세스가 죽었거나, LOCK_STALE_MS 보다 오래되었을 때만 (GC / 느린 파일 시스템으로 멈춘 프로세스의 잠금은 기다린다)
+  private async staleLock(): Promise<string | null> {
+    const [content, stat] = await Promise.all([
+      fs.readFile(this.lockPath, "utf8").catch(() => null),
+      fs.stat(this.lockPath).catch(() => null),
+    ]);
+    if (content === null || !stat) return null;
+    if (Date.now() - stat.mtimeMs > LOCK_STALE_MS) return content;
+    try {
+      const owner = JSON.parse(content);
+      if (typeof owner.pid === "number" && !isProcessAlive(owner.pid)) {
+        return content;
+      }
+    } catch {
+      // 만든 직후 아직 내용을 쓰지 않은 잠금
+    }
+    return null;
+  }
+
+  // 잠금 파일의 내용이 expected 일 때만 지운다 (그사이 다른 프로세스가 새로 잡은 잠금은 건드리지 않음)
+  // 먼저 고유한 이름으로 옮긴 뒤 내용을 확인하므로 확인과 삭제 사이에 잠금이 바뀌어도 안전하다.
+  private async removeLock(expected: string): Promise<void> {
+    const claimed = `${this.lockPath}.${process.pid}.${randomBytes(4).toString(
+      "hex"
+    )}`;
+    try {
+      await fs.rename(this.lockPath, claimed);
+    } catch {
+      return;
+    }
+    const content = await fs.readFile(claimed, "utf8").catch(() => null);
+    if (content !== expected) {
+      // 다른 프로세스의 잠금이었으면 되돌린다 (그사이 새 잠금이 생겼으면 link 가 실패하고 새 잠금이 남음)
+      await fs.link(claimed, this.lockPath).catch(() => undefined);
+    }
+    await fs.rm(claimed, { force: true });
+  }
+
+  private async readState(): Promise<RateState> {
+    try {
+      const state = JSON.parse(await fs.readFile(this.statePath, "utf8"));
+      if (
+        typeof state.intervalMs === "number" &&
+        typeof state.concurrency === "number" &&
+        Array.isArray(state.leases)
+      ) {
+        // 설정이 바뀐 경우에도 범위를 벗어나지 않도록
+        state.intervalMs = Math.min(
+          this.options.maxIntervalMs,
+          Math.max(this.options.minIntervalMs, state.intervalMs)
+        );
+        state.concurrency = Math.min(
+          this.options.maxConcurrency,
+          Math.max(1, state.concurrency)
+        );
+        return state;
+      }
+    } catch {
+      // 파일이 없거나 손상된 경우 초기 상태로 시작
+    }
+    return this.initialState();
+  }
+
+  private async writeState(state: RateState): Promise<void> {
+    const tempPath = `${this.statePath}.${process.pid}.tmp`;
+    await fs.writeFile(tempPath, JSON.stringify(state));
+    await fs.rename(tempPath, this.statePath);
+  }
+}
+
+export function rateControllerOptionsFromEnv(): RateControllerOptions {
+  const env = process.env;
+  const minIntervalMs = parseNumberEnv(
+    env.NAVER_FLIGHT_MIN_SEARCH_INTERVAL_MS,
+    1000
+  );
+  return {
+    stateDir:
+      env.NAVER_FLIGHT_STATE_DIR || path.join(os.tmpdir(), "naver-flight-mcp"),
+    initialIntervalMs: Math.max(
+      minIntervalMs,
+      parseNumberEnv(env.NAVER_FLIGHT_INITIAL_SEARCH_INTERVAL_MS, 3000)
+    ),
+    minIntervalMs,
+    maxIntervalMs: parseNumberEnv(
+      env.NAVER_FLIGHT_MAX_SEARCH_INTERVAL_MS,
+      60000
+    ),
+    intervalStepMs: parseNumberEnv(
+      env.NAVER_FLIGHT_SEARCH_INTERVAL_STEP_MS,
+      250
+    ),
+    maxConcurrency: Math.max(
+      1,
+      parseNumberEnv(env.NAVER_FLIGHT_MAX_CONCURRENCY, 4)
+    ),
+    latencyTargetMs: parseNumberEnv(env.NAVER_FLIGHT_LATENCY_TARGET_MS, 8000),
+  };
+}
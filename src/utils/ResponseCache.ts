@@ -0,0 +1,202 @@
+import { createHash, randomBytes } from "crypto";
+import { promises as fs } from "fs";
+import os from "os";
+import path from "path";
+import { parseFlagEnv, parseNumberEnv } from "./env.js";
+
+// 디스크 기반 검색 응답 캐시
+// - 키: 검색 페이로드를 정규화(JSON 키 정렬)한 뒤의 SHA-256 해시
+// - 수명: 응답의 status.expireAt (설정한 최대 TTL을 넘지 않음)
+// - 크기: 최대 항목 수를 넘으면 가장 오래 쓰이지 않은 항목부터 삭제 (LRU, 파일 mtime 기준)
+// 항목마다 파일 하나를 임시 파일 + rename 으로 원자적으로 쓰기 때문에
+// 여러 서버 프로세스가 같은 디렉터리를 함께 사용해도 안전하다.
+
+export interface ResponseCacheOptions {
+  enabled: boolean;
+  dir: string;
+  maxTtlMs: number;
+  maxEntries: number;
+}
+
+export interface ResponseCacheStats {
+  enabled: boolean;
+  dir: string;
+  hits: number;
+  misses: number;
+  stale: number;
+  writes: number;
+  evictions: number;
+  errors: number;
+}
+
+interface CacheEntry<T> {
+  key: string;
+  storedAt: number;
+  expiresAt: number;
+  data: T;
+}
+
+const ENTRY_SUFFIX = ".json";
+
+// 키 순서와 무관하게 같은 값이면 같은 문자열이 되도록 직렬화
+export function canonicalJson(value: unknown): string {
+  if (Array.isArray(value)) {
+    return `[${value.map(canonicalJson).join(",")}]`;
+  }
+  if (value && typeof value === "object") {
+    const entries = Object.keys(value as Record<string, unknown>)
+      .filter((key) => (value as Record<string, unknown>)[key] !== undefined)
+      .sort()
+      .map(
+        (key) =>
+          `${JSON.stringify(key)}:${canonicalJson(
+            (value as Record<string, unknown>)[key]
+          )}`
+      );
+    return `{${entries.join(",")}}`;
+  }
+  return JSON.stringify(value ?? null);
+}
+
+export function hashPayload(payload: unknown): string {
+  return createHash("sha256").update(canonicalJson(payload)).digest("hex");
+}
+
+export function responseCacheOptionsFromEnv(): ResponseCacheOptions {
+  return {
+    enabled: parseFlagEnv(process.env.NAVER_FLIGHT_CACHE, true),
+    dir:
+      process.env.NAVER_FLIGHT_CACHE_DIR ||
+      path.join(os.tmpdir(), "naver-flight-mcp-cache"),
+    maxTtlMs:
+      parseNumberEnv(process.env.NAVER_FLIGHT_CACHE_MAX_TTL_SECONDS, 600) *
+      1000,
+    maxEntries: parseNumberEnv(process.env.NAVER_FLIGHT_CACHE_MAX_ENTRIES, 500),
+  };
+}
+
+export class ResponseCache<T> {
+  private readonly options: ResponseCacheOptions;
+  private readonly stats = {
+    hits: 0,
+    misses: 0,
+    stale: 0,
+    writes: 0,
+    evictions: 0,
+    errors: 0,
+  };
+  private dirReady: Promise<void> | null = null;
+
+  constructor(options: ResponseCacheOptions) {
+    this.options = options;
+  }
+
+  get enabled(): boolean {
+    return this.options.enabled && this.options.maxTtlMs > 0;
+  }
+
+  private entryPath(key: string): string {
+    return path.join(this.options.dir, `${key}${ENTRY_SUFFIX}`);
+  }
+
+  private ensureDir(): Promise<void> {
+    if (!this.dirReady) {
+      this.dirReady = fs
+        .mkdir(this.options.dir, { recursive: true })
+        .then(() => undefined);
+    }
+    return this.dirReady;
+  }
+
+  async get(payload: unknown): Promise<T | null> {
+    if (!this.enabled) return null;
+
+    const key = hashPayload(payload);
+    const file = this.entryPath(key);
+
+    let entry: CacheEntry<T>;
+    try {
+      entry = JSON.parse(await fs.readFile(file, "utf8"));
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code !== "ENOENT") {
+        this.stats.errors++;
+      }
+      this.stats.misses++;
+      return null;
+    }
+
+    if (entry.key !== key || entry.expiresAt <= Date.now()) {
+      this.stats.stale++;
+      await fs.rm(file, { force: true }).catch(() => undefined);
+      return null;
+    }
+
+    this.stats.hits++;
+    // LRU: 사용한 항목의 mtime 갱신
+    const now = new Date();
+    await fs.utimes(file, now, now).catch(() => undefined);
+    return entry.data;
+  }
+
+  async set(payload: unknown, data: T, expireAt?: string): Promise<void> {
+    if (!this.enabled) return;
+
+    const now = Date.now();
+    const upstreamExpiry = expireAt ? Date.parse(expireAt) : NaN;
+    const expiresAt = Math.min(
+      Number.isFinite(upstreamExpiry) ? upstreamExpiry : Infinity,
+      now + this.options.maxTtlMs
+    );
+    if (expiresAt <= now) return;
+
+    const key = hashPayload(payload);
+    const file = this.entryPath(key);
+    const tempFile = `${file}.${process.pid}.${randomBytes(4).toString(
+      "hex"
+    )}.tmp`;
+    const entry: CacheEntry<T> = { key, storedAt: now, expiresAt, data };
+
+    try {
+      await this.ensureDir();
+      await fs.writeFile(tempFile, JSON.stringify(entry));
+      await fs.rename(tempFile, file);
+      this.stats.writes++;
+      await this.evict();
+    } catch (error) {
+      this.stats.errors++;
+      console.error("검색 응답 캐시 저장 실패:", error);
+      await fs.rm(tempFile, { force: true }).catch(() => undefined);
+    }
+  }
+
+  // 최대 항목 수를 넘으면 가장 오래 쓰이지 않은 항목부터 삭제
+  private async evict(): Promise<void> {
+    const names = (await fs.readdir(this.options.dir)).filter((name) =>
+      name.endsWith(ENTRY_SUFFIX)
+    );
+    if (names.length <= this.options.maxEntries) return;
+
+    const entries = await Promise.all(
+      names.map(async (name) => {
+        const file = path.join(this.options.dir, name);
+        const stat = await fs.stat(file).catch(() => null);
+        return { file, mtimeMs: stat ? stat.mtimeMs : 0 };
+      })
+    );
+    entries.sort((a, b) => a.mtimeMs - b.mtimeMs);
+
+    const excess = entries.slice(0, entries.length - this.options.maxEntries);
+    for (const { file } of excess) {
+      await fs.rm(file, { force: true }).catch(() => undefined);
+      this.stats.evictions++;
+    }
+  }
+
+  getStats(): ResponseCacheStats {
+    return {
+      enabled: this.enabled,
+      dir: this.options.dir,
+      ...this.stats,
+    };
+  }
+}
@@ -0,0 +1,265 @@
+import { createHash, randomBytes } from "crypto";
+import { promises as fs, readFileSync } from "fs";
+import path from "path";
+import { gunzipSync, gzipSync } from "zlib";
+import { parseNumberEnv } from "./env.js";
+import { hashPayload } from "./ResponseCache.js";
+
+// 검색 요청 기록 / 재생 (결정적인 오프라인 실행과 부하 재현용)
+// - 기록: 요청 페이로드와 받은 SSE 본문을 조각별 도착 시각과 함께 보관
+// - 재생: 같은 페이로드 요청에 기록된 본문을 원래 시각(또는 배속)대로 돌려줌
+//
+// 보관 형식 (디렉터리 하나):
+//   blobs/<sha256>.gz  SSE 본문 (gzip, 내용 해시로 이름 지어 같은 본문은 한 번만 저장)
+//   index.jsonl        요청 하나당 한 줄: 페이로드 해시, 상태 코드, 본문 해시, 조각별 [시각 ms, 길이]
+// 색인은 한 줄씩 덧붙이기만 하므로 여러 서버 프로세스가 같은 디렉터리에 기록해도 된다.
+
+export interface SearchRecorderOptions {
+  mode: "off" | "record" | "replay";
+  dir: string;
+  // 재생 배속 (2 = 두 배 빠르게, 0 = 기다리지 않음)
+  speed: number;
+}
+
+export interface SearchRecorderStats {
+  mode: SearchRecorderOptions["mode"];
+  dir: string;
+  recorded: number;
+  replayed: number;
+  misses: number;
+  errors: number;
+}
+
+// node-fetch Response 중 검색 처리에 쓰는 부분만
+export interface SearchResponse {
+  ok: boolean;
+  status: number;
+  body: AsyncIterable<Buffer | string> | null;
+  arrayBuffer(): Promise<ArrayBuffer>;
+}
+
+interface RecordedExchange {
+  key: string; // 페이로드 해시
+  payload: unknown;
+  status: number;
+  blob: string | null; // 본문 해시 (본문이 없으면 null)
+  ttfbMs: number; // 요청 시작부터 응답 헤더까지
+  chunks: [number, number][]; // [요청 시작부터 도착 시각 ms, 바이트 수]
+  recordedAt: string;
+}
+
+const INDEX_FILE = "index.jsonl";
+const BLOB_DIR = "blobs";
+
+export function searchRecorderOptionsFromEnv(): SearchRecorderOptions {
+  const recordDir = process.env.NAVER_FLIGHT_RECORD_DIR;
+  const replayDir = process.env.NAVER_FLIGHT_REPLAY_DIR;
+  return {
+    mode: replayDir ? "replay" : recordDir ? "record" : "off",
+    dir: replayDir || recordDir || "",
+    speed: parseNumberEnv(process.env.NAVER_FLIGHT_REPLAY_SPEED, 1),
+  };
+}
+
+function sleep(ms: number): Promise<void> {
+  return ms > 0
+    ? new Promise((resolve) => setTimeout(resolve, ms))
+    : Promise.resolve();
+}
+
+function toArrayBuffer(buffer: Buffer): ArrayBuffer {
+  return buffer.buffer.slice(
+    buffer.byteOffset,
+    buffer.byteOffset + buffer.byteLength
+  ) as ArrayBuffer;
+}
+
+export class SearchRecorder {
+  private readonly options: SearchRecorderOptions;
+  private readonly stats = { recorded: 0, replayed: 0, misses: 0, errors: 0 };
+  // 재생: 페이로드 해시 -> 기록 순서대로의 응답 (같은 요청이 여러 번이면 차례로, 끝나면 마지막 것 반복)
+  private replayIndex: Map<string, RecordedExchange[]> | null = null;
+  private readonly replayCursor = new Map<string, number>();
+  private dirReady: Promise<void> | null = null;
+
+  constructor(options: SearchRecorderOptions) {
+    this.options = options;
+  }
+
+  get mode(): SearchRecorderOptions["mode"] {
+    return this.options.dir ? this.options.mode : "off";
+  }
+
+  // 검색 요청 하나 (기록 / 재생이 꺼져 있으면 send 를 그대로 호출)
+  async request(
+    payload: unknown,
+    send: () => Promise<SearchResponse>
+  ): Promise<SearchResponse> {
+    if (this.mode === "replay") return this.replay(payload);
+    if (this.mode === "record") return this.record(payload, send);
+    return send();
+  }
+
+  private async record(
+    payload: unknown,
+    send: () => Promise<SearchResponse>
+  ): Promise<SearchResponse> {
+    const startedAt = Date.now();
+    const response = await send();
+    const exchange: RecordedExchange = {
+      key: hashPayload(payload),
+      payload,
+      status: response.status,
+      blob: null,
+      ttfbMs: Date.now() - startedAt,
+      chunks: [],
+      recordedAt: new Date(startedAt).toISOString(),
+    };
+    const received: Buffer[] = [];
+    const save = () => this.save(exchange, Buffer.concat(received));
+
+    // 읽는 쪽이 본문을 소비하는 대로 조각과 도착 시각을 기록
+    // (처리 측이 스트림을 일찍 닫으면 거기까지 받은 본문만 남으며, 재생에서도 같은 지점에서 끝난다)
+    async function* tee(): AsyncGenerator<Buffer> {
+      try {
+        for await (const chunk of response.body ?? []) {
+          const buffer = typeof chunk === "string" ? Buffer.from(chunk) : chunk;
+          exchange.chunks.push([Date.now() - startedAt, buffer.length]);
+          received.push(buffer);
+          yield buffer;
+        }
+      } finally {
+        await save();
+      }
+    }
+
+    return {
+      ok: response.ok,
+      status: response.status,
+      body: tee(),
+      arrayBuffer: async () => {
+        const buffer = Buffer.from(await response.arrayBuffer());
+        exchange.chunks.push([Date.now() - startedAt, buffer.length]);
+        received.push(buffer);
+        await save();
+        return toArrayBuffer(buffer);
+      },
+    };
+  }
+
+  private async save(exchange: RecordedExchange, body: Buffer): Promise<void> {
+    try {
+      await this.ensureDir();
+      if (body.length > 0) {
+        exchange.blob = createHash("sha256").update(body).digest("hex");
+        const file = this.blobPath(exchange.blob);
+        const exists = await fs
+          .stat(file)
+          .then(() => true)
+          .catch(() => false);
+        if (!exists) {
+          const tempFile = `${file}.${process.pid}.${randomBytes(4).toString(
+            "hex"
+          )}.tmp`;
+          await fs.writeFile(tempFile, gzipSync(body));
+          await fs.rename(tempFile, file);
+        }
+      }
+      await fs.appendFile(
+        path.join(this.options.dir, INDEX_FILE),
+        JSON.stringify(exchange) + "\n"
+      );
+      this.stats.recorded++;
+    } catch (error) {
+      this.stats.errors++;
+      console.error("검색 기록 저장 실패:", error);
+    }
+  }
+
+  private async replay(payload: unknown): Promise<SearchResponse> {
+    const key = hashPayload(payload);
+    const exchanges = this.loadIndex().get(key);
+    if (!exchanges || exchanges.length === 0) {
+      // 기록이 없는 요청은 빈 본문으로 끝낸다 (재시도 대기 없이 "결과 없음")
+      this.stats.misses++;
+      console.log("재생할 검색 기록이 없습니다 (빈 응답 반환)");
+      return {
+        ok: true,
+        status: 200,
+        body: (async function* () {})(),
+        arrayBuffer: async () => new ArrayBuffer(0),
+      };
+    }
+
+    const cursor = this.replayCursor.get(key) ?? 0;
+    this.replayCursor.set(key, cursor + 1);
+    const exchange = exchanges[Math.min(cursor, exchanges.length - 1)];
+    this.stats.replayed++;
+
+    const body = exchange.blob
+      ? gunzipSync(readFileSync(this.blobPath(exchange.blob)))
+      : Buffer.alloc(0);
+    const scale = this.options.speed > 0 ? 1 / this.options.speed : 0;
+    const startedAt = Date.now();
+    await sleep(exchange.ttfbMs * scale);
+
+    // 기록된 조각 경계와 도착 시각을 그대로 재현
+    async function* chunks(): AsyncGenerator<Buffer> {
+      let offset = 0;
+      for (const [atMs, length] of exchange.chunks) {
+        await sleep(atMs * scale - (Date.now() - startedAt));
+        yield body.subarray(offset, offset + length);
+        offset += length;
+      }
+    }
+
+    return {
+      ok: exchange.status >= 200 && exchange.status < 300,
+      status: exchange.status,
+      body: chunks(),
+      arrayBuffer: async () => toArrayBuffer(body),
+    };
+  }
+
+  // 색인은 처음 재생할 때 한 번만 읽는다
+  private loadIndex(): Map<string, RecordedExchange[]> {
+    if (this.replayIndex) return this.replayIndex;
+    this.replayIndex = new Map();
+    let text = "";
+    try {
+      text = readFileSync(path.join(this.options.dir, INDEX_FILE), "utf8");
+    } catch (error) {
+      this.stats.errors++;
+      console.error("검색 기록 색인을 읽을 수 없습니다:", error);
+    }
+    for (const line of text.split("\n")) {
+      if (!line.trim()) continue;
+      try {
+        const exchange: RecordedExchange = JSON.parse(line);
+        const list = this.replayIndex.get(exchange.key) ?? [];
+        list.push(exchange);
+        this.replayIndex.set(exchange.key, list);
+      } catch {
+        // 쓰다 만 줄은 건너뜀
+      }
+    }
+    return this.replayIndex;
+  }
+
+  private blobPath(hash: string): string {
+    return path.join(this.options.dir, BLOB_DIR, `${hash}.gz`);
+  }
+
+  private ensureDir(): Promise<void> {
+    if (!this.dirReady) {
+      this.dirReady = fs
+        .mkdir(path.join(this.options.dir, BLOB_DIR), { recursive: true })
+        .then(() => undefined);
+    }
+    return this.dirReady;
+  }
+
+  getStats(): SearchRecorderStats {
+    return { mode: this.mode, dir: this.options.dir, ...this.stats };
+  }
+}
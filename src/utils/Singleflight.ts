@@ -0,0 +1,126 @@
+// 같은 키로 동시에 들어온 요청을 하나로 합치는 유틸리티
+// 처음 요청한 쪽만 실제 작업을 수행하고, 그 작업이 끝나기 전에 들어온
+// 같은 키의 요청은 같은 Promise 를 기다려 같은 결과를 받는다.
+// 요청마다 signal 을 줄 수 있으며, 기다리는 요청이 모두 취소되어야 공유 작업도 중단된다.
+// 중단된 작업은 바로 키에서 빠지므로 그 뒤에 들어온 요청은 새 작업을 시작한다.
+// 요청마다 만료 시각(expiresAt)을 줄 수 있다.
+// - 자기보다 먼저 만료되는 작업에는 합류하지 않고 새 작업을 시작한다 (새 작업이 키를 넘겨받음)
+//   거의 동시에 들어온 요청끼리는 합쳐지도록 expirySlackMs 만큼 먼저 만료되는 작업까지는 합류한다
+// - 더 늦게 만료되는 작업에 합류한 요청은 자기 만료 시각에 SingleflightExpiredError 로 먼저 빠진다
+
+export interface SingleflightStats {
+  calls: number;
+  executions: number;
+  coalesced: number;
+  cancelled: number;
+  expired: number;
+  inFlight: number;
+}
+
+// 합류한 작업보다 요청의 만료 시각이 먼저 와서 기다리기를 멈춤
+export class SingleflightExpiredError extends Error {
+  constructor() {
+    super("공유 작업을 기다리는 제한 시간 초과");
+    this.name = "SingleflightExpiredError";
+  }
+}
+
+interface Flight<T> {
+  promise: Promise<T>;
+  controller: AbortController;
+  waiters: number;
+  expiresAt: number; // Date.now() 기준 (제한 없으면 Infinity)
+}
+
+export class Singleflight<T> {
+  private readonly inFlight = new Map<string, Flight<T>>();
+  private calls = 0;
+  private executions = 0;
+  private coalesced = 0;
+  private cancelled = 0;
+  private expired = 0;
+  private readonly expirySlackMs: number;
+
+  constructor(expirySlackMs = 0) {
+    this.expirySlackMs = expirySlackMs;
+  }
+
+  do(
+    key: string,
+    fn: (signal: AbortSignal) => Promise<T>,
+    signal?: AbortSignal,
+    expiresAt = Infinity
+  ): Promise<T> {
+    this.calls++;
+
+    let flight = this.inFlight.get(key);
+    if (flight && flight.expiresAt >= expiresAt - this.expirySlackMs) {
+      this.coalesced++;
+    } else {
+      this.executions++;
+      const controller = new AbortController();
+      const promise = fn(controller.signal).finally(() => {
+        this.forget(key, created);
+      });
+      const created: Flight<T> = { promise, controller, waiters: 0, expiresAt };
+      flight = created;
+      this.inFlight.set(key, flight);
+    }
+
+    // signal 이 없고 작업과 함께 만료되는 요청은 끝까지 기다리므로 공유 작업이 중단되지 않는다
+    flight.waiters++;
+    const expiresFirst = expiresAt < flight.expiresAt;
+    if (!signal && !expiresFirst) return flight.promise;
+
+    const current = flight;
+    return new Promise<T>((resolve, reject) => {
+      let timer: NodeJS.Timeout | undefined;
+      const cleanup = () => {
+        clearTimeout(timer);
+        signal?.removeEventListener("abort", onAbort);
+      };
+      const leave = (reason: unknown) => {
+        cleanup();
+        if (--current.waiters === 0) {
+          // 중단된 작업이 끝날 때까지 키에 남아 있으면 새 요청이 거기에 합류해 함께 실패한다
+          this.forget(key, current);
+          current.controller.abort(reason);
+        }
+        reject(reason);
+      };
+      const onAbort = () => {
+        this.cancelled++;
+        leave(signal!.reason);
+      };
+
+      if (signal?.aborted) {
+        onAbort();
+        return;
+      }
+      signal?.addEventListener("abort", onAbort, { once: true });
+      if (expiresFirst) {
+        timer = setTimeout(() => {
+          this.expired++;
+          leave(new SingleflightExpiredError());
+        }, Math.max(0, expiresAt - Date.now()));
+      }
+      current.promise.then(resolve, reject).finally(cleanup);
+    });
+  }
+
+  // 같은 키로 이미 새 작업이 시작되었으면 그 작업은 남겨 둔다
+  private forget(key: string, flight: Flight<T>): void {
+    if (this.inFlight.get(key) === flight) this.inFlight.delete(key);
+  }
+
+  getStats(): SingleflightStats {
+    return {
+      calls: this.calls,
+      executions: this.executions,
+      coalesced: this.coalesced,
+      cancelled: this.cancelled,
+      expired: this.expired,
+      inFlight: this.inFlight.size,
+    };
+  }
+}
@@ -0,0 +1,75 @@
+// 값이 작은 순서로 상위 k개만 유지하는 고정 크기 힙
+// 전체 정렬 없이 O(n log k)로 최저가 k개를 고른다.
+export class TopK<T> {
+  private readonly heap: Array<{ score: number; seq: number; item: T }> = [];
+  private readonly k: number;
+  private seq = 0;
+
+  constructor(k: number) {
+    this.k = k;
+  }
+
+  get size(): number {
+    return this.heap.length;
+  }
+
+  // 현재 k번째 값 (아직 k개가 안 되면 Infinity)
+  get threshold(): number {
+    return this.heap.length < this.k ? Infinity : this.heap[0].score;
+  }
+
+  push(score: number, item: T): void {
+    if (this.k <= 0) return;
+    const node = { score, seq: this.seq++, item };
+    if (this.heap.length < this.k) {
+      this.heap.push(node);
+      this.siftUp(this.heap.length - 1);
+    } else if (this.greater(this.heap[0], node)) {
+      this.heap[0] = node;
+      this.siftDown(0);
+    }
+  }
+
+  // 값 오름차순 (같은 값이면 먼저 들어온 순서)
+  sorted(): T[] {
+    return [...this.heap]
+      .sort((a, b) => a.score - b.score || a.seq - b.seq)
+      .map((node) => node.item);
+  }
+
+  // 루트에 가장 "나쁜" 값 (큰 값, 같으면 나중에 들어온 값)이 오도록 비교
+  private greater(
+    a: { score: number; seq: number },
+    b: { score: number; seq: number }
+  ): boolean {
+    return a.score > b.score || (a.score === b.score && a.seq > b.seq);
+  }
+
+  private siftUp(index: number): void {
+    const heap = this.heap;
+    while (index > 0) {
+      const parent = (index - 1) >> 1;
+      if (!this.greater(heap[index], heap[parent])) break;
+      [heap[index], heap[parent]] = [heap[parent], heap[index]];
+      index = parent;
+    }
+  }
+
+  private siftDown(index: number): void {
+    const heap = this.heap;
+    for (;;) {
+      const left = index * 2 + 1;
+      const right = left + 1;
+      let largest = index;
+      if (left < heap.length && this.greater(heap[left], heap[largest])) {
+        largest = left;
+      }
+      if (right < heap.length && this.greater(heap[right], heap[largest])) {
+        largest = right;
+      }
+      if (largest === index) break;
+      [heap[index], heap[largest]] = [heap[largest], heap[index]];
+      index = largest;
+    }
+  }
+}
@@ -0,0 +1,20 @@
+// 환경 변수 해석 유틸리티
+
+// 환경 변수의 0 이상 숫자 값 (없거나 잘못된 값이면 기본값)
+export function parseNumberEnv(
+  value: string | undefined,
+  fallback: number
+): number {
+  if (value === undefined || value.trim() === "") return fallback;
+  const parsed = Number(value);
+  return Number.isFinite(parsed) && parsed >= 0 ? parsed : fallback;
+}
+
+// "off", "false", "0" 이면 꺼진 것으로 간주
+export function parseFlagEnv(
+  value: string | undefined,
+  fallback: boolean
+): boolean {
+  if (value === undefined || value.trim() === "") return fallback;
+  return !["off", "false", "0", "no"].includes(value.trim().toLowerCase());
+}
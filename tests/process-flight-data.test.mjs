@@ -0,0 +1,116 @@
+// processFlightData / TopK: 힙으로 고른 최저가 k개가 전체 정렬 결과와 같은지 확인
+// 먼저 `npm run build` 로 dist 를 만들어야 한다 (`npm test` 가 함께 실행).
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import { processFlightData } from "../dist/tools/NaverFlightSearch.js";
+import { TopK } from "../dist/utils/TopK.js";
+import { buildSearchResponse } from "../bench/fake-naver-server.mjs";
+
+// 여정·판매처별 최저가를 전부 모아 정렬한 기준 결과
+function bruteForceFares(response, groupByReturnDate = false) {
+  const ids = new Set(response.itineraries.map((it) => it.itineraryId));
+  const cheapest = new Map();
+  for (const mapping of response.fareMappings) {
+    const [out, ret] = mapping.itineraryIds.split("-");
+    if (!ids.has(out) || !ids.has(ret)) continue;
+    for (const fare of mapping.fares) {
+      const key = `${mapping.itineraryIds}|${fare.partnerCode}`;
+      const total = fare.adult.totalFare;
+      if (!(total > 0)) continue;
+      const group = groupByReturnDate ? ret.slice(0, 8) : "";
+      if (!cheapest.has(key) || total < cheapest.get(key).total) {
+        cheapest.set(key, { total, group });
+      }
+    }
+  }
+  return [...cheapest.values()];
+}
+
+function lowest(values, k) {
+  return values.map((v) => v.total).sort((a, b) => a - b).slice(0, k);
+}
+
+for (const k of [1, 10, 50]) {
+  test(`top ${k} fares match a full sort`, () => {
+    const response = buildSearchResponse({}, { itineraries: 40, fareMappings: 500, seed: k });
+    const flights = processFlightData(response, k);
+    assert.deepEqual(
+      flights.map((f) => f.totalFare),
+      lowest(bruteForceFares(response), k)
+    );
+    assert.deepEqual(
+      flights.map((f) => f.rank),
+      flights.map((_, i) => i + 1)
+    );
+  });
+}
+
+test("duplicate itinerary + partner fares keep only the cheapest", () => {
+  const response = buildSearchResponse({}, { itineraries: 5, fareMappings: 1, faresPerMapping: 1 });
+  const [mapping] = response.fareMappings;
+  const fare = mapping.fares[0];
+  response.fareMappings = [
+    mapping,
+    { ...mapping, fares: [{ ...fare, adult: { ...fare.adult, totalFare: 50000 } }] },
+    { ...mapping, fares: [{ ...fare, adult: { ...fare.adult, totalFare: 0 } }] },
+  ];
+  const flights = processFlightData(response, 10);
+  assert.equal(flights.length, 1);
+  assert.equal(flights[0].totalFare, 50000);
+  assert.equal(flights[0].partnerCode, fare.partnerCode);
+});
+
+test("fares whose itineraries are missing are dropped", () => {
+  const response = buildSearchResponse({}, { itineraries: 5, fareMappings: 20 });
+  response.fareMappings.push({
+    ...response.fareMappings[0],
+    itineraryIds: "missing-alsomissing",
+    fares: [{ ...response.fareMappings[0].fares[0], adult: { totalFare: 1 } }],
+  });
+  assert.ok(processFlightData(response, 100).every((f) => f.totalFare > 1));
+});
+
+test("groupByReturnDate keeps k fares per return date", () => {
+  const a = buildSearchResponse(
+    { itineraries: [{ departureDate: "20261101" }, { departureDate: "20261104" }] },
+    { itineraries: 10, fareMappings: 100, seed: 3 }
+  );
+  const b = buildSearchResponse(
+    { itineraries: [{ departureDate: "20261101" }, { departureDate: "20261105" }] },
+    { itineraries: 10, fareMappings: 100, seed: 4 }
+  );
+  const response = {
+    ...a,
+    itineraries: [...a.itineraries, ...b.itineraries.slice(10)],
+    fareMappings: [...a.fareMappings, ...b.fareMappings],
+  };
+  const flights = processFlightData(response, 3, true);
+  const perDate = new Map();
+  for (const f of flights) perDate.set(f.returnDate, (perDate.get(f.returnDate) ?? 0) + 1);
+  assert.deepEqual([...perDate.values()], [3, 3]);
+  assert.deepEqual(
+    flights.map((f) => f.totalFare),
+    [...flights.map((f) => f.totalFare)].sort((x, y) => x - y)
+  );
+});
+
+test("maxFare filter is applied before selection", () => {
+  const response = buildSearchResponse({}, { itineraries: 20, fareMappings: 300 });
+  const flights = processFlightData(response, 200, false, { maxFare: 200000 });
+  assert.ok(flights.length > 0);
+  assert.ok(flights.every((f) => f.totalFare <= 200000));
+});
+
+test("TopK keeps the k smallest in insertion order for ties", () => {
+  const top = new TopK(3);
+  assert.equal(top.threshold, Infinity);
+  for (const [score, item] of [[5, "a"], [1, "b"], [5, "c"], [3, "d"], [1, "e"], [9, "f"]]) {
+    top.push(score, item);
+  }
+  assert.equal(top.size, 3);
+  assert.equal(top.threshold, 3);
+  assert.deepEqual(top.sorted(), ["b", "e", "d"]);
+  const none = new TopK(0);
+  none.push(1, "x");
+  assert.equal(none.size, 0);
+});
@@ -0,0 +1,89 @@
+// Singleflight: 같은 키의 동시 요청 합치기, 취소, 만료 시각에 따른 합류 규칙
+// 먼저 `npm run build` 로 dist 를 만들어야 한다 (`npm test` 가 함께 실행).
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import {
+  Singleflight,
+  SingleflightExpiredError,
+} from "../dist/utils/Singleflight.js";
+
+// ms 뒤에 value 로 끝나고, 중단되면 바로 실패하는 작업
+function work(runs, value, ms) {
+  return (signal) => {
+    runs.push(value);
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => resolve(value), ms);
+      signal.addEventListener("abort", () => {
+        clearTimeout(timer);
+        reject(signal.reason);
+      });
+    });
+  };
+}
+
+test("concurrent calls with the same key share one execution", async () => {
+  const flight = new Singleflight();
+  const runs = [];
+  const results = await Promise.all([
+    flight.do("k", work(runs, "a", 20)),
+    flight.do("k", work(runs, "b", 20)),
+  ]);
+  assert.deepEqual(results, ["a", "a"]);
+  assert.deepEqual(runs, ["a"]);
+  assert.equal(flight.getStats().coalesced, 1);
+  assert.equal(flight.getStats().inFlight, 0);
+});
+
+test("the shared work is aborted only when every waiter cancels", async () => {
+  const flight = new Singleflight();
+  const runs = [];
+  const first = new AbortController();
+  const second = new AbortController();
+  const a = flight.do("k", work(runs, "a", 50), first.signal);
+  const b = flight.do("k", work(runs, "b", 50), second.signal);
+  first.abort(new Error("first"));
+  await assert.rejects(a, /first/);
+  assert.equal(await b, "a");
+
+  const c = new AbortController();
+  const d = flight.do("k", work(runs, "c", 50), c.signal);
+  c.abort(new Error("cancelled"));
+  await assert.rejects(d, /cancelled/);
+  // 중단된 작업은 바로 키에서 빠지므로 새 요청은 새 작업을 시작한다
+  assert.equal(await flight.do("k", work(runs, "d", 5)), "d");
+  assert.deepEqual(runs, ["a", "c", "d"]);
+});
+
+test("a caller does not join a flight that expires before it", async () => {
+  const flight = new Singleflight();
+  const runs = [];
+  const now = Date.now();
+  const short = flight.do("k", work(runs, "short", 20), undefined, now + 1000);
+  const long = flight.do("k", work(runs, "long", 20), undefined, now + 5000);
+  // 더 긴 작업이 키를 넘겨받아 뒤에 온 같은 만료 시각의 요청은 그 작업에 합류한다
+  const late = flight.do("k", work(runs, "late", 20), undefined, now + 5000);
+  assert.deepEqual(await Promise.all([short, long, late]), ["short", "long", "long"]);
+  assert.deepEqual(runs, ["short", "long"]);
+});
+
+test("a caller that joins a longer flight leaves at its own expiry", async () => {
+  const flight = new Singleflight();
+  const runs = [];
+  const long = flight.do("k", work(runs, "long", 80), undefined, Date.now() + 5000);
+  const short = flight.do("k", work(runs, "short", 80), undefined, Date.now() + 20);
+  await assert.rejects(short, SingleflightExpiredError);
+  assert.equal(await long, "long");
+  assert.deepEqual(runs, ["long"]);
+  assert.equal(flight.getStats().expired, 1);
+});
+
+test("expirySlackMs lets near-simultaneous callers share a flight", async () => {
+  const flight = new Singleflight(250);
+  const runs = [];
+  const now = Date.now();
+  const first = flight.do("k", work(runs, "first", 20), undefined, now + 1000);
+  const second = flight.do("k", work(runs, "second", 20), undefined, now + 1100);
+  const third = flight.do("k", work(runs, "third", 20), undefined, now + 2000);
+  assert.deepEqual(await Promise.all([first, second, third]), ["first", "first", "third"]);
+  assert.deepEqual(runs, ["first", "third"]);
+});
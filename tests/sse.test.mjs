@@ -0,0 +1,168 @@
+// processSSEStream: 대역 서버의 프레임을 여러 크기의 조각으로 나눠 흘려 보낸다
+// 먼저 `npm run build` 로 dist 를 만들어야 한다 (`npm test` 가 함께 실행).
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import { processSSEStream } from "../dist/tools/NaverFlightSearch.js";
+import {
+  buildSSEFrames,
+  buildSearchResponse,
+} from "../bench/fake-naver-server.mjs";
+
+const SMALL = { itineraries: 20, fareMappings: 60 };
+
+// 한글이 들어간 응답 (바이트 조각 경계가 UTF-8 문자 중간에 걸리도록)
+function sampleResponse(options = {}) {
+  const response = buildSearchResponse({}, { ...SMALL, ...options });
+  response.status.message = "검색 완료 ✈";
+  return response;
+}
+
+function toBytes(frames) {
+  return Buffer.from(frames.join(""), "utf8");
+}
+
+function chunked(bytes, size) {
+  const chunks = [];
+  for (let i = 0; i < bytes.length; i += size) {
+    chunks.push(bytes.subarray(i, i + size));
+  }
+  return chunks;
+}
+
+// 결정적인 의사 난수 크기의 조각
+function randomChunks(bytes, seed) {
+  const chunks = [];
+  let state = seed;
+  for (let i = 0; i < bytes.length; ) {
+    state = (state * 1103515245 + 12345) % 2147483648;
+    const size = 1 + (state % 97);
+    chunks.push(bytes.subarray(i, i + size));
+    i += size;
+  }
+  return chunks;
+}
+
+// 다 읽힌 뒤 더 읽으려 하면 기록하는 본문
+function body(chunks, state = {}) {
+  return {
+    body: (async function* () {
+      for (const chunk of chunks) yield chunk;
+      state.readPastEnd = true;
+    })(),
+  };
+}
+
+function parseFrame(frame) {
+  return JSON.parse(frame.slice("data: ".length));
+}
+
+for (const size of [1, 2, 7, 64, 333, 4096, 1 << 20]) {
+  test(`frames split into ${size}-byte chunks parse to the completed frame`, async () => {
+    const response = sampleResponse();
+    const frames = buildSSEFrames(response, 4);
+    const result = await processSSEStream(body(chunked(toBytes(frames), size)));
+    assert.deepEqual(result, response);
+  });
+}
+
+test("random chunk sizes and CRLF line endings", async () => {
+  const response = sampleResponse();
+  const frames = buildSSEFrames(response, 3).map((frame) =>
+    frame.replace(/\n/g, "\r\n")
+  );
+  for (const seed of [1, 2, 3]) {
+    const result = await processSSEStream(
+      body(randomChunks(toBytes(frames), seed))
+    );
+    assert.deepEqual(result, response);
+  }
+});
+
+test("string chunks are accepted", async () => {
+  const response = sampleResponse();
+  const text = buildSSEFrames(response, 2).join("");
+  const chunks = [];
+  for (let i = 0; i < text.length; i += 5) chunks.push(text.slice(i, i + 5));
+  assert.deepEqual(await processSSEStream(body(chunks)), response);
+});
+
+test("stops reading after the completed frame", async () => {
+  const response = sampleResponse();
+  const frames = buildSSEFrames(response, 3);
+  const state = {};
+  const chunks = [...chunked(toBytes(frames), 50), Buffer.from("data: {}\n\n")];
+  const result = await processSSEStream(body(chunks, state));
+  assert.deepEqual(result, response);
+  assert.equal(state.readPastEnd, undefined);
+});
+
+test("minItineraries returns the first frame that has enough itineraries", async () => {
+  const response = sampleResponse();
+  const frames = buildSSEFrames(response, 4);
+  const state = {};
+  const result = await processSSEStream(body(chunked(toBytes(frames), 128), state), {
+    minItineraries: 1,
+  });
+  assert.deepEqual(result, parseFrame(frames[0]));
+  assert.equal(result.status.isCompleted, false);
+  assert.equal(state.readPastEnd, undefined);
+});
+
+test("empty frames before data are skipped", async () => {
+  const response = sampleResponse();
+  const empty = `data: ${JSON.stringify({ ...response, itineraries: [], fareMappings: [] })}\n\n`;
+  const frames = [empty, ": keep-alive\n\n", ...buildSSEFrames(response, 2)];
+  assert.deepEqual(await processSSEStream(body(chunked(toBytes(frames), 33))), response);
+});
+
+test("a stream cut inside the last frame falls back to the previous frame", async () => {
+  const response = sampleResponse();
+  const frames = buildSSEFrames(response, 4);
+  const bytes = toBytes(frames);
+  const cut = bytes.length - Math.floor(Buffer.byteLength(frames[3]) / 2);
+  const result = await processSSEStream(body(chunked(bytes.subarray(0, cut), 100)));
+  assert.deepEqual(result, parseFrame(frames[2]));
+});
+
+test("a corrupt final frame falls back to the last frame that parses", async () => {
+  const response = sampleResponse();
+  const frames = buildSSEFrames(response, 4);
+  const broken = frames[3].slice(0, Math.floor(frames[3].length / 2)) + "\n\n";
+  const result = await processSSEStream(
+    body(chunked(toBytes([...frames.slice(0, 3), broken]), 4096)),
+    { minItineraries: 10000 }
+  );
+  assert.deepEqual(result, parseFrame(frames[2]));
+});
+
+test("an aborted stream returns the frames received so far", async () => {
+  const response = sampleResponse();
+  const frames = buildSSEFrames(response, 4);
+  const controller = new AbortController();
+  const stream = {
+    body: (async function* () {
+      yield Buffer.from(frames[0] + frames[1]);
+      controller.abort(new Error("cancelled"));
+      yield Buffer.from(frames[2]);
+    })(),
+  };
+  const result = await processSSEStream(stream, { signal: controller.signal });
+  assert.deepEqual(result, parseFrame(frames[1]));
+});
+
+test("an aborted stream without a usable frame throws the abort reason", async () => {
+  const controller = new AbortController();
+  const reason = new Error("cancelled");
+  const stream = {
+    body: (async function* () {
+      yield Buffer.from("data: {\"itineraries\": [");
+      controller.abort(reason);
+      yield Buffer.from("]}\n\n");
+    })(),
+  };
+  await assert.rejects(processSSEStream(stream, { signal: controller.signal }), reason);
+});
+
+test("a stream without data frames returns null", async () => {
+  assert.equal(await processSSEStream(body([Buffer.from(": ping\n\n")])), null);
+});
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from flight_search_naver import FairScheduler
+
+
+def drain(scheduler):
+    order = []
+    while True:
+        item = scheduler.next()
+        if item is None:
+            return order
+        order.append(item)
+
+
+def test_weighted_round_robin_interleaves_routes():
+    scheduler = FairScheduler()
+    scheduler.add('A', ['a1', 'a2', 'a3', 'a4'], weight=2)
+    scheduler.add('B', ['b1', 'b2'], weight=1)
+    
+    order = drain(scheduler)
+    assert [name for name, _ in order[:3]] == ['A', 'B', 'A']
+    # 노선 안의 작업 순서는 유지되고, 한 노선이 끝나면 남은 노선만 꺼낸다
+    assert [task for name, task in order if name == 'A'] == ['a1', 'a2', 'a3', 'a4']
+    assert [task for name, task in order if name == 'B'] == ['b1', 'b2']
+    assert len(order) == 6
+
+
+def test_equal_weights_alternate():
+    scheduler = FairScheduler()
+    scheduler.add('A', ['a1', 'a2', 'a3'])
+    scheduler.add('B', ['b1', 'b2', 'b3'])
+    assert [name for name, _ in drain(scheduler)] == ['A', 'B', 'A', 'B', 'A', 'B']
+
+
+def test_expired_route_moves_remaining_tasks_to_expired():
+    scheduler = FairScheduler()
+    scheduler.add('late', ['l1', 'l2'], deadline=datetime.now() - timedelta(seconds=1))
+    scheduler.add('ok', ['o1'])
+    
+    assert drain(scheduler) == [('ok', 'o1')]
+    assert scheduler.expired == {'late': ['l1', 'l2']}
+
+
+def test_expire_all_clears_every_route():
+    scheduler = FairScheduler()
+    scheduler.add('A', ['a1', 'a2'])
+    scheduler.add('B', ['b1'])
+    assert scheduler.next() == ('A', 'a1')
+    
+    scheduler.expire_all()
+    assert scheduler.next() is None
+    assert scheduler.expired == {'A': ['a2'], 'B': ['b1']}
+
+
+def test_empty_route_is_ignored():
+    scheduler = FairScheduler()
+    scheduler.add('A', [])
+    assert scheduler.next() is None
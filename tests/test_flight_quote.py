@@ -0,0 +1,105 @@
+import pytest
+
+from flight_quote import (
+    FlightQuote,
+    decode_quotes,
+    dump_quotes,
+    encode_quotes,
+    load_quotes,
+    parse_fare,
+    parse_minutes,
+    quotes_from_results,
+)
+
+
+FLIGHT_INFO = {
+    'rank': 1,
+    'departure_date': '20261101',
+    'return_date': '20261104',
+    'outbound_flight': '7C1101',
+    'return_flight': '7C1102',
+    'total_price': '123,400원',
+    'total_fare': 123400,
+    'outbound_departure': '07:20',
+    'outbound_arrival': '09:25',
+    'outbound_duration': '125분',
+    'return_departure': '18:05',
+    'return_arrival': '20:00',
+    'return_duration': '115분',
+    'outbound_stops': 0,
+    'return_stops': 1,
+    'partner_code': 'INT005',
+}
+
+
+def sample_quotes():
+    first = FlightQuote.from_flight_info(FLIGHT_INFO)
+    second = FlightQuote.from_flight_info(dict(FLIGHT_INFO, total_fare=None, total_price='₩98,000',
+                                               outbound_duration='2시간 5분', outbound_departure=''),
+                                          '2026-11-02', '2026-11-05')
+    return [first, second]
+
+
+def test_flight_info_round_trip():
+    quote = FlightQuote.from_flight_info(FLIGHT_INFO)
+    assert quote.fare == 123400
+    assert quote.stay_days == 4
+    assert quote.outbound_departure == 7 * 60 + 20
+    assert quote.to_flight_info() == dict(FLIGHT_INFO, departure_date='2026-11-01', return_date='2026-11-04')
+
+
+def test_encode_decode_round_trip():
+    quotes = sample_quotes()
+    decoded, meta = decode_quotes(encode_quotes(quotes, origin='PUS', destination='NRT'))
+    assert decoded == quotes
+    assert meta['origin'] == 'PUS' and meta['destination'] == 'NRT'
+    assert decoded[1].outbound_duration == 125
+    assert decoded[1].to_flight_info()['outbound_departure'] == ''
+
+
+def test_decode_accepts_reordered_fields():
+    quotes = sample_quotes()
+    document = encode_quotes(quotes)
+    order = list(reversed(document['fields']))
+    positions = [document['fields'].index(name) for name in order]
+    document['fields'] = order
+    document['rows'] = [[row[p] for p in positions] for row in document['rows']]
+    assert decode_quotes(document)[0] == quotes
+
+
+@pytest.mark.parametrize('name', ['quotes.quotes.json.gz', 'quotes.quotes.json'])
+def test_dump_load_file_round_trip(tmp_path, name):
+    quotes = sample_quotes()
+    path = str(tmp_path / name)
+    assert dump_quotes(quotes, path, origin='PUS') == 2
+    loaded, meta = load_quotes(path)
+    assert loaded == quotes
+    assert meta['origin'] == 'PUS'
+
+
+def test_decode_rejects_other_documents():
+    with pytest.raises(ValueError):
+        decode_quotes({'rows': []})
+    with pytest.raises(ValueError):
+        decode_quotes(dict(encode_quotes([]), version=-1))
+
+
+def test_quotes_from_results_uses_ranked_flights_and_skips_bad_rows():
+    results = [
+        {'departure_date': '2026-11-01', 'return_date': '2026-11-04',
+         'flight_info': dict(FLIGHT_INFO, ranked_flights=[FLIGHT_INFO, dict(FLIGHT_INFO, rank=2, total_fare=130000),
+                                                          dict(FLIGHT_INFO, total_fare=None, total_price='abc')])},
+        {'departure_date': '2026-11-02', 'return_date': '2026-11-05', 'flight_info': {}},
+    ]
+    assert [quote.fare for quote in quotes_from_results(results)] == [123400, 130000]
+
+
+def test_parsers():
+    assert parse_fare('123,400원') == 123400
+    assert parse_fare('') is None
+    assert parse_fare(0) is None
+    with pytest.raises(ValueError):
+        parse_fare('abc')
+    assert parse_minutes('2시간') == 120
+    assert parse_minutes('45분') == 45
+    assert parse_minutes('N/A') < 0
@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+
+import process_naver_flight_data
+from process_naver_flight_data import JSONStream, iter_flight_results
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # 값이 조각 경계에 걸치는 경우를 확인하기 위해 몇 글자씩만 읽는다
+    monkeypatch.setattr(process_naver_flight_data, '_STREAM_CHUNK_SIZE', 3)
+
+
+def results_document(count):
+    return {
+        'search_parameters': {'origin': 'PUS', 'destination': 'NRT'},
+        'naver_flight_results': [
+            {'departure_date': f'2026-11-{day:02d}', 'return_date': f'2026-11-{day + 2:02d}',
+             'flight_info': {'total_price': f"{100000 + day:,}원", 'total_fare': 100000 + day}}
+            for day in range(1, count + 1)
+        ],
+        'summary': {'total_combinations': count, 'note': '최저가 ✈'},
+    }
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_iter_flight_results_matches_json_load(small_chunks, indent):
+    document = results_document(5)
+    meta = {}
+    results = list(iter_flight_results(io.StringIO(json.dumps(document, ensure_ascii=False, indent=indent)), meta))
+    
+    assert results == document['naver_flight_results']
+    assert meta == {'search_parameters': document['search_parameters'], 'summary': document['summary']}
+
+
+def test_iter_flight_results_empty(small_chunks):
+    meta = {}
+    assert list(iter_flight_results(io.StringIO('{"naver_flight_results": [], "a": 1}'), meta)) == []
+    assert meta == {'a': 1}
+    assert list(iter_flight_results(io.StringIO('{}'), {})) == []
+
+
+def test_number_at_chunk_boundary_is_not_cut(small_chunks):
+    stream = JSONStream(io.StringIO('[1234567, 89]'))
+    stream.take('[')
+    assert stream.value() == 1234567
+    stream.take(',')
+    assert stream.value() == 89
+    stream.take(']')
+    assert stream.peek() == ''
+
+
+def test_malformed_document_raises(small_chunks):
+    with pytest.raises(ValueError):
+        list(iter_flight_results(io.StringIO('{"naver_flight_results": [{"a": 1} {"b": 2}]}'), {}))
+    with pytest.raises(ValueError):
+        list(iter_flight_results(io.StringIO('[1, 2]'), {}))
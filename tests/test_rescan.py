@@ -0,0 +1,36 @@
+from datetime import date
+
+from flight_search_naver import score_rescan_cells
+
+NOW = 1_800_000_000
+
+
+def observed(*fares):
+    return [(NOW - 3600 * (len(fares) - i), fare) for i, fare in enumerate(fares)]
+
+
+def test_top_k_threshold_uses_only_requested_cells():
+    cells = [(date(2027, 3, 1), date(2027, 3, 4)), (date(2027, 3, 2), date(2027, 3, 5))]
+    observations = {
+        ('2027-03-01', '2027-03-04'): observed(300000),
+        ('2027-03-02', '2027-03-05'): observed(350000),
+        # 요청 범위 밖 (다른 체류 기간) 의 더 싼 조합은 k번째 최저가에 들어가지 않아야 함
+        ('2027-03-01', '2027-03-10'): observed(100000),
+    }
+    
+    scored = score_rescan_cells(cells, observations, top_k=1, now=NOW)
+    reasons = {cell: reason for _, cell, reason in scored}
+    
+    assert len(scored) == 2
+    assert '상위 1' in reasons[cells[0]]
+    assert '상위 1' not in reasons[cells[1]]
+
+
+def test_unobserved_cells_come_first():
+    cells = [(date(2027, 3, 1), date(2027, 3, 4)), (date(2027, 3, 2), date(2027, 3, 5))]
+    observations = {('2027-03-01', '2027-03-04'): observed(300000, 310000)}
+    
+    scored = score_rescan_cells(cells, observations, top_k=5, now=NOW)
+    
+    assert scored[0][1] == cells[1]
+    assert scored[0][2] == '관측 없음'
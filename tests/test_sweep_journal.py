@@ -0,0 +1,78 @@
+import json
+from datetime import date
+
+import flight_search_naver
+from flight_search_naver import SweepJournal, journal_key, make_journal_entry
+from process_naver_flight_data import scan_flight_file
+
+
+def entry(day, price):
+    flight_info = {'total_price': f"{price:,}원", 'total_fare': price, 'outbound_duration': '125분'}
+    return make_journal_entry(date(2026, 11, day), date(2026, 11, day + 2), 'ok', flight_info=flight_info)
+
+
+def test_resume_from_journal_torn_mid_character(tmp_path):
+    path = tmp_path / 'sweep.jsonl'
+    journal = SweepJournal(str(path))
+    journal.append(entry(1, 100000))
+    journal.append(entry(2, 110000))
+    journal.close()
+    
+    # 마지막 줄을 "원"(3바이트) 중간에서 자른 채 프로세스가 죽은 상황
+    torn = json.dumps(entry(3, 120000), ensure_ascii=False).encode('utf-8')
+    cut = torn.index('원'.encode('utf-8')) + 1
+    with open(path, 'ab') as f:
+        f.write(torn[:cut])
+    
+    records = SweepJournal.load(str(path))
+    assert set(records) == {journal_key('2026-11-01', '2026-11-03'), journal_key('2026-11-02', '2026-11-04')}
+    
+    journal = SweepJournal(str(path), resume=True)
+    journal.append(entry(4, 130000))
+    journal.close()
+    
+    records = SweepJournal.load(str(path))
+    assert journal_key('2026-11-04', '2026-11-06') in records
+    assert journal_key('2026-11-03', '2026-11-05') not in records
+    assert len(records) == 3
+    
+    # 처리 도구도 같은 저널을 읽을 수 있어야 한다
+    scanned = scan_flight_file(str(path))
+    assert scanned['rows'] == 3
+    assert len(scanned['best']) == 3
+
+
+def run_sweep(params):
+    sweep = flight_search_naver.iter_search_results(params)
+    while True:
+        try:
+            next(sweep)
+        except StopIteration as stop:
+            return stop.value
+
+
+def test_sweep_results_do_not_reload_journal(tmp_path, monkeypatch):
+    def fake_search(departure_date, **kwargs):
+        if departure_date == '2026-11-03':
+            raise RuntimeError('upstream')
+        if departure_date == '2026-11-04':
+            return None
+        return {'total_price': '100,000원', 'total_fare': 100000, 'ranked_flights': []}
+    
+    monkeypatch.setattr(flight_search_naver, 'call_naver_flight_mcp', fake_search)
+    monkeypatch.setattr(flight_search_naver, 'get_mcp_pool', lambda **kwargs: None)
+    monkeypatch.setattr(flight_search_naver, 'record_price_history', lambda *args: None)
+    params = {
+        'origin': 'PUS', 'destination': 'NRT', 'start_date': '2026-11-01', 'end_date': '2026-11-05',
+        'stay_days': [3], 'adults': 1, 'concurrency': 2, 'rate': 0, 'journal': str(tmp_path / 'sweep.jsonl'),
+    }
+    
+    first = run_sweep(params)
+    assert [result['departure_date'] for result in first] == ['2026-11-01', '2026-11-02', '2026-11-05']
+    
+    # 이어서 검색할 때 시작 시 한 번만 읽고, 결과를 만들려고 저널을 다시 읽지 않는다
+    loads = []
+    load = SweepJournal.load
+    monkeypatch.setattr(SweepJournal, 'load', staticmethod(lambda path: loads.append(path) or load(path)))
+    assert run_sweep(dict(params, resume=True)) == first
+    assert len(loads) == 1